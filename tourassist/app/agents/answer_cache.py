@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+
+from tourassist.app import config
+from tourassist.app.models.generations import SharedGenerations
+
+
+@dataclass
+class CachedAnswer:
+    content: str
+    retrieved: list[dict]
+    created_at: float
+
+
+@dataclass
+class _TenantAnswers:
+    vectors: list[np.ndarray] = field(default_factory=list)
+    answers: list[CachedAnswer] = field(default_factory=list)
+    matrix: np.ndarray | None = None
+    generation: int = 0
+
+
+def _normalise(vector: Sequence[float]) -> np.ndarray:
+    values = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(values))
+    return values / norm if norm else values
+
+
+class AnswerCache:
+    def __init__(
+        self, threshold: float, ttl_s: int, max_entries: int, generations: SharedGenerations | None = None
+    ) -> None:
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.generations = generations
+        self._tenants: dict[str, _TenantAnswers] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expire(self, bucket: _TenantAnswers, now: float) -> None:
+        if self.ttl_s <= 0:
+            return
+        keep = [idx for idx, answer in enumerate(bucket.answers) if now - answer.created_at < self.ttl_s]
+        if len(keep) != len(bucket.answers):
+            bucket.vectors = [bucket.vectors[idx] for idx in keep]
+            bucket.answers = [bucket.answers[idx] for idx in keep]
+            bucket.matrix = None
+
+    def _generation(self, tenant_id: str) -> int:
+        return self.generations.current(tenant_id) if self.generations is not None else 0
+
+    def lookup(self, tenant_id: str, vector: Sequence[float]) -> CachedAnswer | None:
+        if not self.enabled:
+            return None
+        query = _normalise(vector)
+        generation = self._generation(tenant_id)
+        with self._lock:
+            bucket = self._tenants.get(tenant_id)
+            if bucket is not None and bucket.generation != generation:
+                # This tenant's documents were re-indexed, possibly by another worker.
+                del self._tenants[tenant_id]
+                bucket = None
+            answer = None
+            if bucket is not None:
+                self._expire(bucket, time.time())
+                if bucket.vectors and bucket.vectors[0].shape == query.shape:
+                    if bucket.matrix is None:
+                        bucket.matrix = np.vstack(bucket.vectors)
+                    scores = bucket.matrix @ query
+                    best = int(np.argmax(scores))
+                    if float(scores[best]) >= self.threshold:
+                        answer = bucket.answers[best]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def store(self, tenant_id: str, vector: Sequence[float], content: str, retrieved: list[dict]) -> None:
+        if not self.enabled:
+            return
+        entry = _normalise(vector)
+        retained = [
+            {"document_id": item.get("document_id"), "source": item.get("source"), "score": item.get("score")}
+            for item in retrieved
+        ]
+        generation = self._generation(tenant_id)
+        with self._lock:
+            bucket = self._tenants.setdefault(tenant_id, _TenantAnswers(generation=generation))
+            if bucket.generation != generation or (bucket.vectors and bucket.vectors[0].shape != entry.shape):
+                bucket = self._tenants[tenant_id] = _TenantAnswers(generation=generation)
+            bucket.vectors.append(entry)
+            bucket.answers.append(CachedAnswer(content=content, retrieved=retained, created_at=time.time()))
+            if len(bucket.vectors) > self.max_entries:
+                del bucket.vectors[0]
+                del bucket.answers[0]
+            bucket.matrix = None
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+        if self.generations is not None:
+            self.generations.bump(tenant_id)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": sum(len(bucket.answers) for bucket in self._tenants.values()),
+        }
+
+
+_answer_cache: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            config.settings.answer_cache_threshold,
+            config.settings.answer_cache_ttl_s,
+            config.settings.answer_cache_max_entries,
+            SharedGenerations("answers", config.settings.cache_sync_interval_s),
+        )
+    return _answer_cache
@@ -1,14 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import time
-from typing import Tuple
+from typing import Any, AsyncIterator, Tuple
 
-from tourassist.app.agents.llm_client import chat_completion
-from tourassist.app.agents.memory import session_memory
+from tourassist.app import config
+from tourassist.app.agents.answer_cache import CachedAnswer, get_answer_cache
+from tourassist.app.agents.llm_client import (
+    FALLBACK_MESSAGE,
+    chat_completion,
+    chat_completion_async,
+    estimate_usage,
+    fallback_response,
+    stream_chat_completion,
+)
+from tourassist.app.agents.memory import get_session_store
+from tourassist.app.agents.prompt import build_messages
+from tourassist.app.concurrency import AsyncSingleFlight, normalize_question, sharing_enabled
+from tourassist.app.observability.logger import get_logger
 from tourassist.app.observability.metrics import metrics_store
-from tourassist.app.rag.retrieval import retrieve_context
+from tourassist.app.observability.tracing import span
+from tourassist.app.rag.embeddings import embed_texts, embed_texts_async
+from tourassist.app.rag.retrieval import keyword_context, retrieve_context, retrieve_context_async
 from tourassist.app.tools.opening_hours import lookup_opening_hours
 
+logger = get_logger(__name__)
 
 SYSTEM_PROMPT = (
     "You are TourAssist, a helpful tourist assistant. "
@@ -16,6 +34,16 @@ SYSTEM_PROMPT = (
     "If the answer is not in the context, say you don't know and suggest next steps."
 )
 
+LOW_CONFIDENCE_RESPONSE = (
+    "I don't have enough information in the provided documents to answer that. "
+    "Please share more details or upload relevant materials."
+)
+
+ChatResult = Tuple[str, float, int, float, list[str]]
+
+_retrieval_flights: AsyncSingleFlight[list[dict]] = AsyncSingleFlight("retrieval")
+_llm_flights: AsyncSingleFlight[dict[str, Any]] = AsyncSingleFlight("llm")
+
 
 def _should_use_tool(message: str) -> bool:
     lower = message.lower()
@@ -30,54 +58,289 @@ def _extract_place(message: str) -> str:
     return ""
 
 
-def handle_chat(
+def _tool_response(message: str) -> str | None:
+    if not _should_use_tool(message):
+        return None
+    place = _extract_place(message)
+    if not place:
+        return "Please specify the place name you are asking about."
+    with span("tool", tool="opening_hours"):
+        return lookup_opening_hours(place).opening_hours
+
+
+def _is_confident(item: dict) -> bool:
+    # A lexical-only hit counts only when it contains every query term; partial coverage is not evidence.
+    return (item.get("score") or 0.0) >= 0.2 or (item.get("lexical_score") or 0.0) >= 1.0
+
+
+def _is_low_confidence(retrieved: list[dict]) -> bool:
+    return not any(_is_confident(item) for item in retrieved)
+
+
+def _build_messages(session_id: str, retrieved: list[dict], user_message: str) -> list[dict[str, str]]:
+    return build_messages(SYSTEM_PROMPT, session_id, retrieved, user_message)
+
+
+def _retrieval_key(tenant_id: str, user_message: str) -> Tuple[str, str]:
+    return tenant_id, normalize_question(user_message)
+
+
+def _llm_key(tenant_id: str, user_message: str, messages: list[dict[str, str]]) -> Tuple[str, str, str]:
+    # Everything before the question (system prompt, summary, history) must match too, so
+    # only callers with the same conversation so far share an answer.
+    prefix = hashlib.sha256(json.dumps(messages[:-1], sort_keys=True).encode("utf-8")).hexdigest()
+    return tenant_id, normalize_question(user_message), prefix
+
+
+def _coalescing() -> bool:
+    return config.settings.coalesce_requests and sharing_enabled()
+
+
+def _answer_cache_enabled() -> bool:
+    return sharing_enabled() and get_answer_cache().enabled
+
+
+def _shared(result: dict[str, Any], led: bool) -> dict[str, Any]:
+    # Waiters reuse the leader's answer; the tokens were paid for once, by the leader.
+    return result if led else {**result, "tokens_used": 0, "estimated_cost": 0.0}
+
+
+async def _complete_async(
+    tenant_id: str, user_message: str, messages: list[dict[str, str]], retrieved: list[dict]
+) -> dict[str, Any]:
+    if not _coalescing():
+        return await chat_completion_async(messages, user_message, retrieved)
+    led = False
+
+    async def call() -> dict[str, Any]:
+        nonlocal led
+        led = True
+        return await chat_completion_async(messages, user_message, retrieved)
+
+    return _shared(await _llm_flights.do(_llm_key(tenant_id, user_message, messages), call), led)
+
+
+def _finish(
+    tenant_id: str,
+    start: float,
+    session_id: str,
+    user_message: str,
+    retrieved: list[dict],
+    result: dict[str, Any],
+) -> ChatResult:
+    latency_ms = (time.perf_counter() - start) * 1000
+    metrics_store.record_latency(latency_ms, tenant_id)
+    metrics_store.record_tokens(result["tokens_used"], tenant_id)
+    metrics_store.record_cost(result["estimated_cost"], tenant_id)
+    with span("memory"):
+        get_session_store().extend(session_id, [("user", user_message), ("assistant", result["content"])])
+    retrieved_doc_ids = [item["document_id"] for item in retrieved if item.get("document_id")]
+    return result["content"], latency_ms, result["tokens_used"], result["estimated_cost"], retrieved_doc_ids
+
+
+async def _finish_async(
+    tenant_id: str,
+    start: float,
+    session_id: str,
+    user_message: str,
+    retrieved: list[dict],
+    result: dict[str, Any],
+) -> ChatResult:
+    # The session store may be SQLite, so the memory write stays off the event loop.
+    return await asyncio.to_thread(_finish, tenant_id, start, session_id, user_message, retrieved, result)
+
+
+def _local_result(content: str) -> dict[str, Any]:
+    return {"content": content, "tokens_used": 0, "estimated_cost": 0.0}
+
+
+def _lookup_answer(tenant_id: str, vector: list[float] | None, tool_answer: str | None) -> CachedAnswer | None:
+    if tool_answer is not None or vector is None:
+        return None
+    with span("answer_cache") as current:
+        cached = get_answer_cache().lookup(tenant_id, vector)
+        if current is not None:
+            current.set_attribute("cache.hit", cached is not None)
+    return cached
+
+
+def _remember_answer(tenant_id: str, vector: list[float] | None, content: str, retrieved: list[dict]) -> None:
+    if vector is None or not content or content == FALLBACK_MESSAGE:
+        return
+    get_answer_cache().store(tenant_id, vector, content, retrieved)
+
+
+def _keyword_hits(retrieved: list[dict]) -> list[dict] | None:
+    # A keyword query whose lexical matches are already confident needs no query embedding, and so
+    # also bypasses the answer cache, which is keyed by that embedding.
+    return retrieved if not _is_low_confidence(retrieved) else None
+
+
+def handle_chat(tenant_id: str, session_id: str, user_message: str) -> ChatResult:
+    start = time.perf_counter()
+    vector = None
+    tool_answer = _tool_response(user_message)
+    retrieved = _keyword_hits(keyword_context(tenant_id, user_message))
+    if retrieved is None:
+        if _answer_cache_enabled():
+            with span("embed_query"):
+                vector = embed_texts([user_message])[0]
+        cached = _lookup_answer(tenant_id, vector, tool_answer)
+        if cached is not None:
+            result = _local_result(cached.content)
+            return _finish(tenant_id, start, session_id, user_message, cached.retrieved, result)
+        retrieved = retrieve_context(tenant_id, user_message, vector)
+    if tool_answer is not None:
+        return _finish(tenant_id, start, session_id, user_message, retrieved, _local_result(tool_answer))
+    if _is_low_confidence(retrieved):
+        return _finish(tenant_id, start, session_id, user_message, retrieved, _local_result(LOW_CONFIDENCE_RESPONSE))
+
+    messages = _build_messages(session_id, retrieved, user_message)
+    with span("llm"):
+        result = chat_completion(messages, user_message, retrieved)
+    _remember_answer(tenant_id, vector, result["content"], retrieved)
+    return _finish(tenant_id, start, session_id, user_message, retrieved, result)
+
+
+async def _embed_query_async(tenant_id: str, user_message: str) -> list[float] | None:
+    if not _answer_cache_enabled():
+        return None
+    try:
+        with span("embed_query"):
+            vectors = await asyncio.wait_for(embed_texts_async([user_message]), config.settings.retrieval_timeout_s)
+    except asyncio.TimeoutError:
+        logger.warning("embedding_timeout", extra={"extra": {"tenant_id": tenant_id}})
+        return None
+    return vectors[0]
+
+
+async def _retrieve_with_timeout(tenant_id: str, user_message: str, vector: list[float] | None) -> list[dict]:
+    # A missing vector with the answer cache enabled means the query embedding already timed out.
+    embed = not _answer_cache_enabled()
+    if _coalescing():
+        retrieval = _retrieval_flights.do(
+            _retrieval_key(tenant_id, user_message),
+            lambda: retrieve_context_async(tenant_id, user_message, vector, embed=embed),
+        )
+    else:
+        retrieval = retrieve_context_async(tenant_id, user_message, vector, embed=embed)
+    try:
+        retrieved = await asyncio.wait_for(retrieval, config.settings.retrieval_timeout_s)
+    except asyncio.TimeoutError:
+        logger.warning("retrieval_timeout", extra={"extra": {"tenant_id": tenant_id}})
+        return []
+    return [dict(item) for item in retrieved]
+
+
+async def chat_with_context_async(
     tenant_id: str, session_id: str, user_message: str
-) -> Tuple[str, float, int, float, list[str]]:
+) -> Tuple[ChatResult, list[dict]]:
     start = time.perf_counter()
-    retrieved = retrieve_context(tenant_id, user_message)
-    retrieved_doc_ids = [item["document_id"] for item in retrieved if item.get("document_id")]
-    context = "\n".join(item["text"] for item in retrieved if item.get("text"))
+    vector = None
+    tool_answer = _tool_response(user_message)
+    retrieved = _keyword_hits(await asyncio.to_thread(keyword_context, tenant_id, user_message))
+    if retrieved is None:
+        vector = await _embed_query_async(tenant_id, user_message)
+        cached = _lookup_answer(tenant_id, vector, tool_answer)
+        if cached is not None:
+            result = _local_result(cached.content)
+            completed = await _finish_async(tenant_id, start, session_id, user_message, cached.retrieved, result)
+            return completed, cached.retrieved
+        retrieved = await _retrieve_with_timeout(tenant_id, user_message, vector)
+    if tool_answer is not None:
+        result = _local_result(tool_answer)
+        return await _finish_async(tenant_id, start, session_id, user_message, retrieved, result), retrieved
+    if _is_low_confidence(retrieved):
+        result = _local_result(LOW_CONFIDENCE_RESPONSE)
+        return await _finish_async(tenant_id, start, session_id, user_message, retrieved, result), retrieved
+
+    messages = await asyncio.to_thread(_build_messages, session_id, retrieved, user_message)
+    try:
+        with span("llm"):
+            result = await asyncio.wait_for(
+                _complete_async(tenant_id, user_message, messages, retrieved), config.settings.llm_timeout_s
+            )
+    except asyncio.TimeoutError as exc:
+        result = fallback_response(exc)
+    _remember_answer(tenant_id, vector, result["content"], retrieved)
+    return await _finish_async(tenant_id, start, session_id, user_message, retrieved, result), retrieved
+
+
+async def handle_chat_async(tenant_id: str, session_id: str, user_message: str) -> ChatResult:
+    result, _ = await chat_with_context_async(tenant_id, session_id, user_message)
+    return result
 
-    if _should_use_tool(user_message):
-        place = _extract_place(user_message)
-        if place:
-            tool_result = lookup_opening_hours(place)
-            response_text = tool_result.opening_hours
+
+def _citations(retrieved: list[dict]) -> list[dict[str, Any]]:
+    return [
+        {"document_id": item.get("document_id"), "source": item.get("source"), "score": item.get("score")}
+        for item in retrieved
+        if item.get("document_id")
+    ]
+
+
+async def stream_chat(tenant_id: str, session_id: str, user_message: str) -> AsyncIterator[dict[str, Any]]:
+    start = time.perf_counter()
+    vector = None
+    local_answer = _tool_response(user_message)
+    retrieved = _keyword_hits(await asyncio.to_thread(keyword_context, tenant_id, user_message))
+    if retrieved is None:
+        vector = await _embed_query_async(tenant_id, user_message)
+        cached = _lookup_answer(tenant_id, vector, local_answer)
+        if cached is not None:
+            retrieved = cached.retrieved
+            local_answer = cached.content
         else:
-            response_text = "Please specify the place name you are asking about."
-        latency_ms = (time.perf_counter() - start) * 1000
-        metrics_store.record_latency(latency_ms)
-        metrics_store.record_tokens(0)
-        metrics_store.record_cost(0.0)
-        session_memory.append(session_id, "user", user_message)
-        session_memory.append(session_id, "assistant", response_text)
-        return response_text, latency_ms, 0, 0.0, retrieved_doc_ids
-
-    low_confidence = not retrieved or all(item.get("score", 0) < 0.2 for item in retrieved)
-    if low_confidence:
-        response_text = (
-            "I don't have enough information in the provided documents to answer that. "
-            "Please share more details or upload relevant materials."
-        )
-        latency_ms = (time.perf_counter() - start) * 1000
-        metrics_store.record_latency(latency_ms)
-        metrics_store.record_tokens(0)
-        metrics_store.record_cost(0.0)
-        session_memory.append(session_id, "user", user_message)
-        session_memory.append(session_id, "assistant", response_text)
-        return response_text, latency_ms, 0, 0.0, retrieved_doc_ids
-
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(session_memory.get(session_id))
-    messages.append({"role": "user", "content": f"Context:\n{context}\n\nQuestion: {user_message}"})
-
-    result = chat_completion(messages)
-    latency_ms = (time.perf_counter() - start) * 1000
-    metrics_store.record_latency(latency_ms)
-    metrics_store.record_tokens(result["tokens_used"])
-    metrics_store.record_cost(result["estimated_cost"])
+            retrieved = await _retrieve_with_timeout(tenant_id, user_message, vector)
+    yield {
+        "event": "meta",
+        "data": {
+            "retrieved_doc_ids": [item["document_id"] for item in retrieved if item.get("document_id")],
+            "citations": _citations(retrieved),
+        },
+    }
 
-    session_memory.append(session_id, "user", user_message)
-    session_memory.append(session_id, "assistant", result["content"])
+    if local_answer is None and _is_low_confidence(retrieved):
+        local_answer = LOW_CONFIDENCE_RESPONSE
+    if local_answer is not None:
+        yield {"event": "token", "data": {"content": local_answer}}
+        result = _local_result(local_answer)
+        completed = await _finish_async(tenant_id, start, session_id, user_message, retrieved, result)
+        _, latency_ms, tokens, cost, _ = completed
+        yield {"event": "done", "data": {"latency_ms": latency_ms, "tokens_used": tokens, "estimated_cost": cost}}
+        return
 
-    return result["content"], latency_ms, result["tokens_used"], result["estimated_cost"], retrieved_doc_ids
+    messages = await asyncio.to_thread(_build_messages, session_id, retrieved, user_message)
+    parts: list[str] = []
+    usage: dict[str, Any] = {}
+    first_token_ms: float | None = None
+    try:
+        async for event in stream_chat_completion(messages, user_message, retrieved):
+            if event["type"] == "usage":
+                usage = event
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+            parts.append(event["content"])
+            yield {"event": "token", "data": {"content": event["content"]}}
+    finally:
+        content = "".join(parts)
+        if not usage:
+            usage = estimate_usage(content)
+        result = {
+            "content": content,
+            "tokens_used": usage["tokens_used"],
+            "estimated_cost": usage["estimated_cost"],
+        }
+        completed = await _finish_async(tenant_id, start, session_id, user_message, retrieved, result)
+    _remember_answer(tenant_id, vector, completed[0], retrieved)
+    _, latency_ms, tokens, cost, _ = completed
+    yield {
+        "event": "done",
+        "data": {
+            "latency_ms": latency_ms,
+            "time_to_first_token_ms": first_token_ms,
+            "tokens_used": tokens,
+            "estimated_cost": cost,
+        },
+    }
@@ -1,49 +1,580 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import json
-from typing import Any
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Set
 
 import httpx
 
 from tourassist.app import config
+from tourassist.app.agents.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    backoff_delay,
+    is_retryable,
+)
+from tourassist.app.agents.tokenizer import count_tokens
 from tourassist.app.observability.logger import get_logger
+from tourassist.app.observability.metrics import metrics_store
 
 logger = get_logger(__name__)
 
+FALLBACK_MESSAGE = "I'm sorry, I'm having trouble right now. Please try again shortly."
+
 
 def _estimate_tokens(text: str) -> int:
-    return max(1, int(len(text.split()) * 1.3))
+    return count_tokens(text)
+
+
+_COST_PER_TOKEN = 0.0000005
+
+
+def _estimate_cost(tokens: int, cost_per_token: float = _COST_PER_TOKEN) -> float:
+    return round(tokens * cost_per_token, 6)
+
+
+def estimate_usage(text: str) -> dict[str, Any]:
+    tokens = _estimate_tokens(text)
+    return {"tokens_used": tokens, "estimated_cost": _estimate_cost(tokens)}
+
+
+def _offline_response(messages: list[dict[str, str]]) -> dict[str, Any]:
+    content = "\n".join(m["content"] for m in messages if m["role"] != "system")
+    return {
+        "content": f"Based on the provided documents, here is what I found:\n{content}",
+        "tokens_used": _estimate_tokens(content),
+        "estimated_cost": _estimate_cost(_estimate_tokens(content)),
+    }
+
 
+def _parse_response(data: dict[str, Any], cost_per_token: float = _COST_PER_TOKEN) -> dict[str, Any]:
+    choice = data["choices"][0]["message"]["content"]
+    usage = data.get("usage", {})
+    tokens = usage.get("total_tokens", _estimate_tokens(choice))
+    return {"content": choice, "tokens_used": tokens, "estimated_cost": _estimate_cost(tokens, cost_per_token)}
 
-def _estimate_cost(tokens: int) -> float:
-    return round(tokens * 0.0000005, 6)
 
+def fallback_response(exc: BaseException) -> dict[str, Any]:
+    logger.error("chat_completion_failed", extra={"extra": {"error": str(exc) or type(exc).__name__}})
+    tokens = _estimate_tokens(FALLBACK_MESSAGE)
+    return {"content": FALLBACK_MESSAGE, "tokens_used": tokens, "estimated_cost": _estimate_cost(tokens)}
 
-def chat_completion(messages: list[dict[str, str]]) -> dict[str, Any]:
-    if not config.settings.llm_api_key:
-        content = "\n".join(m["content"] for m in messages if m["role"] != "system")
-        response = {
-            "content": f"Based on the provided documents, here is what I found:\n{content}",
-            "tokens_used": _estimate_tokens(content),
-            "estimated_cost": _estimate_cost(_estimate_tokens(content)),
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class SaturatedError(RuntimeError):
+    """Raised when no in-flight slot frees up before the call's deadline."""
+
+
+class LLMClient:
+    """Pooled chat-completions client with jittered retries, optional hedging and a circuit breaker.
+
+    One sync and one async ``httpx`` client are shared by every call, HTTP/2 when ``h2`` is installed.
+    Each call has a single deadline of ``llm_timeout_s`` covering all of its attempts, in-flight calls are
+    capped at ``llm_max_in_flight``, and once the breaker opens calls fail fast until a probe succeeds.
+    Hedging applies to async calls only.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None,
+        model: str,
+        name: str = "default",
+        cost_per_token: float = _COST_PER_TOKEN,
+        transport: httpx.BaseTransport | httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        settings = config.settings
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.name = name
+        self.cost_per_token = cost_per_token
+        self.breaker = CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_s)
+        self.latency = LatencyTracker(settings.llm_hedge_min_ms)
+        self._sync_client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_slots: asyncio.Semaphore | None = None
+        self._sync_slots = threading.BoundedSemaphore(settings.llm_max_in_flight)
+        self._transport = transport
+        self._lock = threading.Lock()
+
+    def _client_options(self) -> dict[str, Any]:
+        settings = config.settings
+        options: dict[str, Any] = {"transport": self._transport} if self._transport is not None else {}
+        return {
+            **options,
+            "timeout": settings.llm_timeout_s,
+            "limits": httpx.Limits(
+                max_connections=settings.llm_max_in_flight, max_keepalive_connections=settings.llm_max_in_flight
+            ),
+            "http2": settings.llm_http2 and _http2_available(),
         }
-        return response
 
-    payload = {"model": config.settings.llm_model, "messages": messages}
-    headers = {"Authorization": f"Bearer {config.settings.llm_api_key}"}
-    try:
-        with httpx.Client(timeout=20) as client:
-            response = client.post(
-                f"{config.settings.llm_base_url}/chat/completions", json=payload, headers=headers
+    def _sync(self) -> httpx.Client:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+
+    def _async(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        if self._async_client is None or self._async_slots is None:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            self._async_slots = asyncio.Semaphore(config.settings.llm_max_in_flight)
+        return self._async_client, self._async_slots
+
+    async def aclose(self) -> None:
+        client, self._async_client, self._async_slots = self._async_client, None, None
+        if client is not None:
+            await client.aclose()
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+        if sync_client is not None:
+            sync_client.close()
+
+    def _request(self, messages: list[dict[str, str]]) -> tuple[str, dict[str, Any], dict[str, str]]:
+        payload = {"model": self.model, "messages": messages}
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return f"{self.base_url}/chat/completions", payload, headers
+
+    def _count(self, name: str, **labels: str) -> None:
+        metrics_store.increment(name, backend=self.name, **labels)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self._count("llm_rejected_total", reason="circuit_open")
+            raise CircuitOpenError(f"LLM backend {self.name} circuit is open")
+
+    def _settle(self, exc: BaseException | None) -> bool:
+        """Feed one attempt's outcome to the breaker; True when the error is worth retrying."""
+        if exc is None or (isinstance(exc, httpx.HTTPStatusError) and not is_retryable(exc)):
+            self.breaker.record_success()
+            self._count("llm_requests_total", outcome="ok" if exc is None else "client_error")
+            return False
+        self.breaker.record_failure()
+        self._count("llm_requests_total", outcome="error")
+        return isinstance(exc, Exception) and is_retryable(exc)
+
+    def _retry_delay(self, attempt: int, exc: BaseException, deadline: float) -> float | None:
+        settings = config.settings
+        if attempt >= settings.llm_max_retries:
+            return None
+        delay = backoff_delay(attempt, settings.llm_retry_base_ms / 1000, settings.llm_retry_max_ms / 1000, exc)
+        if time.monotonic() + delay >= deadline:
+            return None
+        self._count("llm_retries_total")
+        return delay
+
+    @staticmethod
+    def _deadline(deadline: float | None) -> float:
+        return deadline if deadline is not None else time.monotonic() + config.settings.llm_timeout_s
+
+    async def _acquire(self, slots: asyncio.Semaphore, deadline: float) -> None:
+        try:
+            await asyncio.wait_for(slots.acquire(), max(deadline - time.monotonic(), 0.001))
+        except asyncio.TimeoutError:
+            self._count("llm_rejected_total", reason="saturated")
+            raise SaturatedError(f"LLM backend {self.name} has too many calls in flight") from None
+
+    def complete(self, messages: list[dict[str, str]], deadline: float | None = None) -> dict[str, Any]:
+        """``deadline`` is a ``time.monotonic()`` value; by default the call gets ``llm_timeout_s``."""
+        url, payload, headers = self._request(messages)
+        deadline = self._deadline(deadline)
+        if not self._sync_slots.acquire(timeout=max(deadline - time.monotonic(), 0.001)):
+            self._count("llm_rejected_total", reason="saturated")
+            raise SaturatedError(f"LLM backend {self.name} has too many calls in flight")
+        try:
+            attempt = 0
+            while True:
+                self._admit()
+                start = time.perf_counter()
+                try:
+                    response = self._sync().post(
+                        url, json=payload, headers=headers, timeout=max(deadline - time.monotonic(), 0.001)
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                except Exception as exc:
+                    delay = self._retry_delay(attempt, exc, deadline) if self._settle(exc) else None
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                self._settle(None)
+                self.latency.record((time.perf_counter() - start) * 1000)
+                return _parse_response(data, self.cost_per_token)
+        finally:
+            self._sync_slots.release()
+
+    async def _post(self, url: str, payload: dict[str, Any], headers: dict[str, str], timeout: float) -> Any:
+        client, _ = self._async()
+        response = await client.post(url, json=payload, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def _hedged(self, send: Callable[[], Awaitable[Any]], slots: asyncio.Semaphore) -> Any:
+        """Run ``send``; if it outlives the recent p95, race a second copy when a slot is free."""
+        first = asyncio.ensure_future(send())
+        delay = self.latency.hedge_delay_s() if config.settings.llm_hedge else None
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or slots.locked():
+            return await first
+        await slots.acquire()
+        self._count("llm_hedges_total")
+        second = asyncio.ensure_future(send())
+        second.add_done_callback(lambda _: slots.release())
+        pending: Set[asyncio.Future] = {first, second}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def complete_async(self, messages: list[dict[str, str]], deadline: float | None = None) -> dict[str, Any]:
+        url, payload, headers = self._request(messages)
+        deadline = self._deadline(deadline)
+        _, slots = self._async()
+        await self._acquire(slots, deadline)
+        try:
+            attempt = 0
+            while True:
+                self._admit()
+                start = time.perf_counter()
+                timeout = max(deadline - time.monotonic(), 0.001)
+                try:
+                    data = await self._hedged(lambda: self._post(url, payload, headers, timeout), slots)
+                except Exception as exc:
+                    delay = self._retry_delay(attempt, exc, deadline) if self._settle(exc) else None
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                self._settle(None)
+                self.latency.record((time.perf_counter() - start) * 1000)
+                return _parse_response(data, self.cost_per_token)
+        finally:
+            slots.release()
+
+    async def stream(
+        self, messages: list[dict[str, str]], deadline: float | None = None
+    ) -> AsyncIterator[str | int | None]:
+        """Yield content deltas, then the total token count (or None) as the final item.
+
+        Failures before the first delta are retried like ``complete_async``; once text has been sent the
+        error propagates so the caller can decide what to do with a partial answer.
+        """
+        url, payload, headers = self._request(messages)
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        deadline = self._deadline(deadline)
+        client, slots = self._async()
+        await self._acquire(slots, deadline)
+        try:
+            attempt = 0
+            while True:
+                self._admit()
+                started = False
+                total_tokens: int | None = None
+                try:
+                    async with client.stream(
+                        "POST", url, json=payload, headers=headers, timeout=max(deadline - time.monotonic(), 0.001)
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:") :].strip()
+                            if data == "[DONE]":
+                                break
+                            chunk = json.loads(data)
+                            if chunk.get("usage"):
+                                total_tokens = chunk["usage"].get("total_tokens")
+                            for choice in chunk.get("choices", []):
+                                delta = choice.get("delta", {}).get("content")
+                                if delta:
+                                    started = True
+                                    yield delta
+                except Exception as exc:
+                    retry = self._settle(exc) and not started
+                    delay = self._retry_delay(attempt, exc, deadline) if retry else None
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                self._settle(None)
+                yield total_tokens
+                return
+        finally:
+            slots.release()
+
+
+_REASONING_CUES = re.compile(
+    r"\b(why|how come|compare|comparison|versus|vs|differences?|better|best|recommend|suggest|plan|itinerary|"
+    r"should i|explain|pros|cons|trade-?offs?|step[- ]by[- ]step)\b",
+    re.IGNORECASE,
+)
+_UNSURE_ANSWER = re.compile(
+    r"\b(i don'?t know|i do not know|not sure|unsure|no information|not (?:in|mentioned in) the (?:provided )?context|"
+    r"cannot (?:find|answer)|can'?t (?:find|answer)|unable to (?:find|answer))\b",
+    re.IGNORECASE,
+)
+
+
+def is_simple_query(query: str, retrieved: list[dict] | None) -> bool:
+    """Short factual lookups whose top passage matched well by vector similarity (lexical coverage alone
+    doesn't qualify); these go to the cheapest backend first."""
+    settings = config.settings
+    if not query or count_tokens(query) > settings.llm_route_max_query_tokens:
+        return False
+    if query.count("?") > 1 or _REASONING_CUES.search(query):
+        return False
+    top_score = max((item.get("score") or 0.0 for item in retrieved or ()), default=0.0)
+    return top_score >= settings.llm_route_min_confidence
+
+
+def needs_escalation(content: str) -> bool:
+    return not content.strip() or content == FALLBACK_MESSAGE or bool(_UNSURE_ANSWER.search(content))
+
+
+class LLMRouter:
+    """Picks a backend per request from several OpenAI-compatible ones, ordered cheapest to largest.
+
+    Simple queries start on the cheapest backend with a share of the request deadline and escalate up the
+    list when the answer is empty or unsure, or the call fails. Everything else goes straight to the largest
+    backend and only falls back to smaller ones on errors. Streams fail over only before the first token.
+    """
+
+    def __init__(self, clients: list[LLMClient]) -> None:
+        if not clients:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.clients = clients
+
+    def plan(self, query: str, retrieved: list[dict] | None) -> tuple[str, list[LLMClient]]:
+        if len(self.clients) == 1:
+            return "single", self.clients
+        if is_simple_query(query, retrieved):
+            return "simple", self.clients
+        return "complex", [self.clients[-1], *reversed(self.clients[:-1])]
+
+    def _budget(self, index: int, order: list[LLMClient], deadline: float) -> float:
+        if index == len(order) - 1 or order[index] is self.clients[-1]:
+            return deadline
+        share = config.settings.llm_route_cheap_share * (deadline - time.monotonic())
+        return min(deadline, time.monotonic() + share)
+
+    def _record(self, client: LLMClient, route: str, latency_ms: float, result: dict[str, Any]) -> None:
+        metrics_store.observe("llm_latency_ms", latency_ms, backend=client.name)
+        metrics_store.increment("llm_routed_total", backend=client.name, route=route)
+        metrics_store.increment("llm_tokens_total", result["tokens_used"], backend=client.name)
+        metrics_store.increment("llm_cost_total", result["estimated_cost"], backend=client.name)
+
+    def _escalate(self, client: LLMClient, reason: str) -> None:
+        metrics_store.increment("llm_escalations_total", backend=client.name, reason=reason)
+        logger.info("llm_escalated", extra={"extra": {"backend": client.name, "reason": reason}})
+
+    def _accept(self, result: dict[str, Any], client: LLMClient, order: list[LLMClient], index: int) -> bool:
+        larger = index + 1 < len(order) and self.clients.index(order[index + 1]) > self.clients.index(client)
+        if larger and needs_escalation(result["content"]):
+            self._escalate(client, "unsure")
+            return False
+        return True
+
+    def complete(
+        self, messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+    ) -> dict[str, Any]:
+        route, order = self.plan(query, retrieved)
+        deadline = time.monotonic() + config.settings.llm_timeout_s
+        error: Exception | None = None
+        for index, client in enumerate(order):
+            start = time.perf_counter()
+            try:
+                result = client.complete(messages, self._budget(index, order, deadline))
+            except Exception as exc:  # noqa: BLE001
+                error = exc
+                self._escalate(client, type(exc).__name__)
+                continue
+            self._record(client, route, (time.perf_counter() - start) * 1000, result)
+            if self._accept(result, client, order, index):
+                return {**result, "backend": client.name}
+        raise error or RuntimeError("no LLM backend answered")
+
+    async def complete_async(
+        self, messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+    ) -> dict[str, Any]:
+        route, order = self.plan(query, retrieved)
+        deadline = time.monotonic() + config.settings.llm_timeout_s
+        error: Exception | None = None
+        for index, client in enumerate(order):
+            start = time.perf_counter()
+            try:
+                result = await client.complete_async(messages, self._budget(index, order, deadline))
+            except Exception as exc:  # noqa: BLE001
+                error = exc
+                self._escalate(client, type(exc).__name__)
+                continue
+            self._record(client, route, (time.perf_counter() - start) * 1000, result)
+            if self._accept(result, client, order, index):
+                return {**result, "backend": client.name}
+        raise error or RuntimeError("no LLM backend answered")
+
+    async def stream(
+        self, messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+    ) -> AsyncIterator[tuple[LLMClient, str | int | None]]:
+        """Yields ``(backend, item)`` pairs, where items follow ``LLMClient.stream``."""
+        route, order = self.plan(query, retrieved)
+        deadline = time.monotonic() + config.settings.llm_timeout_s
+        for index, client in enumerate(order):
+            start = time.perf_counter()
+            parts: list[str] = []
+            total_tokens: int | None = None
+            try:
+                async for item in client.stream(messages, deadline):
+                    if isinstance(item, str):
+                        parts.append(item)
+                    else:
+                        total_tokens = item
+                    yield client, item
+            except Exception as exc:  # noqa: BLE001
+                if parts or index == len(order) - 1:
+                    raise
+                self._escalate(client, type(exc).__name__)
+                continue
+            tokens = total_tokens or _estimate_tokens("".join(parts))
+            result = {"tokens_used": tokens, "estimated_cost": _estimate_cost(tokens, client.cost_per_token)}
+            self._record(client, route, (time.perf_counter() - start) * 1000, result)
+            return
+
+    async def aclose(self) -> None:
+        for client in self.clients:
+            await client.aclose()
+
+
+def _configured_clients() -> list[LLMClient]:
+    settings = config.settings
+    if not settings.llm_backends:
+        return [LLMClient(settings.llm_base_url, settings.llm_api_key, settings.llm_model)]
+    clients = []
+    for entry in json.loads(settings.llm_backends):
+        clients.append(
+            LLMClient(
+                entry["base_url"],
+                entry.get("api_key", settings.llm_api_key),
+                entry["model"],
+                name=entry.get("name", entry["model"]),
+                cost_per_token=float(entry.get("cost_per_token", _COST_PER_TOKEN)),
             )
-            response.raise_for_status()
-            data = response.json()
-        choice = data["choices"][0]["message"]["content"]
-        usage = data.get("usage", {})
-        tokens = usage.get("total_tokens", _estimate_tokens(choice))
-        return {"content": choice, "tokens_used": tokens, "estimated_cost": _estimate_cost(tokens)}
+        )
+    return clients
+
+
+_llm_router: LLMRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    global _llm_router
+    if _llm_router is None:
+        with _router_lock:
+            if _llm_router is None:
+                _llm_router = LLMRouter(_configured_clients())
+    return _llm_router
+
+
+def get_llm_client() -> LLMClient:
+    """The largest configured backend."""
+    return get_llm_router().clients[-1]
+
+
+async def aclose() -> None:
+    if _llm_router is not None:
+        await _llm_router.aclose()
+
+
+def _offline() -> bool:
+    return not config.settings.llm_api_key and not config.settings.llm_backends
+
+
+def chat_completion(
+    messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+) -> dict[str, Any]:
+    if _offline():
+        return _offline_response(messages)
+    try:
+        return get_llm_router().complete(messages, query, retrieved)
+    except Exception as exc:  # noqa: BLE001
+        return fallback_response(exc)
+
+
+async def chat_completion_async(
+    messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+) -> dict[str, Any]:
+    if _offline():
+        return _offline_response(messages)
+    try:
+        return await get_llm_router().complete_async(messages, query, retrieved)
+    except Exception as exc:  # noqa: BLE001
+        return fallback_response(exc)
+
+
+def _split_stream_tokens(text: str) -> list[str]:
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+async def stream_chat_completion(
+    messages: list[dict[str, str]], query: str = "", retrieved: list[dict] | None = None
+) -> AsyncIterator[dict[str, Any]]:
+    if _offline():
+        result = _offline_response(messages)
+        for piece in _split_stream_tokens(result["content"]):
+            yield {"type": "token", "content": piece}
+        yield {"type": "usage", "tokens_used": result["tokens_used"], "estimated_cost": result["estimated_cost"]}
+        return
+
+    parts: list[str] = []
+    total_tokens: int | None = None
+    backend: LLMClient | None = None
+    try:
+        async for backend, item in get_llm_router().stream(messages, query, retrieved):
+            if isinstance(item, str):
+                parts.append(item)
+                yield {"type": "token", "content": item}
+            else:
+                total_tokens = item
     except Exception as exc:  # noqa: BLE001
-        logger.error("chat_completion_failed", extra={"extra": {"error": str(exc)}})
-        fallback = "I'm sorry, I'm having trouble right now. Please try again shortly."
-        tokens = _estimate_tokens(fallback)
-        return {"content": fallback, "tokens_used": tokens, "estimated_cost": _estimate_cost(tokens)}
+        fallback = fallback_response(exc)
+        if not parts:
+            yield {"type": "token", "content": fallback["content"]}
+            yield {"type": "usage", "tokens_used": fallback["tokens_used"], "estimated_cost": fallback["estimated_cost"]}
+            return
+    tokens = total_tokens or _estimate_tokens("".join(parts))
+    cost_per_token = backend.cost_per_token if backend is not None else _COST_PER_TOKEN
+    yield {"type": "usage", "tokens_used": tokens, "estimated_cost": _estimate_cost(tokens, cost_per_token)}
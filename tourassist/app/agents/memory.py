@@ -1,18 +1,303 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
-from typing import Deque
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, List, Tuple
 
+from tourassist.app import config
+from tourassist.app.agents.tokenizer import count_tokens, get_tokenizer
+from tourassist.app.models.db import get_connection
 
-class SessionMemory:
-    def __init__(self, max_turns: int = 4) -> None:
-        self._store: dict[str, Deque[dict[str, str]]] = defaultdict(lambda: deque(maxlen=max_turns * 2))
+_PURGE_EVERY = 1000
+_SUMMARY_SEQ = 0
+_GIST_TOKENS = 40
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+_SUMMARY_LABELS = {"user": "User asked", "assistant": "Assistant answered"}
+
+
+class Message:
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int | None = None) -> None:
+        self.role = role
+        self.content = content
+        self.tokens = count_tokens(content) if tokens is None else tokens
+
+    @property
+    def size(self) -> int:
+        return len(self.role) + len(self.content.encode("utf-8"))
+
+    def as_dict(self) -> dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+def _gist(content: str) -> str:
+    sentence = _SENTENCE_END_RE.split(" ".join(content.split()), maxsplit=1)[0]
+    return get_tokenizer().truncate(sentence, _GIST_TOKENS).rstrip(".!? ")
+
+
+def fold_summary(summary: str, messages: Iterable[Tuple[str, str]], max_tokens: int) -> str:
+    """Append a one-line gist per message and drop the oldest lines beyond ``max_tokens``."""
+    lines = summary.splitlines() if summary else []
+    lines.extend(f"{_SUMMARY_LABELS.get(role, role)}: {_gist(content)}." for role, content in messages if content)
+    counts = [count_tokens(line) for line in lines]
+    total = sum(counts)
+    start = 0
+    while start < len(lines) and total > max_tokens:
+        total -= counts[start]
+        start += 1
+    return "\n".join(lines[start:])
+
+
+def _keep_from(tokens: List[int], max_messages: int, token_budget: int) -> int:
+    """Index of the oldest message that still fits, always keeping the newest one."""
+    start = max(0, len(tokens) - max_messages)
+    total = sum(tokens[start:])
+    while start < len(tokens) - 1 and total > token_budget:
+        total -= tokens[start]
+        start += 1
+    return start
+
+
+class SessionStore(ABC):
+    def __init__(
+        self, max_turns: int, max_sessions: int, ttl_s: float, token_budget: int, summary_tokens: int = 200
+    ) -> None:
+        self.max_messages = max_turns * 2
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+
+    @abstractmethod
+    def extend(self, session_id: str, messages: Iterable[Tuple[str, str]]) -> None:
+        ...
 
     def append(self, session_id: str, role: str, content: str) -> None:
-        self._store[session_id].append({"role": role, "content": content})
+        self.extend(session_id, [(role, content)])
 
+    @abstractmethod
     def get(self, session_id: str) -> list[dict[str, str]]:
-        return list(self._store.get(session_id, []))
+        ...
+
+    @abstractmethod
+    def summary(self, session_id: str) -> str:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        ...
+
+
+class _Session:
+    __slots__ = ("messages", "summary", "tokens", "size", "expires_at")
+
+    def __init__(self) -> None:
+        self.messages: Deque[Message] = deque()
+        self.summary = ""
+        self.tokens = 0
+        self.size = 0
+        self.expires_at = 0.0
+
+
+class InProcessSessionStore(SessionStore):
+    def __init__(
+        self, max_turns: int, max_sessions: int, ttl_s: float, token_budget: int, summary_tokens: int = 200
+    ) -> None:
+        super().__init__(max_turns, max_sessions, ttl_s, token_budget, summary_tokens)
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._size -= session.size
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            self._drop(session_id)
+
+    def extend(self, session_id: str, messages: Iterable[Tuple[str, str]]) -> None:
+        records = [Message(role, content) for role, content in messages]
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+            self._sessions.move_to_end(session_id)
+            session.expires_at = now + self.ttl_s
+            for record in records:
+                session.messages.append(record)
+                session.tokens += record.tokens
+                session.size += record.size
+                self._size += record.size
+            drop = _keep_from([record.tokens for record in session.messages], self.max_messages, self.token_budget)
+            dropped = [session.messages.popleft() for _ in range(drop)]
+            for record in dropped:
+                session.tokens -= record.tokens
+                session.size -= record.size
+                self._size -= record.size
+            if dropped:
+                previous = len(session.summary.encode("utf-8"))
+                session.summary = fold_summary(
+                    session.summary, [(record.role, record.content) for record in dropped], self.summary_tokens
+                )
+                growth = len(session.summary.encode("utf-8")) - previous
+                session.size += growth
+                self._size += growth
+            self._expire(now)
+
+    def get(self, session_id: str) -> list[dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if session.expires_at <= now:
+                self._drop(session_id)
+                return []
+            self._sessions.move_to_end(session_id)
+            session.expires_at = now + self.ttl_s
+            return [record.as_dict() for record in session.messages]
+
+    def summary(self, session_id: str) -> str:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.expires_at <= time.monotonic():
+                return ""
+            return session.summary
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"sessions": len(self._sessions), "bytes": self._size}
+
+
+class SqliteSessionStore(SessionStore):
+    def __init__(
+        self, max_turns: int, max_sessions: int, ttl_s: float, token_budget: int, summary_tokens: int = 200
+    ) -> None:
+        super().__init__(max_turns, max_sessions, ttl_s, token_budget, summary_tokens)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def extend(self, session_id: str, messages: Iterable[Tuple[str, str]]) -> None:
+        records = [Message(role, content) for role, content in messages]
+        now = time.time()
+        conn = get_connection()
+        with conn:
+            # Take the write lock before reading MAX(seq), so concurrent appends from other workers queue up
+            # behind busy_timeout instead of racing for the same seq.
+            conn.execute("BEGIN IMMEDIATE")
+            last = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM session_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO session_messages (session_id, seq, role, content, tokens, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (session_id, last + offset, record.role, record.content, record.tokens, now)
+                    for offset, record in enumerate(records, start=1)
+                ],
+            )
+            rows = conn.execute(
+                "SELECT seq, role, content, tokens FROM session_messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+            summary = rows[0]["content"] if rows and rows[0]["seq"] == _SUMMARY_SEQ else ""
+            messages = [row for row in rows if row["seq"] != _SUMMARY_SEQ]
+            start = _keep_from([row["tokens"] for row in messages], self.max_messages, self.token_budget)
+            if start:
+                summary = fold_summary(
+                    summary, [(row["role"], row["content"]) for row in messages[:start]], self.summary_tokens
+                )
+                conn.execute(
+                    "DELETE FROM session_messages WHERE session_id = ? AND seq > ? AND seq < ?",
+                    (session_id, _SUMMARY_SEQ, messages[start]["seq"]),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_messages (session_id, seq, role, content, tokens, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (session_id, _SUMMARY_SEQ, "summary", summary, count_tokens(summary), now),
+                )
+        conn.close()
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % _PURGE_EVERY == 0
+        if purge:
+            self.purge()
+
+    def get(self, session_id: str) -> list[dict[str, str]]:
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT role, content, created_at FROM session_messages WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, _SUMMARY_SEQ),
+        ).fetchall()
+        conn.close()
+        if not rows or rows[-1]["created_at"] < time.time() - self.ttl_s:
+            return []
+        return [{"role": row["role"], "content": row["content"]} for row in rows]
+
+    def summary(self, session_id: str) -> str:
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT content, created_at FROM session_messages WHERE session_id = ? AND seq = ?",
+            (session_id, _SUMMARY_SEQ),
+        ).fetchone()
+        conn.close()
+        if row is None or row["created_at"] < time.time() - self.ttl_s:
+            return ""
+        return row["content"]
+
+    def purge(self) -> None:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM session_messages WHERE session_id IN "
+                "(SELECT session_id FROM session_messages GROUP BY session_id HAVING MAX(created_at) < ?)",
+                (time.time() - self.ttl_s,),
+            )
+            conn.execute(
+                "DELETE FROM session_messages WHERE session_id IN "
+                "(SELECT session_id FROM session_messages GROUP BY session_id "
+                "ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+        conn.close()
+
+    def stats(self) -> dict[str, int]:
+        conn = get_connection()
+        row = conn.execute(
+            "SELECT COUNT(DISTINCT session_id), COALESCE(SUM(LENGTH(role) + LENGTH(CAST(content AS BLOB))), 0) "
+            "FROM session_messages WHERE created_at >= ?",
+            (time.time() - self.ttl_s,),
+        ).fetchone()
+        conn.close()
+        return {"sessions": row[0], "bytes": row[1]}
+
+
+_BACKENDS = {"memory": InProcessSessionStore, "sqlite": SqliteSessionStore}
+
+_session_store: SessionStore | None = None
 
 
-session_memory = SessionMemory()
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        backend = _BACKENDS.get(config.settings.session_backend)
+        if backend is None:
+            raise ValueError(f"Unknown session backend: {config.settings.session_backend}")
+        _session_store = backend(
+            config.settings.session_max_turns,
+            config.settings.session_max_sessions,
+            config.settings.session_ttl_s,
+            config.settings.session_token_budget,
+            config.settings.session_summary_tokens,
+        )
+    return _session_store
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import re
+from typing import List, Tuple
+
+from tourassist.app import config
+from tourassist.app.agents.memory import fold_summary, get_session_store
+from tourassist.app.agents.tokenizer import count_tokens, get_tokenizer
+
+_MESSAGE_OVERHEAD = 4
+_OVERLAP_THRESHOLD = 0.8
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _overlaps(words: set[str], selected: List[set[str]]) -> bool:
+    return any(len(words & other) >= _OVERLAP_THRESHOLD * min(len(words), len(other)) for other in selected)
+
+
+def pack_context(retrieved: list[dict], budget: int) -> list[dict]:
+    """Highest-scoring chunks first, skipping near-duplicates, until ``budget`` tokens are used."""
+    ordered = sorted(
+        (item for item in retrieved if item.get("text")), key=lambda item: item.get("score") or 0.0, reverse=True
+    )
+    packed: list[dict] = []
+    selected: List[set[str]] = []
+    used = 0
+    for item in ordered:
+        remaining = budget - used
+        if remaining <= 0:
+            break
+        words = set(_WORD_RE.findall(item["text"].lower()))
+        if not words or _overlaps(words, selected):
+            continue
+        tokens = count_tokens(item["text"])
+        if tokens > remaining:
+            if packed:
+                continue
+            item = dict(item, text=get_tokenizer().truncate(item["text"], remaining))
+            tokens = remaining
+        packed.append(item)
+        selected.append(words)
+        used += tokens
+    return packed
+
+
+def fit_history(history: list[dict[str, str]], summary: str, budget: int) -> Tuple[str, list[dict[str, str]]]:
+    """Keep the newest turns within ``budget`` and fold the older ones into the summary."""
+    used = count_tokens(summary) if summary else 0
+    kept = 0
+    for message in reversed(history):
+        tokens = count_tokens(message["content"]) + _MESSAGE_OVERHEAD
+        if used + tokens > budget:
+            break
+        used += tokens
+        kept += 1
+    older = history[: len(history) - kept]
+    if older:
+        folded = [(message["role"], message["content"]) for message in older]
+        summary = fold_summary(summary, folded, config.settings.session_summary_tokens)
+    return summary, history[len(history) - kept :]
+
+
+def build_messages(
+    system_prompt: str, session_id: str, retrieved: list[dict], user_message: str
+) -> list[dict[str, str]]:
+    store = get_session_store()
+    summary, history = fit_history(
+        store.get(session_id), store.summary(session_id), config.settings.prompt_history_budget
+    )
+    context = "\n".join(item["text"] for item in pack_context(retrieved, config.settings.prompt_context_budget))
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    messages.extend(history)
+    messages.append({"role": "user", "content": f"Context:\n{context}\n\nQuestion: {user_message}"})
+    return messages
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+import httpx
+
+from tourassist.app.observability.metrics import Sketch
+
+_RETRY_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets one probe through after ``reset_after_s``."""
+
+    def __init__(self, failure_threshold: int, reset_after_s: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_after_s:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_after_s:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """End an aborted call without an outcome, so a cancelled half-open probe doesn't block later ones."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class LatencyTracker:
+    """Recent-latency p95 for hedging, kept in two rotating sketches so it follows the provider's current speed."""
+
+    def __init__(self, min_delay_ms: float, rotate_every: int = 500, min_samples: int = 20) -> None:
+        self.min_delay_ms = min_delay_ms
+        self.rotate_every = rotate_every
+        self.min_samples = min_samples
+        self._current = Sketch()
+        self._previous = Sketch()
+        self._p95_ms: float | None = None
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float) -> None:
+        with self._lock:
+            self._current.add(latency_ms)
+            if self._current.count >= self.rotate_every:
+                self._previous, self._current = self._current, Sketch()
+            if self._current.count % 25 == 0:
+                self._refresh()
+
+    def _refresh(self) -> None:
+        combined = Sketch()
+        combined.merge(self._previous)
+        combined.merge(self._current)
+        self._p95_ms = combined.quantile(0.95) if combined.count >= self.min_samples else None
+
+    def hedge_delay_s(self) -> float | None:
+        """Seconds to wait before hedging, or None until enough calls have been seen."""
+        p95 = self._p95_ms
+        if p95 is None:
+            return None
+        return max(p95, self.min_delay_ms) / 1000
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUSES
+    return isinstance(exc, (httpx.TransportError, httpx.TimeoutException))
+
+
+def backoff_delay(attempt: int, base_s: float, cap_s: float, exc: BaseException | None = None) -> float:
+    """Full-jitter exponential backoff, stretched to honour a 429/503 ``Retry-After`` up to ``cap_s``."""
+    delay = random.uniform(0, min(cap_s, base_s * 2**attempt))
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After", "")
+        try:
+            delay = max(delay, min(cap_s, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
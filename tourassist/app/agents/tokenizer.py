@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List
+
+from tourassist.app import config
+
+_PIECE_RE = re.compile(r"\d{1,3}|[^\W\d_]+|[^\w\s]|_", re.UNICODE)
+_CHARS_PER_PIECE = 4
+
+
+class Tokenizer(ABC):
+    @abstractmethod
+    def encode(self, text: str) -> List[str]:
+        ...
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int) -> str:
+        ...
+
+
+class OfflineTokenizer(Tokenizer):
+    """Approximates a BPE vocabulary: short words, digit triples and punctuation are one token each."""
+
+    def _spans(self, text: str) -> List[tuple[int, int]]:
+        spans = []
+        for match in _PIECE_RE.finditer(text):
+            start, end = match.span()
+            while end - start > _CHARS_PER_PIECE:
+                spans.append((start, start + _CHARS_PER_PIECE))
+                start += _CHARS_PER_PIECE
+            spans.append((start, end))
+        return spans
+
+    def encode(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self._spans(text)]
+
+    def count(self, text: str) -> int:
+        return len(self._spans(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        spans = self._spans(text)
+        if len(spans) <= max_tokens:
+            return text
+        return text[: spans[max_tokens - 1][1]]
+
+
+class TiktokenTokenizer(Tokenizer):
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        try:
+            import tiktoken
+        except ImportError as exc:
+            raise ValueError("The tiktoken tokenizer requires the tiktoken package") from exc
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def encode(self, text: str) -> List[str]:
+        return [self._encoding.decode([token]) for token in self._encoding.encode(text)]
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self._encoding.encode(text)
+        return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[: max(0, max_tokens)])
+
+
+_TOKENIZERS: Dict[str, Callable[[], Tokenizer]] = {"offline": OfflineTokenizer, "tiktoken": TiktokenTokenizer}
+
+_tokenizer: Tokenizer | None = None
+
+
+def register_tokenizer(name: str, factory: Callable[[], Tokenizer]) -> None:
+    _TOKENIZERS[name] = factory
+
+
+def get_tokenizer() -> Tokenizer:
+    global _tokenizer
+    if _tokenizer is None:
+        factory = _TOKENIZERS.get(config.settings.tokenizer)
+        if factory is None:
+            raise ValueError(f"Unknown tokenizer: {config.settings.tokenizer}")
+        _tokenizer = factory()
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    return max(1, get_tokenizer().count(text))
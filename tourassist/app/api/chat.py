@@ -1,25 +1,39 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Header, HTTPException, status
+import json
+from typing import Any, AsyncIterator
 
-from tourassist.app.agents.chat import handle_chat
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from tourassist.app.agents.chat import handle_chat_async, stream_chat
 from tourassist.app.models.schemas import ChatRequest, ChatResponse
-from tourassist.app.security.auth import enforce_api_key
+from tourassist.app.security.auth import enforce_api_key_async
 
 router = APIRouter()
 
 
-@router.post("/chat", response_model=ChatResponse)
-def chat_endpoint(
-    payload: ChatRequest,
-    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
-) -> ChatResponse:
+def _validate_message(payload: ChatRequest) -> None:
     if len(payload.user_message.strip()) == 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty message")
     if len(payload.user_message) > 2000:
         raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Message too long")
-    enforce_api_key(payload.tenant_id, x_api_key)
-    response, latency_ms, tokens_used, cost, retrieved_doc_ids = handle_chat(
+
+
+async def _sse(events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(
+    payload: ChatRequest,
+    request: Request,
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+) -> ChatResponse:
+    _validate_message(payload)
+    await enforce_api_key_async(payload.tenant_id, x_api_key, request)
+    response, latency_ms, tokens_used, cost, retrieved_doc_ids = await handle_chat_async(
         payload.tenant_id, payload.session_id, payload.user_message
     )
     return ChatResponse(
@@ -29,3 +43,18 @@ def chat_endpoint(
         estimated_cost=cost,
         retrieved_doc_ids=retrieved_doc_ids,
     )
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    payload: ChatRequest,
+    request: Request,
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+) -> StreamingResponse:
+    _validate_message(payload)
+    await enforce_api_key_async(payload.tenant_id, x_api_key, request)
+    return StreamingResponse(
+        _sse(stream_chat(payload.tenant_id, payload.session_id, payload.user_message)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,34 +1,186 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+import asyncio
+import hashlib
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, List, Tuple
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 
 from tourassist.app import config
-from tourassist.app.models.schemas import IngestResponse
-from tourassist.app.rag.ingestion import ingest_document
+from tourassist.app.models.db import get_connection
+from tourassist.app.models.schemas import BulkIngestResult, DocumentStatusResponse, IngestResponse
+from tourassist.app.rag.jobs import get_ingest_queue
 from tourassist.app.security.auth import require_api_key
 
 router = APIRouter()
 
 
-def _validate_file(file: UploadFile, data: bytes) -> None:
+_SPOOL_BLOCK = 1024 * 1024
+_DOCUMENT_SUFFIXES = (".pdf", ".txt", ".md")
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+
+
+def _validate_file(file: UploadFile) -> None:
     if file.filename is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing filename")
-    if not file.filename.lower().endswith((".pdf", ".txt", ".md")):
+    if not file.filename.lower().endswith(_DOCUMENT_SUFFIXES):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type")
-    size_mb = len(data) / (1024 * 1024)
-    if size_mb > config.settings.max_file_size_mb:
-        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
 
 
-@router.post("/ingest", response_model=IngestResponse)
+def _check_tenant(tenant_id: str, request: Request) -> None:
+    # require_api_key authorizes the query tenant_id; the form value must name the same tenant.
+    if len(tenant_id.strip()) < 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid tenant ID")
+    if tenant_id != request.query_params.get("tenant_id"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tenant mismatch")
+
+
+def _spool_upload(source: BinaryIO) -> Tuple[Path, str]:
+    limit = config.settings.max_file_size_mb * 1024 * 1024
+    path = get_ingest_queue().spool_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with path.open("wb") as handle:
+            while block := source.read(_SPOOL_BLOCK):
+                size += len(block)
+                if size > limit:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+                digest.update(block)
+                handle.write(block)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
+
+
+@router.post("/ingest", response_model=IngestResponse, status_code=status.HTTP_202_ACCEPTED)
 async def ingest_endpoint(
+    request: Request,
     tenant_id: str = Form(...),
     file: UploadFile = File(...),
     _api_key: str = Depends(require_api_key),
 ) -> IngestResponse:
-    if len(tenant_id.strip()) < 2:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid tenant ID")
-    raw = await file.read()
-    _validate_file(file, raw)
-    document_id, chunks, status_value = ingest_document(tenant_id, file.filename, raw)
-    return IngestResponse(document_id=document_id, status=status_value, chunks_indexed=chunks)
+    _check_tenant(tenant_id, request)
+    _validate_file(file)
+    spooled, content_hash = await asyncio.to_thread(_spool_upload, file.file)
+    document_id, status_value = await asyncio.to_thread(
+        get_ingest_queue().enqueue, tenant_id, file.filename, spooled, content_hash
+    )
+    return IngestResponse(document_id=document_id, status=status_value, chunks_indexed=0)
+
+
+def _member_name(name: str) -> str:
+    return "/".join(part for part in PurePosixPath(name).parts if part not in ("/", ".", ".."))
+
+
+def _iter_members(upload: UploadFile) -> Iterator[Tuple[str, BinaryIO]]:
+    """Yield ``(filename, stream)`` for a plain upload or for each regular file inside a zip or tar archive."""
+    name = (upload.filename or "").lower()
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(upload.file) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield _member_name(info.filename), member
+    elif name.endswith(_TAR_SUFFIXES):
+        with tarfile.open(fileobj=upload.file, mode="r|*") as archive:
+            for info in archive:
+                member = archive.extractfile(info) if info.isfile() else None
+                if member is not None:
+                    yield _member_name(info.name), member
+    else:
+        yield upload.filename or "", upload.file
+
+
+def _rejected(filename: str, error: str) -> BulkIngestResult:
+    return BulkIngestResult(filename=filename, status="rejected", error=error)
+
+
+def _ingest_batch(tenant_id: str, files: List[UploadFile]) -> List[BulkIngestResult]:
+    results: List[BulkIngestResult] = []
+    accepted: List[Tuple[int, Tuple[str, Path, str]]] = []
+    limit = config.settings.ingest_bulk_max_files
+    try:
+        for upload in files:
+            try:
+                for filename, stream in _iter_members(upload):
+                    if not filename.lower().endswith(_DOCUMENT_SUFFIXES):
+                        results.append(_rejected(filename, "Unsupported file type"))
+                    elif len(accepted) >= limit:
+                        results.append(_rejected(filename, "Too many files"))
+                    else:
+                        try:
+                            spooled, content_hash = _spool_upload(stream)
+                        except HTTPException as exc:
+                            results.append(_rejected(filename, exc.detail))
+                            continue
+                        accepted.append((len(results), (filename, spooled, content_hash)))
+                        results.append(BulkIngestResult(filename=filename, status="queued"))
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError) as exc:
+                results.append(_rejected(upload.filename or "", f"Unreadable archive: {exc}"))
+        registered = get_ingest_queue().enqueue_batch(tenant_id, [upload for _, upload in accepted])
+    except BaseException:
+        for _, (_, spooled, _) in accepted:
+            spooled.unlink(missing_ok=True)
+        raise
+    for (position, _), (document_id, status_value, created) in zip(accepted, registered):
+        result = results[position]
+        result.document_id = document_id
+        result.status = status_value
+        result.deduplicated = not created
+    return results
+
+
+@router.post("/ingest/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def bulk_ingest_endpoint(
+    request: Request,
+    tenant_id: str = Form(...),
+    files: List[UploadFile] = File(...),
+    _api_key: str = Depends(require_api_key),
+) -> StreamingResponse:
+    _check_tenant(tenant_id, request)
+    results = await asyncio.to_thread(_ingest_batch, tenant_id, files)
+    return StreamingResponse(
+        (result.model_dump_json() + "\n" for result in results),
+        status_code=status.HTTP_202_ACCEPTED,
+        media_type="application/x-ndjson",
+    )
+
+
+def _document_status(tenant_id: str, document_id: str) -> DocumentStatusResponse | None:
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT document_id, tenant_id, filename, status, error, version, "
+        "(SELECT COUNT(*) FROM chunks WHERE chunks.document_id = documents.document_id) AS chunk_count "
+        "FROM documents WHERE document_id = ? AND tenant_id = ?",
+        (document_id, tenant_id),
+    ).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return DocumentStatusResponse(
+        document_id=row["document_id"],
+        tenant_id=row["tenant_id"],
+        filename=row["filename"],
+        status=row["status"],
+        chunks_indexed=row["chunk_count"],
+        version=row["version"],
+        error=row["error"],
+    )
+
+
+@router.get("/documents/{document_id}", response_model=DocumentStatusResponse)
+def document_status_endpoint(
+    document_id: str,
+    tenant_id: str,
+    _api_key: str = Depends(require_api_key),
+) -> DocumentStatusResponse:
+    document = _document_status(tenant_id, document_id)
+    if document is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    return document
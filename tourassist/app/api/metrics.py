@@ -1,15 +1,41 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 
+from tourassist.app.agents.answer_cache import get_answer_cache
+from tourassist.app.agents.memory import get_session_store
+from tourassist.app.observability.aggregation import get_metrics_aggregator
 from tourassist.app.observability.metrics import metrics_store
+from tourassist.app.rag.embedding_cache import get_embedding_cache
 
 router = APIRouter()
 
+_PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
 
 @router.get("/metrics")
-def metrics_endpoint() -> dict[str, float]:
+def metrics_endpoint() -> dict[str, Any]:
+    sessions = get_session_store().stats()
+    view = get_metrics_aggregator().collect()
     return {
-        "latency_p50_ms": metrics_store.latency_p50(),
-        "latency_p95_ms": metrics_store.latency_p95(),
+        "window_s": metrics_store.window_s,
+        "latency_p50_ms": view.latency_p50(),
+        "latency_p95_ms": view.latency_p95(),
+        "tokens_total": view.totals("tokens_total"),
+        "cost_total": view.totals("cost_total"),
+        "embedding_cache_hit_rate": get_embedding_cache().stats()["hit_rate"],
+        "answer_cache_hit_rate": get_answer_cache().stats()["hit_rate"],
+        "session_count": sessions["sessions"],
+        "session_bytes": sessions["bytes"],
+        **view.stage_latencies(),
+        "stage_histograms_ms": view.stage_histograms(),
+        "llm_backends": view.backend_stats(),
     }
+
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+def prometheus_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(get_metrics_aggregator().collect().prometheus(), media_type=_PROMETHEUS_CONTENT_TYPE)
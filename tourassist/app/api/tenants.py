@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
 from tourassist.app.models.schemas import TenantCreateRequest, TenantCreateResponse
 from tourassist.app.models.db import get_connection
-from tourassist.app.security.auth import create_tenant
+from tourassist.app.security.auth import create_tenant, require_api_key, revoke_api_key, rotate_api_key
 
 router = APIRouter()
 
@@ -21,3 +21,14 @@ def create_tenant_endpoint(payload: TenantCreateRequest) -> TenantCreateResponse
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tenant already exists")
     data = create_tenant(payload.tenant_id)
     return TenantCreateResponse(**data)
+
+
+@router.post("/tenants/{tenant_id}/api-key", response_model=TenantCreateResponse)
+def rotate_api_key_endpoint(tenant_id: str, _api_key: str = Depends(require_api_key)) -> TenantCreateResponse:
+    return TenantCreateResponse(**rotate_api_key(tenant_id))
+
+
+@router.delete("/tenants/{tenant_id}/api-key", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_api_key_endpoint(tenant_id: str, _api_key: str = Depends(require_api_key)) -> Response:
+    revoke_api_key(tenant_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Tuple, TypeVar
+
+from tourassist.app.observability.metrics import metrics_store
+
+T = TypeVar("T")
+
+_sharing: ContextVar[bool] = ContextVar("answer_sharing", default=True)
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def sharing_enabled() -> bool:
+    return _sharing.get()
+
+
+@contextmanager
+def no_sharing() -> Iterator[None]:
+    """Turns off the answer cache and request coalescing for the current context only.
+
+    Tasks started inside the block inherit it; other requests in the same process are unaffected.
+    """
+    token = _sharing.set(False)
+    try:
+        yield
+    finally:
+        _sharing.reset(token)
+
+
+def _count(flight: str, leaders: int, followers: int) -> None:
+    if leaders:
+        metrics_store.increment("singleflight_calls_total", leaders, flight=flight, role="leader")
+    if followers:
+        metrics_store.increment("singleflight_calls_total", followers, flight=flight, role="follower")
+
+
+class AsyncSingleFlight(Generic[T]):
+    """Runs one call per key at a time on the event loop; callers arriving meanwhile await its result.
+
+    The shared call runs as its own task and every caller awaits it through ``asyncio.shield``, so a caller
+    that times out or disconnects leaves the call running for the others.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._tasks: Dict[Hashable, "asyncio.Task[Dict[Hashable, T]]"] = {}
+
+    def _live(self, key: Hashable, loop: asyncio.AbstractEventLoop) -> "asyncio.Task[Dict[Hashable, T]] | None":
+        task = self._tasks.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            return None
+        return task
+
+    def _forget(self, keys: List[Hashable], task: "asyncio.Task[Dict[Hashable, T]]") -> None:
+        for key in keys:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        async def run(keys: List[Hashable]) -> Dict[Hashable, T]:
+            return {key: await factory()}
+
+        return (await self.do_many([key], run))[key]
+
+    async def do_many(
+        self, keys: Iterable[Hashable], factory: Callable[[List[Hashable]], Awaitable[Dict[Hashable, T]]]
+    ) -> Dict[Hashable, T]:
+        loop = asyncio.get_running_loop()
+        owned: List[Hashable] = []
+        waiting: List[Tuple[Hashable, "asyncio.Task[Dict[Hashable, T]]"]] = []
+        for key in dict.fromkeys(keys):
+            task = self._live(key, loop)
+            if task is None:
+                owned.append(key)
+            else:
+                waiting.append((key, task))
+        _count(self.name, len(owned), len(waiting))
+        if owned:
+            task = loop.create_task(factory(owned))
+            for key in owned:
+                self._tasks[key] = task
+            task.add_done_callback(lambda done, keys=owned: self._forget(keys, done))
+            waiting.extend((key, task) for key in owned)
+        results: Dict[Hashable, T] = {}
+        shared: Dict[int, Dict[Hashable, T]] = {}
+        for key, task in waiting:
+            if id(task) not in shared:
+                shared[id(task)] = await asyncio.shield(task)
+            results[key] = shared[id(task)][key]
+        return results
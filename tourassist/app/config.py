@@ -20,6 +20,71 @@ class Settings:
     top_k: int
     max_file_size_mb: int
     eval_timeout_s: int
+    chunk_overlap_chars: int = 0
+    chunk_max_tokens: int = 0
+    embed_batch_size: int = 64
+    embed_batch_max_tokens: int = 8000
+    embed_timeout_s: float = 20.0
+    embed_cache_lru_size: int = 4096
+    embed_cache_max_rows: int = 200_000
+    embed_cache_max_age_s: int = 30 * 24 * 3600
+    auth_timeout_s: float = 2.0
+    retrieval_timeout_s: float = 5.0
+    llm_timeout_s: float = 20.0
+    llm_max_in_flight: int = 64
+    llm_max_retries: int = 2
+    llm_retry_base_ms: float = 200.0
+    llm_retry_max_ms: float = 2000.0
+    llm_hedge: bool = False
+    llm_hedge_min_ms: float = 250.0
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_s: float = 30.0
+    llm_http2: bool = True
+    llm_backends: str = ""
+    llm_route_max_query_tokens: int = 24
+    llm_route_min_confidence: float = 0.5
+    llm_route_cheap_share: float = 0.5
+    coalesce_requests: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_s: int = 3600
+    answer_cache_max_entries: int = 512
+    cache_sync_interval_s: float = 1.0
+    ingest_workers: int = 2
+    ingest_window_size: int = 128
+    ingest_batch_documents: int = 32
+    ingest_bulk_max_files: int = 10_000
+    vector_backend: str = "qdrant"
+    db_pool_size: int = 16
+    auth_cache_ttl_s: float = 60.0
+    auth_negative_ttl_s: float = 5.0
+    auth_max_failures: int = 10
+    auth_failure_window_s: float = 60.0
+    db_busy_timeout_ms: int = 5000
+    db_cache_size_kib: int = 20_000
+    db_mmap_size: int = 256 * 1024 * 1024
+    pdf_workers: int = max(1, os.cpu_count() or 1)
+    pdf_pages_per_task: int = 4
+    pdf_parallel_min_pages: int = 8
+    pdf_page_timeout_s: float = 10.0
+    hybrid_search: bool = True
+    rrf_k: int = 60
+    session_backend: str = "memory"
+    session_max_turns: int = 4
+    session_max_sessions: int = 10_000
+    session_ttl_s: float = 3600.0
+    session_token_budget: int = 2000
+    session_summary_tokens: int = 200
+    tokenizer: str = "offline"
+    prompt_context_budget: int = 1200
+    prompt_history_budget: int = 600
+    eval_concurrency: int = 8
+    tracing_exporter: str = "none"
+    tracing_file: str = ""
+    metrics_window_s: float = 60.0
+    metrics_window_slots: int = 6
+    metrics_backend: str = "local"
+    metrics_flush_s: float = 2.0
+    metrics_worker_retention_s: float = 3600.0
 
 
 _DEF_DATA_DIR = Path(os.getenv("TOURASSIST_DATA_DIR", "./data"))
@@ -38,6 +103,71 @@ settings = Settings(
     top_k=int(os.getenv("TOURASSIST_TOP_K", "4")),
     max_file_size_mb=int(os.getenv("TOURASSIST_MAX_FILE_SIZE_MB", "10")),
     eval_timeout_s=int(os.getenv("TOURASSIST_EVAL_TIMEOUT_S", "20")),
+    chunk_overlap_chars=int(os.getenv("TOURASSIST_CHUNK_OVERLAP_CHARS", "0")),
+    chunk_max_tokens=int(os.getenv("TOURASSIST_CHUNK_MAX_TOKENS", "0")),
+    embed_batch_size=int(os.getenv("TOURASSIST_EMBED_BATCH_SIZE", "64")),
+    embed_batch_max_tokens=int(os.getenv("TOURASSIST_EMBED_BATCH_MAX_TOKENS", "8000")),
+    embed_timeout_s=float(os.getenv("TOURASSIST_EMBED_TIMEOUT_S", "20")),
+    embed_cache_lru_size=int(os.getenv("TOURASSIST_EMBED_CACHE_LRU_SIZE", "4096")),
+    embed_cache_max_rows=int(os.getenv("TOURASSIST_EMBED_CACHE_MAX_ROWS", "200000")),
+    embed_cache_max_age_s=int(os.getenv("TOURASSIST_EMBED_CACHE_MAX_AGE_S", str(30 * 24 * 3600))),
+    auth_timeout_s=float(os.getenv("TOURASSIST_AUTH_TIMEOUT_S", "2")),
+    retrieval_timeout_s=float(os.getenv("TOURASSIST_RETRIEVAL_TIMEOUT_S", "5")),
+    llm_timeout_s=float(os.getenv("TOURASSIST_LLM_TIMEOUT_S", "20")),
+    llm_max_in_flight=int(os.getenv("TOURASSIST_LLM_MAX_IN_FLIGHT", "64")),
+    llm_max_retries=int(os.getenv("TOURASSIST_LLM_MAX_RETRIES", "2")),
+    llm_retry_base_ms=float(os.getenv("TOURASSIST_LLM_RETRY_BASE_MS", "200")),
+    llm_retry_max_ms=float(os.getenv("TOURASSIST_LLM_RETRY_MAX_MS", "2000")),
+    llm_hedge=os.getenv("TOURASSIST_LLM_HEDGE", "0").lower() in ("1", "true", "yes"),
+    llm_hedge_min_ms=float(os.getenv("TOURASSIST_LLM_HEDGE_MIN_MS", "250")),
+    llm_breaker_failures=int(os.getenv("TOURASSIST_LLM_BREAKER_FAILURES", "5")),
+    llm_breaker_reset_s=float(os.getenv("TOURASSIST_LLM_BREAKER_RESET_S", "30")),
+    llm_http2=os.getenv("TOURASSIST_LLM_HTTP2", "1").lower() not in ("0", "false", "no"),
+    llm_backends=os.getenv("TOURASSIST_LLM_BACKENDS", ""),
+    llm_route_max_query_tokens=int(os.getenv("TOURASSIST_LLM_ROUTE_MAX_QUERY_TOKENS", "24")),
+    llm_route_min_confidence=float(os.getenv("TOURASSIST_LLM_ROUTE_MIN_CONFIDENCE", "0.5")),
+    llm_route_cheap_share=float(os.getenv("TOURASSIST_LLM_ROUTE_CHEAP_SHARE", "0.5")),
+    coalesce_requests=os.getenv("TOURASSIST_COALESCE_REQUESTS", "1").lower() not in ("0", "false", "no"),
+    answer_cache_threshold=float(os.getenv("TOURASSIST_ANSWER_CACHE_THRESHOLD", "0.95")),
+    answer_cache_ttl_s=int(os.getenv("TOURASSIST_ANSWER_CACHE_TTL_S", "3600")),
+    answer_cache_max_entries=int(os.getenv("TOURASSIST_ANSWER_CACHE_MAX_ENTRIES", "512")),
+    cache_sync_interval_s=float(os.getenv("TOURASSIST_CACHE_SYNC_INTERVAL_S", "1")),
+    ingest_workers=int(os.getenv("TOURASSIST_INGEST_WORKERS", "2")),
+    ingest_window_size=int(os.getenv("TOURASSIST_INGEST_WINDOW_SIZE", "128")),
+    ingest_batch_documents=int(os.getenv("TOURASSIST_INGEST_BATCH_DOCUMENTS", "32")),
+    ingest_bulk_max_files=int(os.getenv("TOURASSIST_INGEST_BULK_MAX_FILES", "10000")),
+    vector_backend=os.getenv("TOURASSIST_VECTOR_BACKEND", "qdrant"),
+    db_pool_size=int(os.getenv("TOURASSIST_DB_POOL_SIZE", "16")),
+    auth_cache_ttl_s=float(os.getenv("TOURASSIST_AUTH_CACHE_TTL_S", "60")),
+    auth_negative_ttl_s=float(os.getenv("TOURASSIST_AUTH_NEGATIVE_TTL_S", "5")),
+    auth_max_failures=int(os.getenv("TOURASSIST_AUTH_MAX_FAILURES", "10")),
+    auth_failure_window_s=float(os.getenv("TOURASSIST_AUTH_FAILURE_WINDOW_S", "60")),
+    db_busy_timeout_ms=int(os.getenv("TOURASSIST_DB_BUSY_TIMEOUT_MS", "5000")),
+    db_cache_size_kib=int(os.getenv("TOURASSIST_DB_CACHE_SIZE_KIB", "20000")),
+    db_mmap_size=int(os.getenv("TOURASSIST_DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    pdf_workers=int(os.getenv("TOURASSIST_PDF_WORKERS", str(max(1, os.cpu_count() or 1)))),
+    pdf_pages_per_task=int(os.getenv("TOURASSIST_PDF_PAGES_PER_TASK", "4")),
+    pdf_parallel_min_pages=int(os.getenv("TOURASSIST_PDF_PARALLEL_MIN_PAGES", "8")),
+    pdf_page_timeout_s=float(os.getenv("TOURASSIST_PDF_PAGE_TIMEOUT_S", "10")),
+    hybrid_search=os.getenv("TOURASSIST_HYBRID_SEARCH", "1").lower() not in ("0", "false", "no"),
+    rrf_k=int(os.getenv("TOURASSIST_RRF_K", "60")),
+    session_backend=os.getenv("TOURASSIST_SESSION_BACKEND", "memory"),
+    session_max_turns=int(os.getenv("TOURASSIST_SESSION_MAX_TURNS", "4")),
+    session_max_sessions=int(os.getenv("TOURASSIST_SESSION_MAX_SESSIONS", "10000")),
+    session_ttl_s=float(os.getenv("TOURASSIST_SESSION_TTL_S", "3600")),
+    session_token_budget=int(os.getenv("TOURASSIST_SESSION_TOKEN_BUDGET", "2000")),
+    session_summary_tokens=int(os.getenv("TOURASSIST_SESSION_SUMMARY_TOKENS", "200")),
+    tokenizer=os.getenv("TOURASSIST_TOKENIZER", "offline"),
+    prompt_context_budget=int(os.getenv("TOURASSIST_PROMPT_CONTEXT_BUDGET", "1200")),
+    prompt_history_budget=int(os.getenv("TOURASSIST_PROMPT_HISTORY_BUDGET", "600")),
+    eval_concurrency=int(os.getenv("TOURASSIST_EVAL_CONCURRENCY", "8")),
+    tracing_exporter=os.getenv("TOURASSIST_TRACING_EXPORTER", "none"),
+    tracing_file=os.getenv("TOURASSIST_TRACING_FILE", ""),
+    metrics_window_s=float(os.getenv("TOURASSIST_METRICS_WINDOW_S", "60")),
+    metrics_window_slots=int(os.getenv("TOURASSIST_METRICS_WINDOW_SLOTS", "6")),
+    metrics_backend=os.getenv("TOURASSIST_METRICS_BACKEND", "local"),
+    metrics_flush_s=float(os.getenv("TOURASSIST_METRICS_FLUSH_S", "2")),
+    metrics_worker_retention_s=float(os.getenv("TOURASSIST_METRICS_WORKER_RETENTION_S", "3600")),
 )
 
 settings.data_dir.mkdir(parents=True, exist_ok=True)
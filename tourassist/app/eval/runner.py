@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import time
 from pathlib import Path
 from statistics import mean
 from typing import Any, Dict, List
 
-from tourassist.app.agents.chat import handle_chat
-from tourassist.app.rag.retrieval import retrieve_context
+from tourassist.app import config
+from tourassist.app.agents import llm_client
+from tourassist.app.agents.chat import chat_with_context_async
+from tourassist.app.concurrency import no_sharing
+from tourassist.app.observability.logger import get_logger
+from tourassist.app.rag import embeddings, vector_store
+
+logger = get_logger(__name__)
 
 
 def _score_correctness(response: str, expected_facts: List[str]) -> float:
@@ -36,62 +44,129 @@ def _check_safety(response: str, safety_rules: List[str]) -> bool:
     return True
 
 
-def run_eval(tenant_id: str, cases_path: Path, output_dir: Path) -> Dict[str, Any]:
-    with cases_path.open("r", encoding="utf-8") as handle:
-        cases = json.load(handle)
+def _score_case(case: Dict[str, Any], response: str, retrieved: List[dict]) -> Dict[str, Any]:
+    sources = [item.get("source") or "" for item in retrieved]
+    safety_ok = _check_safety(response, case.get("safety", []))
+    return {
+        "response": response,
+        "correctness": _score_correctness(response, case["expected_facts"]),
+        "grounding": _score_grounding(response, sources, case["allowed_sources"]),
+        "retrieval_ok": any(src in case["allowed_sources"] for src in sources),
+        "safety_ok": safety_ok,
+    }
 
-    case_results = []
-    correctness_scores = []
-    grounding_scores = []
-    retrieval_pass = []
-    costs = []
-    latencies = []
-    safety_violations = 0
 
-    for case in cases:
-        start = time.perf_counter()
-        response, _, tokens_used, cost, _ = handle_chat(
-            tenant_id, f"eval-{case['id']}", case["question"]
-        )
-        latency_ms = (time.perf_counter() - start) * 1000
-        retrieval = retrieve_context(tenant_id, case["question"])
-        sources = [item.get("source", "") for item in retrieval]
-        retrieval_ok = any(src in case["allowed_sources"] for src in sources)
-        correctness = _score_correctness(response, case["expected_facts"])
-        grounding = _score_grounding(response, sources, case["allowed_sources"])
-        safety_ok = _check_safety(response, case.get("safety", []))
-        if not safety_ok:
-            safety_violations += 1
-
-        case_results.append(
-            {
-                "id": case["id"],
-                "response": response,
-                "correctness": correctness,
-                "grounding": grounding,
-                "retrieval_ok": retrieval_ok,
-                "latency_ms": latency_ms,
-                "tokens_used": tokens_used,
-                "estimated_cost": cost,
-                "safety_ok": safety_ok,
-            }
+def _failed_case(case: Dict[str, Any], error: str, latency_ms: float) -> Dict[str, Any]:
+    return {
+        "id": case["id"],
+        "response": "",
+        "correctness": 1.0,
+        "grounding": 0.0,
+        "retrieval_ok": False,
+        "latency_ms": latency_ms,
+        "tokens_used": 0,
+        "estimated_cost": 0.0,
+        "safety_ok": True,
+        "error": error,
+    }
+
+
+async def _run_case(tenant_id: str, case: Dict[str, Any], timeout_s: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        (response, _, tokens_used, cost, _), retrieved = await asyncio.wait_for(
+            chat_with_context_async(tenant_id, f"eval-{case['id']}", case["question"]), timeout_s
         )
-        correctness_scores.append(correctness)
-        grounding_scores.append(grounding)
-        retrieval_pass.append(1 if retrieval_ok else 0)
-        costs.append(cost)
-        latencies.append(latency_ms)
+    except asyncio.TimeoutError:
+        return _failed_case(case, "timeout", (time.perf_counter() - start) * 1000)
+    except Exception as exc:  # noqa: BLE001 - one broken case must not abort the run
+        return _failed_case(case, str(exc) or type(exc).__name__, (time.perf_counter() - start) * 1000)
+    latency_ms = (time.perf_counter() - start) * 1000
+    return {
+        "id": case["id"],
+        **_score_case(case, response, retrieved),
+        "latency_ms": latency_ms,
+        "tokens_used": tokens_used,
+        "estimated_cost": cost,
+    }
+
 
-    metrics = {
+def _load_checkpoint(path: Path, cases_sha256: str) -> Dict[str, Dict[str, Any]]:
+    done: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a torn final line from an interrupted run
+            if "cases_sha256" in record:
+                if record["cases_sha256"] != cases_sha256:
+                    raise ValueError(f"{path} was written for a different cases file; rerun with --fresh")
+                continue
+            done[record["id"]] = record
+    return done
+
+
+def _aggregate(case_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    correctness_scores = [result["correctness"] for result in case_results]
+    grounding_scores = [result["grounding"] for result in case_results]
+    retrieval_pass = [1 if result["retrieval_ok"] else 0 for result in case_results]
+    costs = [result["estimated_cost"] for result in case_results]
+    latencies = sorted(result["latency_ms"] for result in case_results)
+    return {
         "avg_correctness": mean(correctness_scores) if correctness_scores else 0.0,
         "grounding": mean(grounding_scores) if grounding_scores else 0.0,
         "retrieval_pass": mean(retrieval_pass) if retrieval_pass else 0.0,
-        "safety_violations": safety_violations,
-        "p95_latency_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+        "safety_violations": sum(1 for result in case_results if not result["safety_ok"]),
+        "errors": sum(1 for result in case_results if result.get("error")),
+        "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
         "mean_cost": mean(costs) if costs else 0.0,
     }
 
+
+async def run_eval_async(
+    tenant_id: str,
+    cases_path: Path,
+    output_dir: Path,
+    concurrency: int | None = None,
+    resume: bool = True,
+) -> Dict[str, Any]:
+    raw_cases = cases_path.read_bytes()
+    cases = json.loads(raw_cases)
+    cases_sha256 = hashlib.sha256(raw_cases).hexdigest()
+
     output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_dir / "checkpoint.jsonl"
+    if not resume:
+        checkpoint_path.unlink(missing_ok=True)
+    results = _load_checkpoint(checkpoint_path, cases_sha256)
+    pending = [case for case in cases if case["id"] not in results]
+    if results:
+        logger.info("eval_resumed", extra={"extra": {"completed": len(results), "pending": len(pending)}})
+
+    semaphore = asyncio.Semaphore(max(1, concurrency or config.settings.eval_concurrency))
+    timeout_s = config.settings.eval_timeout_s
+
+    # Every case makes its own retrieval and LLM call rather than reusing another case's cached or shared answer.
+    with checkpoint_path.open("a", encoding="utf-8") as checkpoint, no_sharing():
+        if checkpoint.tell() == 0:
+            checkpoint.write(json.dumps({"cases_sha256": cases_sha256}) + "\n")
+            checkpoint.flush()
+
+        async def run(case: Dict[str, Any]) -> None:
+            async with semaphore:
+                result = await _run_case(tenant_id, case, timeout_s)
+            results[case["id"]] = result
+            if not result.get("error"):
+                checkpoint.write(json.dumps(result) + "\n")
+                checkpoint.flush()
+
+        await asyncio.gather(*(run(case) for case in pending))
+
+    case_results = [results[case["id"]] for case in cases]
+    metrics = _aggregate(case_results)
     summary = {
         "tenant_id": tenant_id,
         "case_count": len(cases),
@@ -107,3 +182,22 @@ def run_eval(tenant_id: str, cases_path: Path, output_dir: Path) -> Dict[str, An
     (output_dir / "diff.md").write_text("No previous run to diff.", encoding="utf-8")
 
     return summary
+
+
+def run_eval(
+    tenant_id: str,
+    cases_path: Path,
+    output_dir: Path,
+    concurrency: int | None = None,
+    resume: bool = True,
+) -> Dict[str, Any]:
+    async def run() -> Dict[str, Any]:
+        try:
+            return await run_eval_async(tenant_id, cases_path, output_dir, concurrency, resume)
+        finally:
+            # Pooled async clients are bound to this event loop.
+            await llm_client.aclose()
+            await embeddings.aclose()
+            await vector_store.aclose()
+
+    return asyncio.run(run())
@@ -1,22 +1,70 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import time
 
+from fastapi import FastAPI, Request, Response
+
+from tourassist.app.agents import llm_client
 from tourassist.app.api.chat import router as chat_router
 from tourassist.app.api.ingest import router as ingest_router
 from tourassist.app.api.metrics import router as metrics_router
 from tourassist.app.api.tenants import router as tenants_router
-from tourassist.app.models.db import init_db
+from tourassist.app.models.db import close_pools, init_db
+from tourassist.app.observability import tracing
+from tourassist.app.observability.aggregation import get_metrics_aggregator
 from tourassist.app.observability.logger import configure_logging
+from tourassist.app.observability.metrics import metrics_store
+from tourassist.app.rag import embeddings, lexical, pdf, vector_store
+from tourassist.app.rag.jobs import get_ingest_queue
 
 
 configure_logging()
 app = FastAPI(title="TourAssist")
 
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next) -> Response:
+    request_id = request.headers.get("X-Request-ID") or tracing.new_request_id()
+    token = tracing.set_request_id(request_id)
+    start = time.perf_counter()
+    try:
+        attributes = {"http.method": request.method, "url.path": request.url.path}
+        with tracing.span("http.request", **attributes) as root:
+            response = await call_next(request)
+            if root is not None:
+                root.set_attribute("http.status_code", response.status_code)
+    finally:
+        tracing.reset_request_id(token)
+    route = request.scope.get("route")
+    metrics_store.observe(
+        "http_request_ms",
+        (time.perf_counter() - start) * 1000,
+        endpoint=getattr(route, "path", "unmatched"),
+        method=request.method,
+        status=str(response.status_code),
+    )
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    lexical.backfill()
+    get_ingest_queue().start()
+    get_metrics_aggregator().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    get_ingest_queue().shutdown(wait=False)
+    get_metrics_aggregator().shutdown()
+    pdf.shutdown()
+    await llm_client.aclose()
+    await embeddings.aclose()
+    await vector_store.aclose()
+    close_pools()
+    tracing.shutdown()
 
 
 app.include_router(tenants_router)
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import hashlib
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List
 
 from tourassist.app import config
 
 
-SCHEMA_STATEMENTS: Iterable[str] = (
+SCHEMA_STATEMENTS: tuple[str, ...] = (
     """
     CREATE TABLE IF NOT EXISTS tenants (
         tenant_id TEXT PRIMARY KEY,
-        api_key TEXT UNIQUE NOT NULL,
-        created_at TEXT NOT NULL
+        api_key_hash TEXT UNIQUE NOT NULL,
+        created_at TEXT NOT NULL,
+        revoked_at TEXT
     );
     """,
     """
@@ -23,6 +26,8 @@ SCHEMA_STATEMENTS: Iterable[str] = (
         content_hash TEXT NOT NULL,
         status TEXT NOT NULL,
         created_at TEXT NOT NULL,
+        error TEXT,
+        version INTEGER NOT NULL DEFAULT 1,
         UNIQUE(tenant_id, content_hash)
     );
     """,
@@ -33,28 +38,194 @@ SCHEMA_STATEMENTS: Iterable[str] = (
         document_id TEXT NOT NULL,
         chunk_index INTEGER NOT NULL,
         text TEXT NOT NULL,
-        qdrant_id TEXT NOT NULL
+        qdrant_id TEXT NOT NULL,
+        chunk_hash TEXT
     );
     """,
     """
+    CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents (tenant_id, filename);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks (document_id);
+    """,
+    """
     CREATE TABLE IF NOT EXISTS embeddings_cache (
-        text_hash TEXT PRIMARY KEY,
-        vector_json TEXT NOT NULL
+        model TEXT NOT NULL,
+        dims INTEGER NOT NULL,
+        text_hash TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (model, dims, text_hash)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_embeddings_cache_created ON embeddings_cache (created_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_messages (
+        session_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        tokens INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (session_id, seq)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_session_messages_created ON session_messages (created_at);
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5 (
+        text,
+        tenant_key,
+        doc_key,
+        chunk_id UNINDEXED,
+        document_id UNINDEXED,
+        source UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS metrics_workers (
+        worker_id TEXT PRIMARY KEY,
+        snapshot TEXT NOT NULL,
+        updated_at REAL NOT NULL
     );
     """,
+    """
+    CREATE TABLE IF NOT EXISTS cache_generations (
+        scope TEXT NOT NULL,
+        tenant_id TEXT NOT NULL,
+        generation INTEGER NOT NULL,
+        PRIMARY KEY (scope, tenant_id)
+    ) WITHOUT ROWID;
+    """,
 )
 
 
+ADDED_COLUMNS: Iterable[tuple[str, str, str]] = (
+    ("documents", "error", "TEXT"),
+    ("documents", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("chunks", "chunk_hash", "TEXT"),
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    pool: "ConnectionPool | None" = None
+
+    def close(self) -> None:
+        if self.pool is None:
+            super().close()
+            return
+        self.pool.release(self)
+
+    def discard(self) -> None:
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, path: Path, max_idle: int) -> None:
+        self.path = path
+        self.max_idle = max_idle
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> PooledConnection:
+        settings = config.settings
+        conn = sqlite3.connect(
+            self.path,
+            timeout=settings.db_busy_timeout_ms / 1000,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.db_cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(settings.db_mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn: PooledConnection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.discard()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+
+_pools: dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
 def get_connection(db_path: Path | None = None) -> sqlite3.Connection:
-    path = db_path or config.settings.db_path
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    return conn
+    path = Path(db_path or config.settings.db_path)
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path, config.settings.db_pool_size))
+    return pool.acquire()
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _hash_legacy_api_keys(conn: sqlite3.Connection) -> None:
+    rows = conn.execute("SELECT tenant_id, api_key, created_at FROM tenants").fetchall()
+    conn.execute("DROP TABLE tenants")
+    conn.execute(SCHEMA_STATEMENTS[0])
+    conn.executemany(
+        "INSERT INTO tenants (tenant_id, api_key_hash, created_at) VALUES (?, ?, ?)",
+        [
+            (row["tenant_id"], hashlib.sha256(row["api_key"].encode("utf-8")).hexdigest(), row["created_at"])
+            for row in rows
+        ],
+    )
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    if "api_key" in _table_columns(conn, "tenants"):
+        _hash_legacy_api_keys(conn)
+    if "vector_json" in _table_columns(conn, "embeddings_cache"):
+        conn.execute("DROP TABLE embeddings_cache")
+    for table, column, definition in ADDED_COLUMNS:
+        columns = _table_columns(conn, table)
+        if columns and column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 
 def init_db() -> None:
     conn = get_connection()
     with conn:
+        _migrate(conn)
         for statement in SCHEMA_STATEMENTS:
             conn.execute(statement)
     conn.close()
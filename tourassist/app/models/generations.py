@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+from tourassist.app.models.db import get_connection
+from tourassist.app.observability.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SharedGenerations:
+    """Per-tenant invalidation counters kept in SQLite so every worker sees them.
+
+    Caches tag entries with the tenant's generation when they store them and drop entries whose generation
+    is no longer current. ``current`` never touches the database: once the counters are older than
+    ``poll_s`` it starts a background re-read and answers from the last one, so an invalidation in one
+    worker reaches the others about ``poll_s`` later.
+    """
+
+    def __init__(self, scope: str, poll_s: float) -> None:
+        self.scope = scope
+        self.poll_s = poll_s
+        self._generations: dict[str, int] = {}
+        self._refreshed_at = float("-inf")
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT tenant_id, generation FROM cache_generations WHERE scope = ?", (self.scope,)
+        ).fetchall()
+        conn.close()
+        generations = {row["tenant_id"]: row["generation"] for row in rows}
+        with self._lock:
+            # A bump from this process may have landed while the query ran; never step back from it.
+            for tenant_id, generation in self._generations.items():
+                generations[tenant_id] = max(generations.get(tenant_id, 0), generation)
+            self._generations = generations
+            self._refreshed_at = time.monotonic()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except sqlite3.Error:
+            logger.warning("cache_generations_refresh_failed", extra={"extra": {"scope": self.scope}})
+            self._refreshed_at = time.monotonic()  # retry after poll_s rather than on every lookup
+        finally:
+            self._refreshing = False
+
+    def current(self, tenant_id: str) -> int:
+        if not self._refreshing and time.monotonic() - self._refreshed_at >= self.poll_s:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, name="cache-generations", daemon=True).start()
+        return self._generations.get(tenant_id, 0)
+
+    def bump(self, tenant_id: str) -> None:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO cache_generations (scope, tenant_id, generation) VALUES (?, ?, 1) "
+                "ON CONFLICT (scope, tenant_id) DO UPDATE SET generation = generation + 1",
+                (self.scope, tenant_id),
+            )
+            generation = conn.execute(
+                "SELECT generation FROM cache_generations WHERE scope = ? AND tenant_id = ?", (self.scope, tenant_id)
+            ).fetchone()["generation"]
+        conn.close()
+        with self._lock:
+            self._generations = {**self._generations, tenant_id: generation}
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -30,3 +32,21 @@ class IngestResponse(BaseModel):
     document_id: str
     status: str
     chunks_indexed: int
+
+
+class BulkIngestResult(BaseModel):
+    filename: str
+    status: str
+    document_id: Optional[str] = None
+    deduplicated: bool = False
+    error: Optional[str] = None
+
+
+class DocumentStatusResponse(BaseModel):
+    document_id: str
+    tenant_id: str
+    filename: str
+    status: str
+    chunks_indexed: int
+    version: int = 1
+    error: Optional[str] = None
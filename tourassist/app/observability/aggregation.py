@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+from tourassist.app import config
+from tourassist.app.models.db import get_connection
+from tourassist.app.observability.logger import get_logger
+from tourassist.app.observability.metrics import MetricsView, metrics_store
+
+logger = get_logger(__name__)
+
+
+class MetricsAggregator:
+    """Serves this process's own metrics; subclasses merge in other workers' snapshots."""
+
+    def __init__(self, flush_s: float, retention_s: float) -> None:
+        self.flush_s = flush_s
+        self.retention_s = retention_s
+
+    def start(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+    def collect(self) -> MetricsView:
+        return metrics_store.view()
+
+
+class SqliteMetricsAggregator(MetricsAggregator):
+    """Each worker publishes its sketches to SQLite every few seconds and scrapes merge all workers.
+
+    Recording stays in the in-process, per-thread shards; only the background flush touches the database.
+    """
+
+    def __init__(self, flush_s: float, retention_s: float) -> None:
+        super().__init__(flush_s, retention_s)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_s):
+            self.flush()
+
+    def flush(self) -> None:
+        now = time.time()
+        payload = json.dumps(metrics_store.snapshot(), separators=(",", ":"))
+        try:
+            conn = get_connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO metrics_workers (worker_id, snapshot, updated_at) VALUES (?, ?, ?)",
+                    (self.worker_id, payload, now),
+                )
+                conn.execute("DELETE FROM metrics_workers WHERE updated_at < ?", (now - self.retention_s,))
+            conn.close()
+        except sqlite3.Error:
+            logger.warning("metrics_flush_failed", extra={"extra": {"worker_id": self.worker_id}})
+
+    def shutdown(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.flush_s)
+        self._thread = None
+        self.flush()
+
+    def collect(self) -> MetricsView:
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT snapshot FROM metrics_workers WHERE worker_id != ? AND updated_at >= ?",
+            (self.worker_id, time.time() - self.retention_s),
+        ).fetchall()
+        conn.close()
+        snapshots: List[Dict[str, Any]] = [json.loads(row["snapshot"]) for row in rows]
+        snapshots.append(metrics_store.snapshot())
+        return MetricsView.merge(snapshots, metrics_store.slot_s, metrics_store.slots)
+
+
+_BACKENDS = {"local": MetricsAggregator, "sqlite": SqliteMetricsAggregator}
+
+_aggregator: MetricsAggregator | None = None
+
+
+def get_metrics_aggregator() -> MetricsAggregator:
+    global _aggregator
+    if _aggregator is None:
+        backend = _BACKENDS.get(config.settings.metrics_backend)
+        if backend is None:
+            raise ValueError(f"Unknown metrics backend: {config.settings.metrics_backend}")
+        _aggregator = backend(config.settings.metrics_flush_s, config.settings.metrics_worker_retention_s)
+    return _aggregator
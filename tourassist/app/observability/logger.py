@@ -6,6 +6,8 @@ import sys
 from datetime import datetime, timezone
 from typing import Any
 
+from tourassist.app.observability.tracing import current_span, get_request_id
+
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -15,6 +17,13 @@ class JsonFormatter(logging.Formatter):
             "message": record.getMessage(),
             "logger": record.name,
         }
+        request_id = get_request_id()
+        if request_id is not None:
+            payload["request_id"] = request_id
+        span = current_span()
+        if span is not None:
+            payload["trace_id"] = span.trace_id
+            payload["span_id"] = span.span_id
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
         if hasattr(record, "extra") and isinstance(record.extra, dict):
@@ -1,39 +1,398 @@
 from __future__ import annotations
 
-from collections import deque
-from statistics import median
-from typing import Deque
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
 
+from tourassist.app import config
 
-class MetricsStore:
-    def __init__(self, max_samples: int = 1000) -> None:
-        self.latencies_ms: Deque[float] = deque(maxlen=max_samples)
-        self.tokens_used: Deque[int] = deque(maxlen=max_samples)
-        self.costs: Deque[float] = deque(maxlen=max_samples)
+HISTOGRAM_BUCKETS_MS = (1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0)
+
+# Log-spaced buckets: bucket i holds values in (GAMMA**(i-1), GAMMA**i] times _MIN_VALUE, so every
+# quantile estimate is within _RELATIVE_ERROR of a recorded value however many samples are added.
+_GAMMA = 1.02
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_VALUE = 1e-3
+_RELATIVE_ERROR = (_GAMMA - 1) / (_GAMMA + 1)
+_MAX_SERIES = 5000
+_OVERFLOW_LABEL = "_other"
+
+Labels = Tuple[Tuple[str, str], ...]
+SeriesKey = Tuple[str, Labels]
+
+
+def _bucket(value: float) -> int:
+    if value <= _MIN_VALUE:
+        return 0
+    return max(1, math.ceil(math.log(value / _MIN_VALUE) / _LOG_GAMMA))
+
+
+def _bucket_value(index: int) -> float:
+    if index == 0:
+        return 0.0
+    return _MIN_VALUE * 2 * _GAMMA**index / (_GAMMA + 1)
+
+
+def _bucket_upper(index: int) -> float:
+    return _MIN_VALUE * _GAMMA**index
 
-    def record_latency(self, latency_ms: float) -> None:
-        self.latencies_ms.append(latency_ms)
 
-    def record_tokens(self, tokens: int) -> None:
-        self.tokens_used.append(tokens)
+class Sketch:
+    """Streaming quantile sketch over log-spaced buckets; adding is O(1), queries are O(buckets)."""
 
-    def record_cost(self, cost: float) -> None:
-        self.costs.append(cost)
+    __slots__ = ("counts", "count", "total")
 
-    def percentile(self, values: Deque[float], pct: float) -> float:
-        if not values:
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        index = _bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Sketch") -> None:
+        for index, count in other.counts.copy().items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
             return 0.0
-        ordered = sorted(values)
-        index = int(round((pct / 100) * (len(ordered) - 1)))
-        return ordered[index]
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return _bucket_value(index)
+        return _bucket_value(max(self.counts))
+
+    def cumulative(self, bounds: Iterable[float]) -> List[int]:
+        ordered = sorted(self.counts.items())
+        result = []
+        position = 0
+        running = 0
+        for bound in bounds:
+            while position < len(ordered) and _bucket_upper(ordered[position][0]) <= bound * (1 + _RELATIVE_ERROR):
+                running += ordered[position][1]
+                position += 1
+            result.append(running)
+        return result
+
+
+class _Shard:
+    """Per-thread recording area; only its owning thread writes to it, so recording takes no lock."""
+
+    __slots__ = ("windows", "lifetime", "counters")
+
+    def __init__(self) -> None:
+        self.windows: Dict[int, Dict[SeriesKey, Sketch]] = {}
+        self.lifetime: Dict[SeriesKey, Sketch] = {}
+        self.counters: Dict[SeriesKey, float] = {}
+
+
+class MetricsStore:
+    def __init__(self, window_s: float = 60.0, slots: int = 6) -> None:
+        self.slot_s = window_s / slots
+        self.slots = slots
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._series: set[SeriesKey] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def window_s(self) -> float:
+        return self.slot_s * self.slots
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, name: str, labels: Dict[str, str | None]) -> SeriesKey:
+        key = (name, tuple(sorted((label, value) for label, value in labels.items() if value is not None)))
+        if key in self._series:
+            return key
+        with self._lock:
+            if len(self._series) >= _MAX_SERIES:
+                key = (name, tuple((label, _OVERFLOW_LABEL) for label, _ in key[1]))
+            self._series.add(key)
+        return key
+
+    def observe(self, name: str, value: float, **labels: str | None) -> None:
+        key = self._key(name, labels)
+        shard = self._shard()
+        slot = int(time.time() // self.slot_s)
+        window = shard.windows.get(slot)
+        if window is None:
+            window = shard.windows[slot] = {}
+            for stale in [old for old in shard.windows if old <= slot - self.slots]:
+                del shard.windows[stale]
+        sketch = window.get(key)
+        if sketch is None:
+            sketch = window[key] = Sketch()
+        sketch.add(value)
+        lifetime = shard.lifetime.get(key)
+        if lifetime is None:
+            lifetime = shard.lifetime[key] = Sketch()
+        lifetime.add(value)
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str | None) -> None:
+        key = self._key(name, labels)
+        counters = self._shard().counters
+        counters[key] = counters.get(key, 0.0) + amount
+
+    def record_latency(self, latency_ms: float, tenant_id: str | None = None) -> None:
+        self.observe("chat_latency_ms", latency_ms, tenant=tenant_id)
+        self.increment("chat_requests_total", tenant=tenant_id)
+
+    def record_stage(self, stage: str, latency_ms: float) -> None:
+        self.observe("stage_latency_ms", latency_ms, stage=stage)
+
+    def record_tokens(self, tokens: int, tenant_id: str | None = None) -> None:
+        self.increment("tokens_total", tokens, tenant=tenant_id)
+
+    def record_cost(self, cost: float, tenant_id: str | None = None) -> None:
+        self.increment("cost_total", cost, tenant=tenant_id)
+
+    def _merged(self, windowed: bool) -> Dict[SeriesKey, Sketch]:
+        merged: Dict[SeriesKey, Sketch] = {}
+        oldest = int(time.time() // self.slot_s) - self.slots + 1
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            if windowed:
+                sources = [window for slot, window in shard.windows.copy().items() if slot >= oldest]
+            else:
+                sources = [shard.lifetime]
+            for source in sources:
+                for key, sketch in source.copy().items():
+                    merged.setdefault(key, Sketch()).merge(sketch)
+        return merged
+
+    def sketches(self, windowed: bool = True) -> Dict[SeriesKey, Sketch]:
+        return self._merged(windowed)
+
+    def counters(self) -> Dict[SeriesKey, float]:
+        totals: Dict[SeriesKey, float] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in shard.counters.copy().items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable copy of this process's sketches, per window slot, for cross-worker merging."""
+        slots: Dict[int, Dict[SeriesKey, Sketch]] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for slot, window in shard.windows.copy().items():
+                merged = slots.setdefault(slot, {})
+                for key, sketch in window.copy().items():
+                    merged.setdefault(key, Sketch()).merge(sketch)
+        return {
+            "lifetime": _dump_series(self._merged(windowed=False)),
+            "windows": {str(slot): _dump_series(series) for slot, series in slots.items()},
+            "counters": [[name, list(map(list, labels)), value] for (name, labels), value in self.counters().items()],
+        }
+
+    def view(self) -> "MetricsView":
+        return MetricsView(self._merged(windowed=False), self._merged(windowed=True), self.counters())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shards = []
+            self._series = set()
+            self._local = threading.local()
+
+    def quantile(self, name: str, q: float, windowed: bool = True, **labels: str) -> float:
+        return _quantile(self._merged(windowed), name, q, labels)
 
     def latency_p50(self) -> float:
-        if not self.latencies_ms:
-            return 0.0
-        return median(self.latencies_ms)
+        return self.quantile("chat_latency_ms", 0.5)
+
+    def latency_p95(self) -> float:
+        return self.quantile("chat_latency_ms", 0.95)
+
+    def stage_latencies(self) -> Dict[str, float]:
+        return MetricsView({}, self._merged(windowed=True), {}).stage_latencies()
+
+    def stage_histograms(self) -> Dict[str, Dict[str, int]]:
+        return MetricsView({}, self._merged(windowed=True), {}).stage_histograms()
+
+    def totals(self, name: str) -> float:
+        return MetricsView({}, {}, self.counters()).totals(name)
+
+    def backend_stats(self) -> Dict[str, Dict[str, float]]:
+        return MetricsView({}, self._merged(windowed=True), self.counters()).backend_stats()
+
+
+def _dump_series(series: Dict[SeriesKey, Sketch]) -> List[list]:
+    return [
+        [name, list(map(list, labels)), sketch.count, sketch.total, list(sketch.counts.items())]
+        for (name, labels), sketch in series.items()
+    ]
+
+
+def _load_series(rows: List[list], into: Dict[SeriesKey, Sketch]) -> None:
+    for name, labels, count, total, buckets in rows:
+        sketch = Sketch()
+        sketch.counts = {int(index): bucket_count for index, bucket_count in buckets}
+        sketch.count = count
+        sketch.total = total
+        into.setdefault((name, tuple(tuple(pair) for pair in labels)), Sketch()).merge(sketch)
+
+
+def _quantile(sketches: Dict[SeriesKey, Sketch], name: str, q: float, labels: Dict[str, str]) -> float:
+    """Quantile for ``name`` across every series whose labels include ``labels``."""
+    combined = Sketch()
+    wanted = set(labels.items())
+    for (series, series_labels), sketch in sketches.items():
+        if series == name and wanted <= set(series_labels):
+            combined.merge(sketch)
+    return combined.quantile(q)
+
+
+class MetricsView:
+    """Read side over lifetime sketches, rolling-window sketches and counters, local or merged."""
+
+    def __init__(
+        self,
+        lifetime: Dict[SeriesKey, Sketch],
+        windowed: Dict[SeriesKey, Sketch],
+        counters: Dict[SeriesKey, float],
+    ) -> None:
+        self.lifetime = lifetime
+        self.windowed = windowed
+        self.counters = counters
+
+    @classmethod
+    def merge(cls, snapshots: Iterable[Dict[str, Any]], slot_s: float, slots: int) -> "MetricsView":
+        oldest = int(time.time() // slot_s) - slots + 1
+        lifetime: Dict[SeriesKey, Sketch] = {}
+        windowed: Dict[SeriesKey, Sketch] = {}
+        counters: Dict[SeriesKey, float] = {}
+        for snapshot in snapshots:
+            _load_series(snapshot["lifetime"], lifetime)
+            for slot, rows in snapshot["windows"].items():
+                if int(slot) >= oldest:
+                    _load_series(rows, windowed)
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0.0) + value
+        return cls(lifetime, windowed, counters)
+
+    def quantile(self, name: str, q: float, windowed: bool = True, **labels: str) -> float:
+        return _quantile(self.windowed if windowed else self.lifetime, name, q, labels)
+
+    def latency_p50(self) -> float:
+        return self.quantile("chat_latency_ms", 0.5)
 
     def latency_p95(self) -> float:
-        return self.percentile(self.latencies_ms, 95)
+        return self.quantile("chat_latency_ms", 0.95)
+
+    def stage_latencies(self) -> Dict[str, float]:
+        summary: Dict[str, float] = {}
+        for (name, labels), sketch in sorted(self.windowed.items()):
+            if name != "stage_latency_ms":
+                continue
+            stage = dict(labels)["stage"]
+            summary[f"{stage}_p50_ms"] = sketch.quantile(0.5)
+            summary[f"{stage}_p95_ms"] = sketch.quantile(0.95)
+            summary[f"{stage}_p99_ms"] = sketch.quantile(0.99)
+        return summary
+
+    def stage_histograms(self) -> Dict[str, Dict[str, int]]:
+        histograms: Dict[str, Dict[str, int]] = {}
+        for (name, labels), sketch in sorted(self.windowed.items()):
+            if name != "stage_latency_ms":
+                continue
+            counts = sketch.cumulative(HISTOGRAM_BUCKETS_MS)
+            buckets = {f"le_{bound:g}": count for bound, count in zip(HISTOGRAM_BUCKETS_MS, counts)}
+            buckets["le_inf"] = sketch.count
+            histograms[dict(labels)["stage"]] = buckets
+        return histograms
+
+    def totals(self, name: str) -> float:
+        return sum(value for (series, _), value in self.counters.items() if series == name)
+
+    def backend_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-LLM-backend windowed latency and lifetime calls, tokens, cost and escalations."""
+        stats: Dict[str, Dict[str, float]] = {}
+        for (name, labels), sketch in sorted(self.windowed.items()):
+            if name == "llm_latency_ms":
+                entry = stats.setdefault(dict(labels)["backend"], {})
+                entry["latency_p50_ms"] = sketch.quantile(0.5)
+                entry["latency_p95_ms"] = sketch.quantile(0.95)
+        fields = {
+            "llm_routed_total": "calls",
+            "llm_tokens_total": "tokens",
+            "llm_cost_total": "cost",
+            "llm_escalations_total": "escalations",
+        }
+        for (name, labels), value in sorted(self.counters.items()):
+            field = fields.get(name)
+            if field is not None:
+                entry = stats.setdefault(dict(labels)["backend"], {})
+                entry[field] = entry.get(field, 0.0) + value
+        return stats
+
+    def prometheus(self) -> str:
+        return prometheus_text(self.lifetime, self.windowed, self.counters)
+
+
+def _label_text(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text(
+    lifetime: Dict[SeriesKey, Sketch],
+    windowed: Dict[SeriesKey, Sketch],
+    counters: Dict[SeriesKey, float],
+    prefix: str = "tourassist_",
+) -> str:
+    lines: List[str] = []
+    for name in sorted({key[0] for key in lifetime}):
+        metric = prefix + name
+        lines.append(f"# TYPE {metric} histogram")
+        for (series, labels), sketch in sorted(lifetime.items()):
+            if series != name:
+                continue
+            for bound, count in zip(HISTOGRAM_BUCKETS_MS, sketch.cumulative(HISTOGRAM_BUCKETS_MS)):
+                lines.append(f"{metric}_bucket{_label_text(labels, (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{metric}_bucket{_label_text(labels, (('le', '+Inf'),))} {sketch.count}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {sketch.total:g}")
+            lines.append(f"{metric}_count{_label_text(labels)} {sketch.count}")
+    for name in sorted({key[0] for key in windowed}):
+        metric = f"{prefix}{name}_window"
+        lines.append(f"# TYPE {metric} summary")
+        for (series, labels), sketch in sorted(windowed.items()):
+            if series != name:
+                continue
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f"{metric}{_label_text(labels, (('quantile', f'{q:g}'),))} {sketch.quantile(q):g}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {sketch.total:g}")
+            lines.append(f"{metric}_count{_label_text(labels)} {sketch.count}")
+    for name in sorted({key[0] for key in counters}):
+        metric = prefix + name
+        lines.append(f"# TYPE {metric} counter")
+        for (series, labels), value in sorted(counters.items()):
+            if series == name:
+                lines.append(f"{metric}{_label_text(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
 
 
-metrics_store = MetricsStore()
+metrics_store = MetricsStore(config.settings.metrics_window_s, config.settings.metrics_window_slots)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from tourassist.app import config
+from tourassist.app.observability.metrics import metrics_store
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+_STATUS_UNSET = 0
+_STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = _STATUS_UNSET
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict[str, Any]:
+        """One span in the OTLP/JSON shape, so collectors can ingest the exported lines."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    def __init__(self, stream: TextIO, owned: bool) -> None:
+        self._stream = stream
+        self._owned = owned
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "tourassist"}}]},
+                        "scopeSpans": [{"scope": {"name": "tourassist"}, "spans": [span.to_otlp()]}],
+                    }
+                ]
+            }
+        )
+        with self._lock:
+            self._stream.write(line + "\n")
+            if span.parent_id is None:
+                self._stream.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._stream.flush()
+            if self._owned:
+                self._stream.close()
+
+
+def _create_exporter() -> SpanExporter | None:
+    exporter = config.settings.tracing_exporter
+    if exporter == "none":
+        return None
+    if exporter == "stdout":
+        return SpanExporter(sys.stdout, owned=False)
+    if exporter == "file":
+        path = Path(config.settings.tracing_file or config.settings.data_dir / "traces.jsonl")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return SpanExporter(path.open("a", encoding="utf-8"), owned=True)
+    raise ValueError(f"Unknown tracing exporter: {exporter}")
+
+
+_exporter: SpanExporter | None = None
+_exporter_ready = False
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> SpanExporter | None:
+    global _exporter, _exporter_ready
+    if not _exporter_ready:
+        with _exporter_lock:
+            if not _exporter_ready:
+                _exporter = _create_exporter()
+                _exporter_ready = True
+    return _exporter
+
+
+def shutdown() -> None:
+    global _exporter, _exporter_ready
+    with _exporter_lock:
+        if _exporter is not None:
+            _exporter.close()
+        _exporter = None
+        _exporter_ready = False
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Time a stage into the per-stage metrics and, when an exporter is configured, export it as a span."""
+    exporter = get_exporter()
+    start = time.perf_counter()
+    if exporter is None:
+        try:
+            yield None
+        finally:
+            metrics_store.record_stage(name, (time.perf_counter() - start) * 1000)
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    request_id = _request_id.get()
+    if request_id is not None:
+        current.attributes["request.id"] = request_id
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = _STATUS_ERROR
+        current.attributes["error.type"] = type(exc).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        metrics_store.record_stage(name, (time.perf_counter() - start) * 1000)
+        exporter.export(current)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id: str | None) -> object:
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: object) -> None:
+    _request_id.reset(token)  # type: ignore[arg-type]
+
+
+def get_request_id() -> str | None:
+    return _request_id.get()
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from tourassist.app.agents.tokenizer import count_tokens
+
+_SENTENCE_END = re.compile(r"[.!?…][\"'”)\]]*\s+")
+_WORD = re.compile(r"\S+")
+
+Unit = Tuple[str, int]
+
+
+def _no_tokens(text: str) -> int:
+    return 0
+
+
+class Chunker:
+    """Packs paragraphs, then sentences, then words into chunks under a character and token limit.
+
+    Text is consumed in one pass: each paragraph is cut into units by slicing, units are buffered until
+    the next one would overflow, and the buffer is joined once per emitted chunk. With overlap, the
+    trailing units of a chunk (up to ``overlap_chars``) are carried into the next one, so overlap always
+    falls on sentence or word boundaries.
+    """
+
+    def __init__(self, max_chars: int, overlap_chars: int = 0, max_tokens: int = 0) -> None:
+        if max_chars <= 0:
+            raise ValueError("max_chars must be positive")
+        self.max_chars = max_chars
+        self.overlap_chars = min(max(overlap_chars, 0), max_chars // 2)
+        self.max_tokens = max_tokens
+        self._count: Callable[[str], int] = count_tokens if max_tokens > 0 else _no_tokens
+
+    def _fits(self, chars: int, tokens: int) -> bool:
+        return chars <= self.max_chars and (self.max_tokens <= 0 or tokens <= self.max_tokens)
+
+    def _split_word(self, word: str) -> Iterator[Unit]:
+        step = min(self.max_chars, self.max_tokens) if self.max_tokens > 0 else self.max_chars
+        for offset in range(0, len(word), step):
+            piece = word[offset : offset + step]
+            yield piece, self._count(piece)
+
+    def _split_words(self, sentence: str) -> Iterator[Unit]:
+        start = -1
+        end = tokens = 0
+        for match in _WORD.finditer(sentence):
+            word = match.group()
+            word_tokens = self._count(word)
+            if not self._fits(len(word), word_tokens):
+                if start >= 0:
+                    yield sentence[start:end], tokens
+                    start = -1
+                yield from self._split_word(word)
+                continue
+            if start >= 0 and not self._fits(match.end() - start, tokens + word_tokens):
+                yield sentence[start:end], tokens
+                start = -1
+            if start < 0:
+                start, tokens = match.start(), 0
+            end = match.end()
+            tokens += word_tokens
+        if start >= 0:
+            yield sentence[start:end], tokens
+
+    def _sentence_units(self, sentence: str) -> Iterator[Unit]:
+        tokens = self._count(sentence)
+        if self._fits(len(sentence), tokens):
+            yield sentence, tokens
+        else:
+            yield from self._split_words(sentence)
+
+    def _units(self, paragraph: str) -> Iterator[Unit]:
+        tokens = self._count(paragraph)
+        if self._fits(len(paragraph), tokens):
+            yield paragraph, tokens
+            return
+        start = 0
+        for match in _SENTENCE_END.finditer(paragraph):
+            yield from self._sentence_units(paragraph[start : match.start() + len(match.group().rstrip())])
+            start = match.end()
+        if start < len(paragraph):
+            yield from self._sentence_units(paragraph[start:])
+
+    def chunks(self, segments: Iterable[str]) -> Iterator[str]:
+        units: List[str] = []
+        unit_tokens: List[int] = []
+        chars = tokens = 0
+        for segment in segments:
+            for line in segment.split("\n"):
+                paragraph = line.strip()
+                if not paragraph:
+                    continue
+                for unit, count in self._units(paragraph):
+                    size = len(unit)
+                    if units and not self._fits(chars + size + 1, tokens + count):
+                        yield " ".join(units)
+                        units, unit_tokens = self._carry(units, unit_tokens)
+                        chars = sum(map(len, units)) + len(units) - 1 if units else 0
+                        tokens = sum(unit_tokens)
+                        while units and not self._fits(chars + size + 1, tokens + count):
+                            chars -= len(units[0]) + 1
+                            tokens -= unit_tokens[0]
+                            del units[0], unit_tokens[0]
+                        if not units:
+                            chars = tokens = 0
+                    chars += size + 1 if units else size
+                    tokens += count
+                    units.append(unit)
+                    unit_tokens.append(count)
+        if units:
+            yield " ".join(units)
+
+    def _carry(self, units: List[str], unit_tokens: List[int]) -> Tuple[List[str], List[int]]:
+        kept = 0
+        chars = -1
+        for unit in reversed(units):
+            if chars + len(unit) + 1 > self.overlap_chars:
+                break
+            chars += len(unit) + 1
+            kept += 1
+        if not kept:
+            return [], []
+        return units[-kept:], unit_tokens[-kept:]
+
+
+def iter_chunks(
+    segments: Iterable[str], max_chars: int, overlap_chars: int = 0, max_tokens: int = 0
+) -> Iterator[str]:
+    return Chunker(max_chars, overlap_chars, max_tokens).chunks(segments)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+
+from tourassist.app import config
+from tourassist.app.models.db import get_connection
+
+_LOOKUP_CHUNK = 500
+_EVICT_EVERY = 1000
+
+CacheKey = Tuple[str, int, str]
+
+
+def pack_vector(vector: Sequence[float]) -> array:
+    return array("f", vector)
+
+
+def _from_blob(blob: bytes) -> array:
+    values = array("f")
+    values.frombytes(blob)
+    return values
+
+
+class EmbeddingCache:
+    def __init__(self, lru_size: int, max_rows: int, max_age_s: int) -> None:
+        self.lru_size = lru_size
+        self.max_rows = max_rows
+        self.max_age_s = max_age_s
+        self._lru: OrderedDict[CacheKey, Tuple[array, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: CacheKey, vector: array, created_at: float) -> None:
+        if self.lru_size <= 0:
+            return
+        self._lru[key] = (vector, created_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, dims: int, text_hashes: Sequence[str]) -> Dict[str, array]:
+        found: Dict[str, array] = {}
+        pending = []
+        min_created = time.time() - self.max_age_s if self.max_age_s > 0 else 0.0
+        with self._lock:
+            for text_hash in text_hashes:
+                key = (model, dims, text_hash)
+                entry = self._lru.get(key)
+                if entry is not None and entry[1] < min_created:
+                    del self._lru[key]
+                    entry = None
+                if entry is None:
+                    pending.append(text_hash)
+                    continue
+                self._lru.move_to_end(key)
+                found[text_hash] = entry[0]
+            self.memory_hits += len(found)
+        if not pending:
+            return found
+
+        loaded: Dict[str, Tuple[array, float]] = {}
+        conn = get_connection()
+        for start in range(0, len(pending), _LOOKUP_CHUNK):
+            part = pending[start : start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" for _ in part)
+            rows = conn.execute(
+                "SELECT text_hash, vector, created_at FROM embeddings_cache "
+                f"WHERE model = ? AND dims = ? AND created_at >= ? AND text_hash IN ({placeholders})",
+                (model, dims, min_created, *part),
+            ).fetchall()
+            for row in rows:
+                loaded[row["text_hash"]] = (_from_blob(row["vector"]), row["created_at"])
+        conn.close()
+
+        with self._lock:
+            for text_hash, (vector, created_at) in loaded.items():
+                self._remember((model, dims, text_hash), vector, created_at)
+            self.disk_hits += len(loaded)
+            self.misses += len(pending) - len(loaded)
+        found.update((text_hash, vector) for text_hash, (vector, _) in loaded.items())
+        return found
+
+    def put_many(self, model: str, dims: int, vectors: Dict[str, array]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            for text_hash, vector in vectors.items():
+                self._remember((model, dims, text_hash), vector, now)
+            self._writes_since_evict += len(vectors)
+            evict = self._writes_since_evict >= _EVICT_EVERY
+            if evict:
+                self._writes_since_evict = 0
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings_cache (model, dims, text_hash, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(model, dims, text_hash, vector.tobytes(), now) for text_hash, vector in vectors.items()],
+            )
+            if evict:
+                self._evict(conn, now)
+        conn.close()
+
+    def _evict(self, conn, now: float) -> None:
+        if self.max_age_s > 0:
+            conn.execute("DELETE FROM embeddings_cache WHERE created_at < ?", (now - self.max_age_s,))
+        if self.max_rows > 0:
+            total = conn.execute("SELECT COUNT(*) FROM embeddings_cache").fetchone()[0]
+            if total > self.max_rows:
+                conn.execute(
+                    "DELETE FROM embeddings_cache WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings_cache ORDER BY created_at LIMIT ?)",
+                    (total - self.max_rows,),
+                )
+
+    def evict(self) -> None:
+        conn = get_connection()
+        with conn:
+            self._evict(conn, time.time())
+        conn.close()
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._lru),
+        }
+
+
+_embedding_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            config.settings.embed_cache_lru_size,
+            config.settings.embed_cache_max_rows,
+            config.settings.embed_cache_max_age_s,
+        )
+    return _embedding_cache
@@ -1,42 +1,57 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
-from typing import Iterable, List
+from array import array
+from typing import Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
 
 import httpx
 
 from tourassist.app import config
-from tourassist.app.models.db import get_connection
+from tourassist.app.concurrency import AsyncSingleFlight, sharing_enabled
 from tourassist.app.observability.logger import get_logger
+from tourassist.app.rag.embedding_cache import get_embedding_cache, pack_vector
 
 logger = get_logger(__name__)
 
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_flights: AsyncSingleFlight[array] = AsyncSingleFlight("embeddings")
+
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            timeout=config.settings.embed_timeout_s,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=config.settings.embed_timeout_s,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _async_client
+
+
+async def aclose() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
 
 def _hash_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
-def _cached_embedding(text_hash: str) -> List[float] | None:
-    conn = get_connection()
-    row = conn.execute(
-        "SELECT vector_json FROM embeddings_cache WHERE text_hash = ?",
-        (text_hash,),
-    ).fetchone()
-    conn.close()
-    if not row:
-        return None
-    return json.loads(row["vector_json"])
-
-
-def _store_embedding(text_hash: str, vector: List[float]) -> None:
-    conn = get_connection()
-    with conn:
-        conn.execute(
-            "INSERT OR REPLACE INTO embeddings_cache (text_hash, vector_json) VALUES (?, ?)",
-            (text_hash, json.dumps(vector)),
-        )
-    conn.close()
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
 
 
 def _deterministic_embedding(text: str, dims: int) -> List[float]:
@@ -47,32 +62,148 @@ def _deterministic_embedding(text: str, dims: int) -> List[float]:
     return values[:dims]
 
 
-def embed_texts(texts: Iterable[str]) -> List[List[float]]:
-    vectors: List[List[float]] = []
-    for text in texts:
-        text_hash = _hash_text(text)
-        cached = _cached_embedding(text_hash)
-        if cached is not None:
-            vectors.append(cached)
-            continue
-        if not config.settings.llm_api_key:
-            vector = _deterministic_embedding(text, config.settings.embedding_dims)
-            _store_embedding(text_hash, vector)
-            vectors.append(vector)
-            continue
-        payload = {"input": text, "model": config.settings.embed_model}
-        headers = {"Authorization": f"Bearer {config.settings.llm_api_key}"}
+def _batched(
+    items: Sequence[Tuple[str, str]], max_items: int, max_tokens: int
+) -> Iterator[List[Tuple[str, str]]]:
+    batch: List[Tuple[str, str]] = []
+    tokens = 0
+    for item in items:
+        cost = _estimate_tokens(item[1])
+        if batch and (len(batch) >= max_items or tokens + cost > max_tokens):
+            yield batch
+            batch = []
+            tokens = 0
+        batch.append(item)
+        tokens += cost
+    if batch:
+        yield batch
+
+
+def _request(texts: List[str]) -> Tuple[str, dict, dict]:
+    payload = {"input": texts, "model": config.settings.embed_model}
+    headers = {"Authorization": f"Bearer {config.settings.llm_api_key}"}
+    return f"{config.settings.llm_base_url}/embeddings", payload, headers
+
+
+def _parse_response(response: httpx.Response, expected: int) -> List[List[float]]:
+    response.raise_for_status()
+    data = sorted(response.json()["data"], key=lambda item: item["index"])
+    if len(data) != expected:
+        raise ValueError(f"expected {expected} embeddings, got {len(data)}")
+    return [item["embedding"] for item in data]
+
+
+def _request_embeddings(texts: List[str]) -> List[List[float]]:
+    url, payload, headers = _request(texts)
+    return _parse_response(_get_client().post(url, json=payload, headers=headers), len(texts))
+
+
+async def _request_embeddings_async(texts: List[str]) -> List[List[float]]:
+    url, payload, headers = _request(texts)
+    response = await _get_async_client().post(url, json=payload, headers=headers)
+    return _parse_response(response, len(texts))
+
+
+def _batch_failed(batch: List[Tuple[str, str]], exc: Exception) -> List[List[float]]:
+    logger.error("embedding_failed", extra={"extra": {"error": str(exc), "batch_size": len(batch)}})
+    return [_deterministic_embedding(text, config.settings.embedding_dims) for _, text in batch]
+
+
+def _batches(misses: Dict[str, str]) -> Iterator[List[Tuple[str, str]]]:
+    return _batched(list(misses.items()), config.settings.embed_batch_size, config.settings.embed_batch_max_tokens)
+
+
+def _offline_embeddings(misses: Dict[str, str]) -> Dict[str, List[float]]:
+    dims = config.settings.embedding_dims
+    return {text_hash: _deterministic_embedding(text, dims) for text_hash, text in misses.items()}
+
+
+Computed = Tuple[Dict[str, List[float]], Dict[str, List[float]]]
+
+
+def _compute_embeddings(misses: Dict[str, str]) -> Computed:
+    """Returns ``(embedded, fallback)``: provider vectors, and stand-ins for batches whose request failed."""
+    if not config.settings.llm_api_key:
+        return _offline_embeddings(misses), {}
+    computed: Dict[str, List[float]] = {}
+    fallback: Dict[str, List[float]] = {}
+    for batch in _batches(misses):
+        target = computed
         try:
-            with httpx.Client(timeout=20) as client:
-                response = client.post(
-                    f"{config.settings.llm_base_url}/embeddings", json=payload, headers=headers
-                )
-                response.raise_for_status()
-                data = response.json()
-                vector = data["data"][0]["embedding"]
+            vectors = _request_embeddings([text for _, text in batch])
         except Exception as exc:  # noqa: BLE001 - surface error to logs
-            logger.error("embedding_failed", extra={"error": str(exc)})
-            vector = _deterministic_embedding(text, config.settings.embedding_dims)
-        _store_embedding(text_hash, vector)
-        vectors.append(vector)
-    return vectors
+            vectors, target = _batch_failed(batch, exc), fallback
+        for (text_hash, _), vector in zip(batch, vectors):
+            target[text_hash] = vector
+    return computed, fallback
+
+
+async def _compute_embeddings_async(misses: Dict[str, str]) -> Computed:
+    if not config.settings.llm_api_key:
+        return _offline_embeddings(misses), {}
+    computed: Dict[str, List[float]] = {}
+    fallback: Dict[str, List[float]] = {}
+    for batch in _batches(misses):
+        target = computed
+        try:
+            vectors = await _request_embeddings_async([text for _, text in batch])
+        except Exception as exc:  # noqa: BLE001 - surface error to logs
+            vectors, target = _batch_failed(batch, exc), fallback
+        for (text_hash, _), vector in zip(batch, vectors):
+            target[text_hash] = vector
+    return computed, fallback
+
+
+def _lookup(items: List[str]) -> Tuple[List[str], Dict[str, array], Dict[str, str]]:
+    hashes = [_hash_text(text) for text in items]
+    found = get_embedding_cache().get_many(
+        config.settings.embed_model, config.settings.embedding_dims, list(dict.fromkeys(hashes))
+    )
+    misses: Dict[str, str] = {}
+    for text_hash, text in zip(hashes, items):
+        if text_hash not in found:
+            misses.setdefault(text_hash, text)
+    return hashes, found, misses
+
+
+def _store(computed: Dict[str, List[float]], fallback: Dict[str, List[float]]) -> Dict[str, array]:
+    packed = {text_hash: pack_vector(vector) for text_hash, vector in computed.items()}
+    get_embedding_cache().put_many(config.settings.embed_model, config.settings.embedding_dims, packed)
+    # Fallback vectors are never cached, so the next request for these texts asks the provider again.
+    packed.update((text_hash, pack_vector(vector)) for text_hash, vector in fallback.items())
+    return packed
+
+
+def _flight_keys(misses: Dict[str, str]) -> List[Tuple[str, int, str]]:
+    return [(config.settings.embed_model, config.settings.embedding_dims, text_hash) for text_hash in misses]
+
+
+def _by_hash(shared: Dict[Hashable, array]) -> Dict[str, array]:
+    return {key[2]: vector for key, vector in shared.items()}
+
+
+async def _embed_misses_async(misses: Dict[str, str]) -> Dict[str, array]:
+    """Concurrent misses for the same text share one upstream call; waiters get the leader's vectors."""
+    if not (config.settings.coalesce_requests and sharing_enabled()):
+        return await asyncio.to_thread(_store, *await _compute_embeddings_async(misses))
+
+    async def compute(keys: List[Hashable]) -> Dict[Hashable, array]:
+        computed = await _compute_embeddings_async({key[2]: misses[key[2]] for key in keys})
+        packed = await asyncio.to_thread(_store, *computed)
+        return {key: packed[key[2]] for key in keys}
+
+    return _by_hash(await _flights.do_many(_flight_keys(misses), compute))
+
+
+def embed_texts(texts: Iterable[str]) -> List[List[float]]:
+    hashes, found, misses = _lookup(list(texts))
+    if misses:
+        found.update(_store(*_compute_embeddings(misses)))
+    return [found[text_hash].tolist() for text_hash in hashes]
+
+
+async def embed_texts_async(texts: Iterable[str]) -> List[List[float]]:
+    hashes, found, misses = await asyncio.to_thread(_lookup, list(texts))
+    if misses:
+        found.update(await _embed_misses_async(misses))
+    return [found[text_hash].tolist() for text_hash in hashes]
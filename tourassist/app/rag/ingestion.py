@@ -1,18 +1,23 @@
 from __future__ import annotations
 
+import codecs
 import hashlib
-import io
+import itertools
+import sqlite3
 import uuid
 from datetime import datetime, timezone
-from typing import Iterable, Tuple
-
-from pypdf import PdfReader
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
 
 from tourassist.app import config
+from tourassist.app.agents.answer_cache import get_answer_cache
 from tourassist.app.models.db import get_connection
 from tourassist.app.observability.logger import get_logger
+from tourassist.app.rag import lexical
+from tourassist.app.rag.chunking import iter_chunks
 from tourassist.app.rag.embeddings import embed_texts
-from tourassist.app.rag.vector_store import get_qdrant
+from tourassist.app.rag.pdf import iter_pdf_pages
+from tourassist.app.rag.vector_store import get_vector_store
 
 logger = get_logger(__name__)
 
@@ -22,8 +27,7 @@ def _hash_bytes(data: bytes) -> str:
 
 
 def _read_pdf(data: bytes) -> str:
-    reader = PdfReader(io.BytesIO(data))
-    return "\n".join(page.extract_text() or "" for page in reader.pages)
+    return "\n".join(iter_pdf_pages(data))
 
 
 def _read_text(data: bytes) -> str:
@@ -36,87 +40,340 @@ def extract_text(filename: str, data: bytes) -> str:
     return _read_text(data)
 
 
+_READ_BLOCK = 1024 * 1024
+
+
+def _iter_text_file(path: Path) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pending = ""
+    with path.open("rb") as handle:
+        while block := handle.read(_READ_BLOCK):
+            text = pending + decoder.decode(block)
+            cut = text.rfind("\n") + 1
+            pending = text[cut:]
+            if cut:
+                yield text[:cut]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_text(filename: str, source: bytes | Path) -> Iterator[str]:
+    if filename.lower().endswith(".pdf"):
+        return iter_pdf_pages(source)
+    if isinstance(source, Path):
+        return _iter_text_file(source)
+    return iter([_read_text(source)])
+
+
+def chunk_stream(segments: Iterable[str], max_chars: int) -> Iterator[str]:
+    return iter_chunks(segments, max_chars, config.settings.chunk_overlap_chars, config.settings.chunk_max_tokens)
+
+
 def chunk_text(text: str, max_chars: int) -> Iterable[str]:
-    paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
-    chunks = []
-    current = []
-    size = 0
-    for paragraph in paragraphs:
-        if size + len(paragraph) + 1 > max_chars and current:
-            chunks.append(" ".join(current))
-            current = [paragraph]
-            size = len(paragraph)
+    return list(chunk_stream([text], max_chars))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def set_status(document_id: str, status: str, error: str | None = None, version: int | None = None) -> None:
+    """With ``version``, only that version's row is updated; a newer upload queued meanwhile keeps its status."""
+    conn = get_connection()
+    with conn:
+        if version is None:
+            conn.execute(
+                "UPDATE documents SET status = ?, error = ? WHERE document_id = ?",
+                (status, error, document_id),
+            )
         else:
-            current.append(paragraph)
-            size += len(paragraph) + 1
-    if current:
-        chunks.append(" ".join(current))
-    return chunks
+            conn.execute(
+                "UPDATE documents SET status = ?, error = ? WHERE document_id = ? AND version = ?",
+                (status, error, document_id, version),
+            )
+    conn.close()
 
 
-def ingest_document(tenant_id: str, filename: str, data: bytes) -> Tuple[str, int, str]:
-    content_hash = _hash_bytes(data)
+_MAX_IN_VARIABLES = 900
+
+
+def _groups(values: Sequence[str]) -> Iterator[Sequence[str]]:
+    for start in range(0, len(values), _MAX_IN_VARIABLES):
+        yield values[start : start + _MAX_IN_VARIABLES]
+
+
+def _placeholders(values: Sequence[str]) -> str:
+    return ", ".join("?" * len(values))
+
+
+def register_documents(tenant_id: str, uploads: Sequence[Tuple[str, str]]) -> List[Tuple[str, str, bool]]:
+    """Register ``(filename, content_hash)`` uploads, deduplicating the whole batch with one lookup.
+
+    Returns ``(document_id, status, created)`` per upload, in order. ``created`` is False for content the
+    tenant already has (or that appears earlier in the same batch) and True when a job should run.
+    """
     conn = get_connection()
-    existing = conn.execute(
-        "SELECT document_id, status FROM documents WHERE tenant_id = ? AND content_hash = ?",
-        (tenant_id, content_hash),
-    ).fetchone()
-    if existing:
-        conn.close()
-        return existing["document_id"], 0, existing["status"]
-
-    document_id = str(uuid.uuid4())
+    hashes = list(dict.fromkeys(content_hash for _, content_hash in uploads))
+    existing: Dict[str, sqlite3.Row] = {}
+    for group in _groups(hashes):
+        rows = conn.execute(
+            "SELECT document_id, status, content_hash FROM documents "
+            f"WHERE tenant_id = ? AND content_hash IN ({_placeholders(group)})",
+            (tenant_id, *group),
+        ).fetchall()
+        existing.update((row["content_hash"], row) for row in rows)
+    filenames = list(dict.fromkeys(filename for filename, content_hash in uploads if content_hash not in existing))
+    previous: Dict[str, str] = {}
+    for group in _groups(filenames):
+        rows = conn.execute(
+            "SELECT document_id, filename FROM documents "
+            f"WHERE tenant_id = ? AND filename IN ({_placeholders(group)}) ORDER BY created_at",
+            (tenant_id, *group),
+        ).fetchall()
+        previous.update((row["filename"], row["document_id"]) for row in rows)
+
+    results: List[Tuple[str, str, bool]] = []
+    registered: Dict[str, Tuple[str, str]] = {}
     with conn:
-        conn.execute(
-            "INSERT INTO documents (document_id, tenant_id, filename, content_hash, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (
-                document_id,
-                tenant_id,
-                filename,
-                content_hash,
-                "processing",
-                datetime.now(timezone.utc).isoformat(),
-            ),
-        )
+        for filename, content_hash in uploads:
+            if content_hash in registered:
+                results.append((*registered[content_hash], False))
+                continue
+            row = existing.get(content_hash)
+            if row is not None and row["status"] != "failed":
+                registered[content_hash] = (row["document_id"], row["status"])
+                results.append((row["document_id"], row["status"], False))
+                continue
+            if row is not None:
+                document_id = row["document_id"]
+                conn.execute(
+                    "UPDATE documents SET filename = ?, status = ?, error = NULL WHERE document_id = ?",
+                    (filename, "queued", document_id),
+                )
+            elif filename in previous:
+                document_id = previous[filename]
+                conn.execute(
+                    "UPDATE documents SET content_hash = ?, version = version + 1, status = ?, error = NULL "
+                    "WHERE document_id = ?",
+                    (content_hash, "queued", document_id),
+                )
+            else:
+                document_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO documents (document_id, tenant_id, filename, content_hash, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (document_id, tenant_id, filename, content_hash, "queued", _now()),
+                )
+                previous[filename] = document_id
+            registered[content_hash] = (document_id, "queued")
+            results.append((document_id, "queued", True))
     conn.close()
+    return results
+
+
+def register_document(tenant_id: str, filename: str, content_hash: str) -> Tuple[str, str, bool]:
+    return register_documents(tenant_id, [(filename, content_hash)])[0]
+
 
-    text = extract_text(filename, data)
-    chunks = list(chunk_text(text, config.settings.max_chunk_chars))
-    vectors = embed_texts(chunks)
-    qdrant = get_qdrant()
+def _hash_chunk(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _stored_chunks(document_id: str) -> Tuple[Dict[str, Tuple[str, str]], List[Tuple[str, str]]]:
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT chunk_id, qdrant_id, text, chunk_hash FROM chunks WHERE document_id = ?",
+        (document_id,),
+    ).fetchall()
+    conn.close()
+    stored: Dict[str, Tuple[str, str]] = {}
+    duplicates: List[Tuple[str, str]] = []
+    for row in rows:
+        chunk_hash = row["chunk_hash"] or _hash_chunk(row["text"])
+        if chunk_hash in stored:
+            duplicates.append((row["chunk_id"], row["qdrant_id"]))
+        else:
+            stored[chunk_hash] = (row["chunk_id"], row["qdrant_id"])
+    return stored, duplicates
+
+
+class _DocumentJob:
+    """Diff state for one document while its chunks flow through shared embedding windows."""
+
+    __slots__ = (
+        "document_id", "tenant_id", "filename", "source", "version", "stored", "obsolete", "seen", "kept", "embedded",
+        "error",
+    )
+
+    def __init__(
+        self, document_id: str, tenant_id: str, filename: str, source: bytes | Path, version: int | None = None
+    ) -> None:
+        self.document_id = document_id
+        self.tenant_id = tenant_id
+        self.filename = filename
+        self.source = source
+        self.version = version
+        self.stored, self.obsolete = _stored_chunks(document_id)
+        self.seen: set[str] = set()
+        self.kept: List[Tuple[int, str, str]] = []
+        self.embedded = 0
+        self.error: Exception | None = None
+
+
+PendingChunk = Tuple[_DocumentJob, int, str, str]
+
+
+def _changed_chunks(job: _DocumentJob) -> Iterator[PendingChunk]:
+    try:
+        for chunk in chunk_stream(iter_text(job.filename, job.source), config.settings.max_chunk_chars):
+            chunk_hash = _hash_chunk(chunk)
+            if chunk_hash in job.seen:
+                continue
+            idx = len(job.seen)
+            job.seen.add(chunk_hash)
+            if chunk_hash in job.stored:
+                job.kept.append((idx, chunk_hash, job.stored[chunk_hash][0]))
+            else:
+                yield job, idx, chunk, chunk_hash
+    except Exception as exc:  # noqa: BLE001 - an unreadable file fails only its own document
+        job.error = exc
+
+
+def _windows(chunks: Iterable[PendingChunk], size: int) -> Iterator[List[PendingChunk]]:
+    chunks = iter(chunks)
+    while window := list(itertools.islice(chunks, size)):
+        yield window
+
+
+def _index_window(window: List[PendingChunk]) -> None:
+    vectors = embed_texts([chunk for _, _, chunk, _ in window])
     points = []
     chunk_rows = []
-    for idx, (chunk, vector) in enumerate(zip(chunks, vectors)):
-        qdrant_id = str(uuid.uuid4())
+    fts_rows = []
+    for (job, idx, chunk, chunk_hash), vector in zip(window, vectors):
+        namespace = uuid.UUID(job.document_id)
+        qdrant_id = str(uuid.uuid5(namespace, f"point-{chunk_hash}"))
         points.append(
             (
                 qdrant_id,
                 vector,
                 {
-                    "tenant_id": tenant_id,
-                    "document_id": document_id,
+                    "tenant_id": job.tenant_id,
+                    "document_id": job.document_id,
                     "chunk_index": idx,
                     "text": chunk,
-                    "source": filename,
+                    "source": job.filename,
                 },
             )
         )
-        chunk_rows.append((str(uuid.uuid4()), tenant_id, document_id, idx, chunk, qdrant_id))
-
-    if points:
-        qdrant.upsert(points)
+        chunk_id = str(uuid.uuid5(namespace, f"chunk-{chunk_hash}"))
+        chunk_rows.append((chunk_id, job.tenant_id, job.document_id, idx, chunk, qdrant_id, chunk_hash))
+        fts_rows.append((chunk_id, job.tenant_id, job.document_id, job.filename, chunk))
+        job.embedded += 1
 
+    get_vector_store().upsert(points)
     conn = get_connection()
     with conn:
         conn.executemany(
-            "INSERT INTO chunks (chunk_id, tenant_id, document_id, chunk_index, text, qdrant_id) VALUES (?, ?, ?, ?, ?, ?)",
+            "INSERT INTO chunks (chunk_id, tenant_id, document_id, chunk_index, text, qdrant_id, chunk_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
             chunk_rows,
         )
-        conn.execute(
-            "UPDATE documents SET status = ? WHERE document_id = ?",
-            ("ready", document_id),
-        )
+        lexical.index_chunks(conn, fts_rows)
+    conn.close()
+
+
+def _retire_chunks(document_id: str, tenant_id: str, obsolete: List[Tuple[str, str]]) -> None:
+    if not obsolete:
+        return
+    get_vector_store().delete(tenant_id, [point_id for _, point_id in obsolete])
+    chunk_ids = [chunk_id for chunk_id, _ in obsolete]
+    conn = get_connection()
+    with conn:
+        conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in chunk_ids])
+        lexical.delete_chunks(conn, document_id, chunk_ids)
     conn.close()
 
-    logger.info("ingest_complete", extra={"extra": {"tenant_id": tenant_id, "document_id": document_id}})
-    return document_id, len(chunks), "ready"
+
+def _finish_document(job: _DocumentJob) -> None:
+    conn = get_connection()
+    with conn:
+        conn.executemany("UPDATE chunks SET chunk_index = ?, chunk_hash = ? WHERE chunk_id = ?", job.kept)
+    conn.close()
+    job.obsolete.extend(ids for chunk_hash, ids in job.stored.items() if chunk_hash not in job.seen)
+    _retire_chunks(job.document_id, job.tenant_id, job.obsolete)
+    set_status(job.document_id, "ready", version=job.version)
+    logger.info(
+        "ingest_complete",
+        extra={
+            "extra": {
+                "tenant_id": job.tenant_id,
+                "document_id": job.document_id,
+                "chunks": len(job.seen),
+                "embedded": job.embedded,
+                "removed": len(job.obsolete),
+            }
+        },
+    )
+
+
+def _fail(document_id: str, exc: Exception, version: int | None = None) -> None:
+    logger.error("ingest_failed", extra={"extra": {"document_id": document_id, "error": str(exc)}})
+    set_status(document_id, "failed", str(exc), version)
+
+
+def _process_jobs(
+    documents: Sequence[Tuple[str, str, str, bytes | Path]], versions: Mapping[str, int] | None = None
+) -> List[_DocumentJob]:
+    versions = versions or {}
+    jobs: List[_DocumentJob] = []
+    finished: set[str] = set()
+    try:
+        for document_id, tenant_id, filename, source in documents:
+            set_status(document_id, "processing", version=versions.get(document_id))
+            jobs.append(_DocumentJob(document_id, tenant_id, filename, source, versions.get(document_id)))
+        pending = itertools.chain.from_iterable(_changed_chunks(job) for job in jobs)
+        for window in _windows(pending, config.settings.ingest_window_size):
+            _index_window(window)
+        for job in jobs:
+            if job.error is not None:
+                _fail(job.document_id, job.error, job.version)
+            else:
+                _finish_document(job)
+            finished.add(job.document_id)
+    except Exception as exc:
+        for document_id, _, _, _ in documents:
+            if document_id not in finished:
+                _fail(document_id, exc, versions.get(document_id))
+        raise
+    for tenant_id in {job.tenant_id for job in jobs}:
+        get_answer_cache().invalidate(tenant_id)
+    return jobs
+
+
+def process_documents(
+    documents: Sequence[Tuple[str, str, str, bytes | Path]], versions: Mapping[str, int] | None = None
+) -> Dict[str, int]:
+    """Index ``(document_id, tenant_id, filename, source)`` documents through shared embedding windows.
+
+    Chunks from consecutive documents are packed into the same embedding batches and vector upserts, so
+    many small files cost about as many embedding calls as one large file. Returns unique chunk counts for
+    the documents that were indexed; a file that cannot be read is marked failed on its own row. Status
+    updates for documents listed in ``versions`` only apply while the row is still at that version.
+    """
+    return {job.document_id: len(job.seen) for job in _process_jobs(documents, versions) if job.error is None}
+
+
+def process_document(document_id: str, tenant_id: str, filename: str, source: bytes | Path) -> int:
+    (job,) = _process_jobs([(document_id, tenant_id, filename, source)])
+    if job.error is not None:
+        raise job.error
+    return len(job.seen)
+
+
+def ingest_document(tenant_id: str, filename: str, data: bytes) -> Tuple[str, int, str]:
+    document_id, status, created = register_document(tenant_id, filename, _hash_bytes(data))
+    if not created:
+        return document_id, 0, status
+    chunks = process_document(document_id, tenant_id, filename, data)
+    return document_id, chunks, "ready"
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from tourassist.app import config
+from tourassist.app.models.db import get_connection
+from tourassist.app.observability.logger import get_logger
+from tourassist.app.rag import ingestion
+
+logger = get_logger(__name__)
+
+
+class IngestQueue:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._running: set[str] = set()
+        self._idle = threading.Condition()
+
+    @staticmethod
+    def upload_path(document_id: str, content_hash: str) -> Path:
+        return config.settings.data_dir / "uploads" / f"{document_id}-{content_hash[:16]}"
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self.resume()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    @staticmethod
+    def spool_path() -> Path:
+        path = config.settings.data_dir / "uploads" / f"incoming-{uuid.uuid4()}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def enqueue(self, tenant_id: str, filename: str, spooled: Path, content_hash: str) -> Tuple[str, str]:
+        document_id, status, created = ingestion.register_document(tenant_id, filename, content_hash)
+        if not created:
+            spooled.unlink(missing_ok=True)
+            return document_id, status
+        spooled.replace(self.upload_path(document_id, content_hash))
+        self.submit(document_id, content_hash)
+        return document_id, status
+
+    def enqueue_batch(
+        self, tenant_id: str, uploads: Sequence[Tuple[str, Path, str]]
+    ) -> List[Tuple[str, str, bool]]:
+        """Register ``(filename, spooled, content_hash)`` uploads together and index them in shared batches.
+
+        Returns ``(document_id, status, created)`` per upload, as ``ingestion.register_documents`` does.
+        """
+        registered = ingestion.register_documents(
+            tenant_id, [(filename, content_hash) for filename, _, content_hash in uploads]
+        )
+        jobs: List[Tuple[str, str]] = []
+        for (_, spooled, content_hash), (document_id, _, created) in zip(uploads, registered):
+            if created:
+                spooled.replace(self.upload_path(document_id, content_hash))
+                jobs.append((document_id, content_hash))
+            else:
+                spooled.unlink(missing_ok=True)
+        size = max(1, config.settings.ingest_batch_documents)
+        for start in range(0, len(jobs), size):
+            self.submit_batch(jobs[start : start + size])
+        return registered
+
+    def submit(self, document_id: str, content_hash: str) -> None:
+        self.submit_batch([(document_id, content_hash)])
+
+    def submit_batch(self, jobs: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+            self._executor.submit(self._run_batch, jobs)
+
+    def resume(self) -> None:
+        for stale in (config.settings.data_dir / "uploads").glob("incoming-*"):
+            stale.unlink(missing_ok=True)
+        conn = get_connection()
+        rows = conn.execute(
+            "SELECT document_id, content_hash FROM documents "
+            "WHERE status IN ('queued', 'processing') ORDER BY created_at"
+        ).fetchall()
+        conn.close()
+        for row in rows:
+            document_id = row["document_id"]
+            if self.upload_path(document_id, row["content_hash"]).exists():
+                logger.info("ingest_resumed", extra={"extra": {"document_id": document_id}})
+                ingestion.set_status(document_id, "queued")
+                self.submit(document_id, row["content_hash"])
+            else:
+                ingestion.set_status(document_id, "failed", "upload no longer available")
+
+    def _claim(self, document_ids: List[str]) -> None:
+        with self._idle:
+            while any(document_id in self._running for document_id in document_ids):
+                self._idle.wait()
+            self._running.update(document_ids)
+
+    def _release(self, document_ids: List[str]) -> None:
+        with self._idle:
+            self._running.difference_update(document_ids)
+            self._idle.notify_all()
+
+    @staticmethod
+    def _fail_all(document_ids: List[str], exc: Exception) -> None:
+        for document_id in document_ids:
+            try:
+                ingestion.set_status(document_id, "failed", str(exc) or type(exc).__name__)
+            except Exception:
+                logger.exception("ingest_status_failed", extra={"extra": {"document_id": document_id}})
+
+    def _run(self, document_id: str, content_hash: str) -> None:
+        self._run_batch([(document_id, content_hash)])
+
+    def _run_batch(self, jobs: List[Tuple[str, str]]) -> None:
+        document_ids = [document_id for document_id, _ in jobs]
+        paths = [self.upload_path(document_id, content_hash) for document_id, content_hash in jobs]
+        self._claim(document_ids)
+        handed_off = False
+        try:
+            conn = get_connection()
+            rows = {
+                row["document_id"]: row
+                for row in conn.execute(
+                    "SELECT document_id, tenant_id, filename, content_hash, version FROM documents "
+                    f"WHERE document_id IN ({', '.join('?' * len(document_ids))})",
+                    document_ids,
+                )
+            }
+            conn.close()
+            documents = []
+            versions = {}
+            for (document_id, content_hash), path in zip(jobs, paths):
+                row = rows.get(document_id)
+                # A newer upload of the same file supersedes this job.
+                if row is None or row["content_hash"] != content_hash:
+                    continue
+                if not path.exists():
+                    ingestion.set_status(document_id, "failed", "upload no longer available", row["version"])
+                    continue
+                documents.append((document_id, row["tenant_id"], row["filename"], path))
+                versions[document_id] = row["version"]
+            if documents:
+                handed_off = True
+                # A newer version queued while this batch runs keeps its own status.
+                ingestion.process_documents(documents, versions)
+        except Exception as exc:
+            logger.exception("ingest_batch_failed", extra={"extra": {"document_ids": document_ids, "error": str(exc)}})
+            # process_documents records its own failures; anything earlier left the rows queued.
+            if not handed_off:
+                self._fail_all(document_ids, exc)
+        finally:
+            for path in paths:
+                path.unlink(missing_ok=True)
+            self._release(document_ids)
+
+
+_ingest_queue: IngestQueue | None = None
+
+
+def get_ingest_queue() -> IngestQueue:
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = IngestQueue(config.settings.ingest_workers)
+    return _ingest_queue
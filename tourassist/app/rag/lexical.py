@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, List, Tuple
+
+from tourassist.app.models.db import get_connection
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_QUERY_TERMS = 16
+_KEYWORD_QUERY_TERMS = 4
+
+_STOPWORDS = frozenset(
+    "a an and are at be by can do does for from how i in is it me of on or please the to what when where which "
+    "who why will with you your".split()
+)
+
+
+def tenant_key(tenant_id: str) -> str:
+    return "t" + hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:20]
+
+
+def document_key(document_id: str) -> str:
+    return "d" + document_id.replace("-", "")
+
+
+def _tokens(text: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _TOKEN_RE.findall("".join(char for char in folded if not unicodedata.combining(char)))
+
+
+def query_terms(query: str) -> List[str]:
+    terms = [term for term in _tokens(query) if term not in _STOPWORDS]
+    return list(dict.fromkeys(terms))[:_MAX_QUERY_TERMS]
+
+
+def is_keyword_query(query: str) -> bool:
+    terms = query_terms(query)
+    return 0 < len(terms) <= _KEYWORD_QUERY_TERMS and len(_TOKEN_RE.findall(query)) <= _KEYWORD_QUERY_TERMS + 2
+
+
+def index_chunks(conn: sqlite3.Connection, rows: Iterable[Tuple[str, str, str, str, str]]) -> None:
+    conn.executemany(
+        "INSERT INTO chunks_fts (text, tenant_key, doc_key, chunk_id, document_id, source) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (text, tenant_key(tenant_id), document_key(document_id), chunk_id, document_id, source)
+            for chunk_id, tenant_id, document_id, source, text in rows
+        ],
+    )
+
+
+def delete_chunks(conn: sqlite3.Connection, document_id: str, chunk_ids: Iterable[str]) -> None:
+    wanted = set(chunk_ids)
+    if not wanted:
+        return
+    rows = conn.execute(
+        "SELECT rowid, chunk_id FROM chunks_fts WHERE chunks_fts MATCH ?",
+        (f'doc_key:"{document_key(document_id)}"',),
+    ).fetchall()
+    conn.executemany(
+        "DELETE FROM chunks_fts WHERE rowid = ?",
+        [(row["rowid"],) for row in rows if row["chunk_id"] in wanted],
+    )
+
+
+def _coverage(terms: List[str], text: str) -> float:
+    present = set(_tokens(text))
+    return sum(term in present for term in terms) / len(terms)
+
+
+def search(tenant_id: str, query: str, limit: int) -> List[dict]:
+    terms = query_terms(query)
+    if not terms or limit <= 0:
+        return []
+    alternatives = " OR ".join(f'"{term}"' for term in terms)
+    expression = f'tenant_key:"{tenant_key(tenant_id)}" AND text:({alternatives})'
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT document_id, text, source FROM chunks_fts WHERE chunks_fts MATCH ? "
+        "ORDER BY bm25(chunks_fts, 1.0, 0.0, 0.0) LIMIT ?",
+        (expression, limit),
+    ).fetchall()
+    conn.close()
+    return [
+        {
+            "document_id": row["document_id"],
+            "text": row["text"],
+            "source": row["source"],
+            "lexical_score": _coverage(terms, row["text"]),
+        }
+        for row in rows
+    ]
+
+
+def backfill() -> int:
+    conn = get_connection()
+    indexed = conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+    if indexed:
+        conn.close()
+        return 0
+    rows = conn.execute(
+        "SELECT chunks.chunk_id, chunks.tenant_id, chunks.document_id, documents.filename, chunks.text "
+        "FROM chunks JOIN documents ON documents.document_id = chunks.document_id"
+    ).fetchall()
+    with conn:
+        index_chunks(conn, [tuple(row) for row in rows])
+    conn.close()
+    return len(rows)
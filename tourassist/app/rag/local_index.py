@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+_owned_roots: Dict[Path, IO[bytes]] = {}
+_owned_lock = threading.Lock()
+
+
+def _claim_root(root: Path) -> None:
+    """Take an exclusive lock on ``root`` for this process.
+
+    Row assignments live in memory, so two processes appending to the same partition would corrupt it. A
+    second process (e.g. another uvicorn worker) fails fast here instead.
+    """
+    root = root.resolve()
+    with _owned_lock:
+        if root in _owned_roots:
+            return
+        root.mkdir(parents=True, exist_ok=True)
+        handle = (root / ".lock").open("ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                raise RuntimeError(
+                    f"local vector index {root} is in use by another process; the local backend is single-process "
+                    "only, use the qdrant backend with several workers"
+                ) from None
+        _owned_roots[root] = handle
+
+
+class _Partition:
+    def __init__(self, directory: Path, dims: int) -> None:
+        self.directory = directory
+        self.dims = dims
+        self.vectors_path = directory / "vectors.f32"
+        self.meta_path = directory / "meta.jsonl"
+        self.lock = threading.Lock()
+        self.rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.payloads: List[dict] = []
+        self.alive: List[bool] = []
+        self._matrix: np.ndarray | None = None
+        self._mask: np.ndarray | None = None
+        self._load()
+
+    def _load(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.meta_path.exists():
+            self._load_meta()
+        # Vectors are appended before their metadata, so a crash in between leaves extra rows (or a partial
+        # one) at the end; drop them so the next append lands on row len(ids).
+        expected = len(self.ids) * self.dims * 4
+        stored = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        if stored < expected:
+            raise ValueError(f"vector file {self.vectors_path} is shorter than its metadata")
+        if stored > expected:
+            os.truncate(self.vectors_path, expected)
+
+    def _load_meta(self) -> None:
+        with self.meta_path.open("rb") as raw:
+            data = raw.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # A torn final line from a crash mid-write.
+            os.truncate(self.meta_path, complete)
+        for line in data[:complete].decode("utf-8").splitlines():
+            record = json.loads(line)
+            pid = record["id"]
+            row = self.rows.get(pid)
+            if record.get("deleted"):
+                if row is not None:
+                    self.alive[row] = False
+                    self.payloads[row] = {}
+                continue
+            if row is None:
+                row = record["row"]
+                self.rows[pid] = row
+                self.ids.append(pid)
+                self.payloads.append(record["payload"])
+                self.alive.append(True)
+            else:
+                self.payloads[row] = record["payload"]
+                self.alive[row] = True
+
+    def _invalidate(self) -> None:
+        self._matrix = None
+        self._mask = None
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            if self.ids:
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.dims))
+            else:
+                self._matrix = np.zeros((0, self.dims), dtype=np.float32)
+            self._mask = np.asarray(self.alive, dtype=bool)
+        return self._matrix, self._mask
+
+    def upsert(self, points: Sequence[Tuple[str, np.ndarray, dict]]) -> None:
+        appended: List[np.ndarray] = []
+        records = []
+        with self.lock:
+            self._invalidate()
+            updates: List[Tuple[int, np.ndarray]] = []
+            for pid, vector, payload in points:
+                row = self.rows.get(pid)
+                if row is None:
+                    row = len(self.ids)
+                    self.rows[pid] = row
+                    self.ids.append(pid)
+                    self.payloads.append(payload)
+                    self.alive.append(True)
+                    appended.append(vector)
+                else:
+                    self.payloads[row] = payload
+                    self.alive[row] = True
+                    updates.append((row, vector))
+                records.append({"id": pid, "row": row, "payload": payload})
+            if appended:
+                with self.vectors_path.open("ab") as handle:
+                    handle.write(np.vstack(appended).astype(np.float32).tobytes())
+            if updates:
+                matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(len(self.ids), self.dims))
+                for row, vector in updates:
+                    matrix[row] = vector
+                matrix.flush()
+                del matrix
+            with self.meta_path.open("a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(record) + "\n" for record in records)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self.lock:
+            records = []
+            for pid in ids:
+                row = self.rows.get(pid)
+                if row is None or not self.alive[row]:
+                    continue
+                self.alive[row] = False
+                self.payloads[row] = {}
+                records.append({"id": pid, "deleted": True})
+            if records:
+                self._invalidate()
+                with self.meta_path.open("a", encoding="utf-8") as handle:
+                    handle.writelines(json.dumps(record) + "\n" for record in records)
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[float, dict]]:
+        with self.lock:
+            matrix, mask = self.matrix()
+            payloads = self.payloads
+        if not len(matrix) or top_k <= 0:
+            return []
+        scores = np.asarray(matrix @ query, dtype=np.float32)
+        scores[~mask] = -np.inf
+        k = min(top_k, int(mask.sum()))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[row]), payloads[row]) for row in best]
+
+
+def _normalise(vector: Sequence[float]) -> np.ndarray:
+    values = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(values))
+    return values / norm if norm else values
+
+
+class LocalIndex:
+    def __init__(self, root: Path, dims: int) -> None:
+        self.root = root
+        self.dims = dims
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+        _claim_root(root)
+
+    def partition(self, tenant_id: str) -> _Partition:
+        with self._lock:
+            partition = self._partitions.get(tenant_id)
+            if partition is None:
+                name = hashlib.sha256(tenant_id.encode("utf-8")).hexdigest()[:32]
+                partition = self._partitions[tenant_id] = _Partition(self.root / name, self.dims)
+            return partition
+
+    def upsert(self, points: Sequence[Tuple[str, Sequence[float], dict]]) -> None:
+        by_tenant: Dict[str, List[Tuple[str, np.ndarray, dict]]] = {}
+        for pid, vector, payload in points:
+            by_tenant.setdefault(payload["tenant_id"], []).append((str(pid), _normalise(vector), payload))
+        for tenant_id, tenant_points in by_tenant.items():
+            self.partition(tenant_id).upsert(tenant_points)
+
+    def delete(self, tenant_id: str, ids: Iterable[str]) -> None:
+        self.partition(tenant_id).delete(str(pid) for pid in ids)
+
+    def search(self, vector: Sequence[float], tenant_id: str, top_k: int) -> List[Tuple[float, dict]]:
+        return self.partition(tenant_id).search(_normalise(vector), top_k)
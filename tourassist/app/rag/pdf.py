@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Tuple
+
+from pypdf import PdfReader
+
+from tourassist.app import config
+from tourassist.app.observability.logger import get_logger
+
+logger = get_logger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+# Pools terminated on purpose after a page timeout; other documents' ranges that break with them are retried.
+_terminated: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+_MAX_CRASHES = 1
+
+_worker_reader: Tuple[str, PdfReader] | None = None
+
+
+def _extract_range(path: str, key: str, start: int, stop: int) -> List[str]:
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = (key, PdfReader(path))
+    reader = _worker_reader[1]
+    return [reader.pages[idx].extract_text() or "" for idx in range(start, stop)]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.settings.pdf_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor, terminate: bool = False) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        if terminate:
+            _terminated.add(pool)
+    pool.shutdown(wait=False, cancel_futures=True)
+    if terminate:
+        # ProcessPoolExecutor has no public way to stop a worker stuck inside a task.
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+
+
+def _submit(
+    pool: ProcessPoolExecutor, path: str, key: str, start: int, stop: int
+) -> Tuple[ProcessPoolExecutor, Future]:
+    try:
+        return pool, pool.submit(_extract_range, path, key, start, stop)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        pool = _get_pool()
+        return pool, pool.submit(_extract_range, path, key, start, stop)
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_parallel(path: str, page_count: int) -> Iterator[str]:
+    stat = os.stat(path)
+    key = f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    per_task = max(1, config.settings.pdf_pages_per_task)
+    ranges = deque((start, min(start + per_task, page_count)) for start in range(0, page_count, per_task))
+    pool = _get_pool()
+    in_flight: Deque[Tuple[int, int, ProcessPoolExecutor, Future]] = deque()
+    crashes: Dict[Tuple[int, int], int] = {}
+    window = max(1, config.settings.pdf_workers) * 2
+    while ranges or in_flight:
+        while ranges and len(in_flight) < window:
+            start, stop = ranges.popleft()
+            pool, future = _submit(pool, path, key, start, stop)
+            in_flight.append((start, stop, pool, future))
+        start, stop, submitted_to, future = in_flight.popleft()
+        try:
+            pages = future.result(timeout=config.settings.pdf_page_timeout_s * (stop - start))
+        except FutureTimeout:
+            logger.warning("pdf_pages_timeout", extra={"extra": {"start_page": start, "stop_page": stop}})
+            pages = [""] * (stop - start)
+            ranges.extendleft(reversed([(s, e) for s, e, _, _ in in_flight]))
+            in_flight.clear()
+            _discard_pool(submitted_to, terminate=True)
+            pool = _get_pool()
+        except BrokenProcessPool:
+            # Either a worker died on one of our pages, or another document's timeout terminated the pool;
+            # only the former counts against the range. Everything in flight is resubmitted to a fresh pool.
+            _discard_pool(submitted_to)
+            pool = _get_pool()
+            if submitted_to not in _terminated:
+                crashes[(start, stop)] = crashes.get((start, stop), 0) + 1
+            pending = [(s, e) for s, e, _, _ in in_flight]
+            in_flight.clear()
+            if crashes.get((start, stop), 0) > _MAX_CRASHES:
+                logger.warning("pdf_pages_crashed", extra={"extra": {"start_page": start, "stop_page": stop}})
+                ranges.extendleft(reversed(pending))
+                pages = [""] * (stop - start)
+            else:
+                ranges.extendleft(reversed([(start, stop), *pending]))
+                continue
+        yield from pages
+
+
+def iter_pdf_pages(source: bytes | Path) -> Iterator[str]:
+    reader = PdfReader(source if isinstance(source, Path) else io.BytesIO(source))
+    page_count = len(reader.pages)
+    if config.settings.pdf_workers <= 1 or page_count < config.settings.pdf_parallel_min_pages:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+    del reader
+
+    if isinstance(source, Path):
+        yield from _iter_parallel(str(source), page_count)
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=config.settings.data_dir) as handle:
+        handle.write(source)
+        handle.flush()
+        yield from _iter_parallel(handle.name, page_count)
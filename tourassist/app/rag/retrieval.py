@@ -1,13 +1,83 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+from typing import Dict, List, Sequence, Tuple
 
 from tourassist.app import config
-from tourassist.app.rag.embeddings import embed_texts
-from tourassist.app.rag.vector_store import get_qdrant
+from tourassist.app.observability.tracing import span
+from tourassist.app.rag import lexical
+from tourassist.app.rag.embeddings import embed_texts, embed_texts_async
+from tourassist.app.rag.vector_store import get_vector_store
 
+_CANDIDATE_FACTOR = 3
 
-def retrieve_context(tenant_id: str, query: str) -> List[dict]:
-    vector = embed_texts([query])[0]
-    qdrant = get_qdrant()
-    return qdrant.query(vector, tenant_id, config.settings.top_k)
+
+def _candidates() -> int:
+    return config.settings.top_k * _CANDIDATE_FACTOR
+
+
+def fuse(result_lists: Sequence[List[dict]], top_k: int) -> List[dict]:
+    """Reciprocal-rank fusion. Vector hits carry a cosine ``score`` and lexical hits a term-coverage
+    ``lexical_score``; the two are kept side by side on fused items, never combined."""
+    k = config.settings.rrf_k
+    fused: Dict[Tuple[object, object], dict] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results):
+            contribution = 1.0 / (k + rank + 1)
+            key = (item.get("document_id"), item.get("text"))
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = dict(item, rrf_score=contribution)
+            else:
+                entry["rrf_score"] += contribution
+                for field, value in item.items():
+                    entry.setdefault(field, value)
+    return sorted(fused.values(), key=lambda item: item["rrf_score"], reverse=True)[:top_k]
+
+
+def _lexical_search(tenant_id: str, query: str) -> List[dict]:
+    if not config.settings.hybrid_search:
+        return []
+    with span("lexical"):
+        return lexical.search(tenant_id, query, _candidates())
+
+
+def _skip_embedding(query: str, lexical_hits: List[dict]) -> bool:
+    return bool(lexical_hits) and lexical.is_keyword_query(query)
+
+
+def keyword_context(tenant_id: str, query: str) -> List[dict]:
+    """Lexical-only results for a short keyword query, or nothing for any other query."""
+    if not lexical.is_keyword_query(query):
+        return []
+    return fuse([_lexical_search(tenant_id, query)], config.settings.top_k)
+
+
+def retrieve_context(
+    tenant_id: str, query: str, vector: Sequence[float] | None = None, *, embed: bool = True
+) -> List[dict]:
+    top_k = config.settings.top_k
+    lexical_hits = _lexical_search(tenant_id, query)
+    if vector is None and (not embed or _skip_embedding(query, lexical_hits)):
+        return fuse([lexical_hits], top_k)
+    if vector is None:
+        with span("embed_query"):
+            vector = embed_texts([query])[0]
+    with span("vector_search"):
+        vector_hits = get_vector_store().query(list(vector), tenant_id, _candidates())
+    return fuse([vector_hits, lexical_hits], top_k)
+
+
+async def retrieve_context_async(
+    tenant_id: str, query: str, vector: Sequence[float] | None = None, *, embed: bool = True
+) -> List[dict]:
+    top_k = config.settings.top_k
+    lexical_hits = await asyncio.to_thread(_lexical_search, tenant_id, query)
+    if vector is None and (not embed or _skip_embedding(query, lexical_hits)):
+        return fuse([lexical_hits], top_k)
+    if vector is None:
+        with span("embed_query"):
+            vector = (await embed_texts_async([query]))[0]
+    with span("vector_search"):
+        vector_hits = await get_vector_store().query_async(list(vector), tenant_id, _candidates())
+    return fuse([vector_hits, lexical_hits], top_k)
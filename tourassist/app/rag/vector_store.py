@@ -1,18 +1,72 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Tuple
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PointIdsList,
+    PointStruct,
+    VectorParams,
+)
 
 from tourassist.app import config
+from tourassist.app.rag.local_index import LocalIndex
 
+Point = Tuple[str, List[float], dict]
 
-class VectorStore:
+
+def _result(payload: dict, score: float) -> dict:
+    return {
+        "document_id": payload.get("document_id"),
+        "text": payload.get("text"),
+        "source": payload.get("source"),
+        "score": score,
+    }
+
+
+class VectorStore(ABC):
+    @abstractmethod
+    def upsert(self, points: List[Point]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, tenant_id: str, ids: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def query(self, vector: List[float], tenant_id: str, top_k: int) -> list[dict]:
+        ...
+
+    async def query_async(self, vector: List[float], tenant_id: str, top_k: int) -> list[dict]:
+        return await asyncio.to_thread(self.query, vector, tenant_id, top_k)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class QdrantVectorStore(VectorStore):
     def __init__(self) -> None:
         self.client = QdrantClient(url=config.settings.qdrant_url)
+        self._async_client: AsyncQdrantClient | None = None
         self._ensure_collection()
 
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        if self._async_client is None:
+            self._async_client = AsyncQdrantClient(url=config.settings.qdrant_url)
+        return self._async_client
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
     def _ensure_collection(self) -> None:
         collections = self.client.get_collections().collections
         if any(c.name == config.settings.qdrant_collection for c in collections):
@@ -22,37 +76,70 @@ class VectorStore:
             vectors_config=VectorParams(size=config.settings.embedding_dims, distance=Distance.COSINE),
         )
 
-    def upsert(self, points: List[Tuple[str, List[float], dict]]) -> None:
+    def upsert(self, points: List[Point]) -> None:
         self.client.upsert(
             collection_name=config.settings.qdrant_collection,
             points=[PointStruct(id=pid, vector=vector, payload=payload) for pid, vector, payload in points],
         )
 
+    def delete(self, tenant_id: str, ids: Iterable[str]) -> None:
+        self.client.delete(
+            collection_name=config.settings.qdrant_collection,
+            points_selector=PointIdsList(points=list(ids)),
+        )
+
+    @staticmethod
+    def _tenant_filter(tenant_id: str) -> Filter:
+        return Filter(must=[FieldCondition(key="tenant_id", match=MatchValue(value=tenant_id))])
+
     def query(self, vector: List[float], tenant_id: str, top_k: int) -> list[dict]:
         results = self.client.search(
             collection_name=config.settings.qdrant_collection,
             query_vector=vector,
             limit=top_k,
-            query_filter=Filter(
-                must=[FieldCondition(key="tenant_id", match=MatchValue(value=tenant_id))]
-            ),
+            query_filter=self._tenant_filter(tenant_id),
         )
-        return [
-            {
-                "document_id": hit.payload.get("document_id"),
-                "text": hit.payload.get("text"),
-                "source": hit.payload.get("source"),
-                "score": hit.score,
-            }
-            for hit in results
-        ]
+        return [_result(hit.payload, hit.score) for hit in results]
 
+    async def query_async(self, vector: List[float], tenant_id: str, top_k: int) -> list[dict]:
+        results = await self.async_client.search(
+            collection_name=config.settings.qdrant_collection,
+            query_vector=vector,
+            limit=top_k,
+            query_filter=self._tenant_filter(tenant_id),
+        )
+        return [_result(hit.payload, hit.score) for hit in results]
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self) -> None:
+        self.index = LocalIndex(config.settings.data_dir / "vectors", config.settings.embedding_dims)
+
+    def upsert(self, points: List[Point]) -> None:
+        self.index.upsert(points)
+
+    def delete(self, tenant_id: str, ids: Iterable[str]) -> None:
+        self.index.delete(tenant_id, ids)
+
+    def query(self, vector: List[float], tenant_id: str, top_k: int) -> list[dict]:
+        return [_result(payload, score) for score, payload in self.index.search(vector, tenant_id, top_k)]
+
+
+_BACKENDS = {"qdrant": QdrantVectorStore, "local": LocalVectorStore}
 
 _vector_store: VectorStore | None = None
 
 
-def get_qdrant() -> VectorStore:
+def get_vector_store() -> VectorStore:
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
+        backend = _BACKENDS.get(config.settings.vector_backend)
+        if backend is None:
+            raise ValueError(f"Unknown vector backend: {config.settings.vector_backend}")
+        _vector_store = backend()
     return _vector_store
+
+
+async def aclose() -> None:
+    if _vector_store is not None:
+        await _vector_store.aclose()
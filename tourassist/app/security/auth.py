@@ -1,53 +1,234 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import secrets
+import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Deque, Optional, Tuple
 
-from fastapi import Depends, Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 
+from tourassist.app import config
 from tourassist.app.models.db import get_connection
+from tourassist.app.models.generations import SharedGenerations
+from tourassist.app.observability.tracing import span
+
+_MISSING = object()
+_MAX_TRACKED = 10_000
 
 
 def generate_api_key() -> str:
     return secrets.token_urlsafe(32)
 
 
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    def __init__(
+        self,
+        ttl_s: float,
+        negative_ttl_s: float,
+        max_failures: int,
+        failure_window_s: float,
+        generations: SharedGenerations | None = None,
+    ) -> None:
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_failures = max_failures
+        self.failure_window_s = failure_window_s
+        self.generations = generations
+        self._entries: dict[str, Tuple[Optional[str], float, int]] = {}
+        self._failures: dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, tenant_id: str) -> int:
+        return self.generations.current(tenant_id) if self.generations is not None else 0
+
+    def get(self, tenant_id: str) -> object:
+        entry = self._entries.get(tenant_id)
+        if entry is None or entry[1] < time.monotonic() or entry[2] != self.generation(tenant_id):
+            return _MISSING
+        return entry[0]
+
+    def store(self, tenant_id: str, key_hash: Optional[str], generation: int) -> None:
+        """``generation`` must be read before ``key_hash`` was loaded, so a concurrent rotation isn't masked."""
+        ttl = self.ttl_s if key_hash is not None else self.negative_ttl_s
+        now = time.monotonic()
+        if len(self._entries) >= _MAX_TRACKED:
+            with self._lock:
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[1] >= now}
+        self._entries[tenant_id] = (key_hash, now + ttl, generation)
+
+    def evict(self, tenant_id: str) -> None:
+        self._entries.pop(tenant_id, None)
+        if self.generations is not None:
+            self.generations.bump(tenant_id)
+
+    def _recent(self, key: Tuple[str, str], now: float) -> Deque[float]:
+        attempts = self._failures.setdefault(key, deque())
+        while attempts and now - attempts[0] > self.failure_window_s:
+            attempts.popleft()
+        return attempts
+
+    def throttled(self, tenant_id: str, client: str) -> bool:
+        if self.max_failures <= 0 or (tenant_id, client) not in self._failures:
+            return False
+        with self._lock:
+            attempts = self._recent((tenant_id, client), time.monotonic())
+            if not attempts:
+                del self._failures[(tenant_id, client)]
+            return len(attempts) >= self.max_failures
+
+    def record_failure(self, tenant_id: str, client: str) -> None:
+        if self.max_failures <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if len(self._failures) >= _MAX_TRACKED:
+                self._failures = {
+                    key: attempts
+                    for key, attempts in self._failures.items()
+                    if attempts and now - attempts[-1] <= self.failure_window_s
+                }
+            self._recent((tenant_id, client), now).append(now)
+
+
+_auth_cache: AuthCache | None = None
+
+
+def get_auth_cache() -> AuthCache:
+    global _auth_cache
+    if _auth_cache is None:
+        _auth_cache = AuthCache(
+            config.settings.auth_cache_ttl_s,
+            config.settings.auth_negative_ttl_s,
+            config.settings.auth_max_failures,
+            config.settings.auth_failure_window_s,
+            SharedGenerations("auth", config.settings.cache_sync_interval_s),
+        )
+    return _auth_cache
+
+
 def create_tenant(tenant_id: str) -> dict[str, str]:
     api_key = generate_api_key()
     conn = get_connection()
     with conn:
         conn.execute(
-            "INSERT INTO tenants (tenant_id, api_key, created_at) VALUES (?, ?, ?)",
-            (tenant_id, api_key, datetime.now(timezone.utc).isoformat()),
+            "INSERT INTO tenants (tenant_id, api_key_hash, created_at) VALUES (?, ?, ?)",
+            (tenant_id, hash_api_key(api_key), datetime.now(timezone.utc).isoformat()),
         )
     conn.close()
+    get_auth_cache().evict(tenant_id)
     return {"tenant_id": tenant_id, "api_key": api_key}
 
 
-def validate_api_key(tenant_id: str, api_key: str) -> bool:
+def rotate_api_key(tenant_id: str) -> dict[str, str]:
+    api_key = generate_api_key()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE tenants SET api_key_hash = ?, revoked_at = NULL WHERE tenant_id = ?",
+            (hash_api_key(api_key), tenant_id),
+        )
+    conn.close()
+    get_auth_cache().evict(tenant_id)
+    return {"tenant_id": tenant_id, "api_key": api_key}
+
+
+def revoke_api_key(tenant_id: str) -> None:
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE tenants SET revoked_at = ? WHERE tenant_id = ?",
+            (datetime.now(timezone.utc).isoformat(), tenant_id),
+        )
+    conn.close()
+    get_auth_cache().evict(tenant_id)
+
+
+def _load_key_hash(tenant_id: str) -> Optional[str]:
+    generation = get_auth_cache().generation(tenant_id)
     conn = get_connection()
     row = conn.execute(
-        "SELECT api_key FROM tenants WHERE tenant_id = ?",
+        "SELECT api_key_hash FROM tenants WHERE tenant_id = ? AND revoked_at IS NULL",
         (tenant_id,),
     ).fetchone()
     conn.close()
-    return row is not None and secrets.compare_digest(row["api_key"], api_key)
+    key_hash = row["api_key_hash"] if row else None
+    get_auth_cache().store(tenant_id, key_hash, generation)
+    return key_hash
+
+
+def _matches(key_hash: object, api_key: str) -> bool:
+    return isinstance(key_hash, str) and secrets.compare_digest(key_hash, hash_api_key(api_key))
+
+
+def validate_api_key(tenant_id: str, api_key: str) -> bool:
+    key_hash = get_auth_cache().get(tenant_id)
+    if key_hash is _MISSING:
+        key_hash = _load_key_hash(tenant_id)
+    return _matches(key_hash, api_key)
+
+
+def _client_id(request: Optional[Request]) -> str:
+    if request is None or request.client is None:
+        return ""
+    return request.client.host
+
+
+def _check_attempt(tenant_id: str, api_key: Optional[str], client: str) -> None:
+    if not api_key:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing API key")
+
+
+def _reject(tenant_id: str, client: str) -> None:
+    # Only failed attempts are throttled: clients behind one proxy share an address, and a burst of bad
+    # keys from one of them must not lock the tenant's valid keys out.
+    cache = get_auth_cache()
+    if cache.throttled(tenant_id, client):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many failed attempts")
+    cache.record_failure(tenant_id, client)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
 
 
 def require_api_key(
     tenant_id: str,
+    request: Request,
     x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
 ) -> str:
-    if not x_api_key:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing API key")
-    if not validate_api_key(tenant_id, x_api_key):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+    with span("auth"):
+        client = _client_id(request)
+        _check_attempt(tenant_id, x_api_key, client)
+        if not validate_api_key(tenant_id, x_api_key):
+            _reject(tenant_id, client)
     return x_api_key
 
 
-def enforce_api_key(tenant_id: str, api_key: Optional[str]) -> None:
-    if not api_key:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing API key")
+def enforce_api_key(tenant_id: str, api_key: Optional[str], request: Optional[Request] = None) -> None:
+    client = _client_id(request)
+    _check_attempt(tenant_id, api_key, client)
     if not validate_api_key(tenant_id, api_key):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid API key")
+        _reject(tenant_id, client)
+
+
+async def enforce_api_key_async(tenant_id: str, api_key: Optional[str], request: Optional[Request] = None) -> None:
+    with span("auth"):
+        client = _client_id(request)
+        _check_attempt(tenant_id, api_key, client)
+        key_hash = get_auth_cache().get(tenant_id)
+        if key_hash is _MISSING:
+            try:
+                key_hash = await asyncio.wait_for(
+                    asyncio.to_thread(_load_key_hash, tenant_id), config.settings.auth_timeout_s
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authentication unavailable"
+                )
+        if not _matches(key_hash, api_key):
+            _reject(tenant_id, client)
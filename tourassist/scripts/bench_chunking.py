@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Iterator, List
+
+from tourassist.app.agents.tokenizer import count_tokens
+from tourassist.app.rag.chunking import iter_chunks
+
+_WORDS = (
+    "castle museum harbour ferry tram gallery market garden tour guide ticket opens closes daily "
+    "weekend summer winter entrance north south bridge station café lighthouse island walking"
+).split()
+
+
+def _corpus(megabytes: float, paragraph_sentences: int, seed: int = 7) -> Iterator[str]:
+    """Segments of ~64 KiB, cut at paragraph boundaries like the file and PDF readers produce."""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    produced = 0
+    segment: List[str] = []
+    segment_size = 0
+    while produced < target:
+        sentences = [
+            " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 24))).capitalize() + rng.choice(".!?")
+            for _ in range(paragraph_sentences)
+        ]
+        paragraph = " ".join(sentences)
+        segment.append(paragraph)
+        segment_size += len(paragraph) + 1
+        produced += len(paragraph) + 1
+        if segment_size >= 64 * 1024:
+            yield "\n".join(segment)
+            segment, segment_size = [], 0
+    if segment:
+        yield "\n".join(segment)
+
+
+def _run(args: argparse.Namespace, megabytes: float) -> None:
+    segments = list(_corpus(megabytes, args.paragraph_sentences))
+    size = sum(len(segment) for segment in segments)
+    start = time.perf_counter()
+    chunks = list(iter_chunks(segments, args.max_chars, args.overlap, args.max_tokens))
+    elapsed = time.perf_counter() - start
+    lengths = sorted(len(chunk) for chunk in chunks)
+    p95 = lengths[int(0.95 * (len(lengths) - 1))]
+    line = (
+        f"{megabytes:6.1f} MiB {elapsed:7.2f}s {size / elapsed / 1e6:7.2f} MB/s {len(chunks):8d} chunks "
+        f"chars mean {statistics.fmean(lengths):6.1f} p95 {p95:5d} max {lengths[-1]:5d}"
+    )
+    if args.max_tokens:
+        sample = chunks[:: max(1, len(chunks) // 1000)]
+        line += f" tokens max {max(count_tokens(chunk) for chunk in sample):4d}"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chunker throughput and chunk-size distribution on large corpora")
+    parser.add_argument("--sizes", default="8,16,32", help="comma-separated corpus sizes in MiB")
+    parser.add_argument("--max-chars", type=int, default=800)
+    parser.add_argument("--overlap", type=int, default=120)
+    parser.add_argument("--max-tokens", type=int, default=0)
+    parser.add_argument(
+        "--paragraph-sentences", type=int, default=400, help="sentences per paragraph; large values mimic PDF text"
+    )
+    args = parser.parse_args()
+    for megabytes in (float(size) for size in args.sizes.split(",")):
+        _run(args, megabytes)
+
+
+if __name__ == "__main__":
+    main()
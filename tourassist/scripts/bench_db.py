@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from tourassist.app.models.db import SCHEMA_STATEMENTS, close_pools, get_connection
+
+_QUERY = "SELECT api_key_hash FROM tenants WHERE tenant_id = ?"
+
+
+def _unpooled(db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute(_QUERY, ("tenant-42",)).fetchone()
+    conn.close()
+
+
+def _pooled(db_path: Path) -> None:
+    conn = get_connection(db_path)
+    conn.execute(_QUERY, ("tenant-42",)).fetchone()
+    conn.close()
+
+
+def _measure(label: str, operation: Callable[[Path], None], db_path: Path, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        operation(db_path)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation(db_path)
+    per_op_us = (time.perf_counter() - start) / iterations * 1_000_000
+    print(f"{label:<10} {per_op_us:8.1f} us/op")
+    return per_op_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request SQLite overhead: fresh connections vs the pool")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--tenants", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        conn = sqlite3.connect(db_path)
+        with conn:
+            for statement in SCHEMA_STATEMENTS:
+                conn.execute(statement)
+            conn.executemany(
+                "INSERT INTO tenants (tenant_id, api_key_hash, created_at) VALUES (?, ?, ?)",
+                [(f"tenant-{idx}", f"key-{idx}", "2024-01-01T00:00:00+00:00") for idx in range(args.tenants)],
+            )
+        conn.close()
+
+        before = _measure("unpooled", _unpooled, db_path, args.iterations)
+        after = _measure("pooled", _pooled, db_path, args.iterations)
+        close_pools()
+    print(f"speedup    {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+
+from fake_openai import create_app
+from tourassist.app import config
+from tourassist.app.agents.chat import LOW_CONFIDENCE_RESPONSE
+from tourassist.app.models.db import init_db
+from tourassist.app.observability.metrics import metrics_store
+from tourassist.app.security.auth import create_tenant
+
+_TENANT = "bench"
+_STAGES = ("auth", "embed_query", "lexical", "vector_search", "llm")
+_VENUES = ("spa", "museum", "aquarium", "castle", "harbour", "market", "gallery", "botanic garden")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app: Any) -> tuple[uvicorn.Server, str]:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summarise(latencies_ms: List[float], errors: int, wall_s: float) -> Dict[str, Any]:
+    ordered = sorted(latencies_ms)
+    return {
+        "requests": len(latencies_ms) + errors,
+        "errors": errors,
+        "rps": round(len(latencies_ms) / wall_s, 2) if wall_s else 0.0,
+        "p50_ms": round(_percentile(ordered, 50), 2),
+        "p95_ms": round(_percentile(ordered, 95), 2),
+        "p99_ms": round(_percentile(ordered, 99), 2),
+    }
+
+
+def _stage_breakdown() -> Dict[str, Dict[str, float]]:
+    breakdown = {}
+    for (name, labels), sketch in metrics_store.sketches(windowed=False).items():
+        stage = dict(labels).get("stage")
+        if name == "stage_latency_ms" and stage in _STAGES:
+            breakdown[stage] = {
+                "p50_ms": round(sketch.quantile(0.5), 2),
+                "p95_ms": round(sketch.quantile(0.95), 2),
+            }
+    return breakdown
+
+
+def _document(idx: int, paragraphs: int) -> bytes:
+    lines = [
+        f"The {_VENUES[(idx + p) % len(_VENUES)]} on street {idx}-{p} opens at {8 + p % 4}am and closes at "
+        f"{5 + p % 5}pm. Guided tours leave every {15 + p % 4 * 15} minutes from gate {p % 7}."
+        for p in range(paragraphs)
+    ]
+    return "\n".join(lines).encode("utf-8")
+
+
+async def _run_ingest(client: httpx.AsyncClient, headers: dict, args: argparse.Namespace) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(args.ingest_concurrency)
+    latencies: List[float] = []
+    document_ids: List[str] = []
+    errors = 0
+
+    async def upload(idx: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/ingest",
+                params={"tenant_id": _TENANT},
+                data={"tenant_id": _TENANT},
+                files={"file": (f"guide-{idx}.txt", _document(idx, args.paragraphs), "text/plain")},
+                headers=headers,
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 202:
+            errors += 1
+            return
+        latencies.append(elapsed)
+        document_ids.append(response.json()["document_id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(upload(idx) for idx in range(args.documents)))
+    accepted_s = time.perf_counter() - start
+    pending = set(document_ids)
+    while pending:
+        for document_id in list(pending):
+            response = await client.get(f"/documents/{document_id}", params={"tenant_id": _TENANT}, headers=headers)
+            if response.json()["status"] in ("ready", "failed"):
+                pending.discard(document_id)
+        await asyncio.sleep(0.05)
+    ready_s = time.perf_counter() - start
+    summary = _summarise(latencies, errors, accepted_s)
+    summary["time_to_ready_s"] = round(ready_s, 3)
+    summary["documents_per_s"] = round(len(document_ids) / ready_s, 2) if ready_s else 0.0
+    return summary
+
+
+def _streamed_answer(body: str) -> str:
+    parts = []
+    for block in body.strip().split("\n\n"):
+        name, _, data = block.partition("\n")
+        if name == "event: token":
+            parts.append(json.loads(data.removeprefix("data: "))["content"])
+    return "".join(parts)
+
+
+def _unmeasured(results: Dict[str, Any], stream: bool) -> List[str]:
+    """Scenarios that never reached the LLM, so their latencies say nothing about the chat path."""
+    problems = []
+    for scenario, result in results.items():
+        if not scenario.startswith("chat@"):
+            continue
+        if result["low_confidence"]:
+            problems.append(f"{scenario}: {result['low_confidence']} answers were the low-confidence fallback")
+        # Streamed chats record no llm stage; the fallback count above covers them.
+        if not stream and "llm" not in result["stages"]:
+            problems.append(f"{scenario}: no llm stage samples")
+    return problems
+
+
+async def _run_chat(
+    client: httpx.AsyncClient, headers: dict, concurrency: int, args: argparse.Namespace
+) -> Dict[str, Any]:
+    metrics_store.reset()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    low_confidence = 0
+
+    async def ask(idx: int) -> None:
+        nonlocal errors, low_confidence
+        venue = _VENUES[idx % len(_VENUES)]
+        question = f"How often do guided tours leave from the {venue} on street {idx % args.documents}-{idx % 7}?"
+        payload = {"tenant_id": _TENANT, "session_id": f"bench-{idx % 64}", "user_message": question}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/chat/stream" if args.stream else "/chat", json=payload, headers=headers)
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            errors += 1
+            return
+        latencies.append(elapsed)
+        answer = _streamed_answer(response.text) if args.stream else response.json()["response"]
+        if answer == LOW_CONFIDENCE_RESPONSE:
+            low_confidence += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(idx) for idx in range(args.requests)))
+    summary = _summarise(latencies, errors, time.perf_counter() - start)
+    summary["low_confidence"] = low_confidence
+    summary["stages"] = _stage_breakdown()
+    if args.cheap_delay_ms:
+        summary["backends"] = metrics_store.backend_stats()
+    return summary
+
+
+async def _run(base_url: str, api_key: str, args: argparse.Namespace) -> Dict[str, Any]:
+    headers = {"X-API-Key": api_key}
+    results: Dict[str, Any] = {}
+    limits = httpx.Limits(max_connections=max(args.concurrency) + args.ingest_concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        results["ingest"] = await _run_ingest(client, headers, args)
+        for concurrency in args.concurrency:
+            results[f"chat@{concurrency}"] = await _run_chat(client, headers, concurrency, args)
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _compare(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> bool:
+    ok = True
+    print(f"{'scenario':<12} {'metric':<8} {'baseline':>10} {'current':>10} {'change':>8}")
+    for scenario, result in current["results"].items():
+        previous = baseline.get("results", {}).get(scenario)
+        if previous is None:
+            continue
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("rps", False)):
+            before, after = previous.get(metric, 0.0), result.get(metric, 0.0)
+            change = (after - before) / before if before else 0.0
+            regressed = change > max_regression if higher_is_worse else change < -max_regression
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{scenario:<12} {metric:<8} {before:>10.2f} {after:>10.2f} {change:>+7.1%}{flag}")
+            if regressed and metric in ("p95_ms", "rps"):
+                ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for /chat and /ingest")
+    parser.add_argument("--requests", type=int, default=200, help="chat requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated chat concurrency levels")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--ingest-concurrency", type=int, default=4)
+    parser.add_argument("--chat-delay-ms", type=float, default=200.0)
+    parser.add_argument("--embed-delay-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake LLM calls answering 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of fake LLM calls taking --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--hedge", action="store_true", help="enable hedged LLM requests")
+    parser.add_argument(
+        "--cheap-delay-ms", type=float, default=0.0, help="route simple questions to a second, faster fake LLM"
+    )
+    parser.add_argument("--vector-backend", default="local")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache enabled")
+    parser.add_argument("--stream", action="store_true", help="send chats to /chat/stream instead of /chat")
+    parser.add_argument("--output", default="bench_output/latest.json")
+    parser.add_argument("--compare", help="baseline JSON to diff against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_server, fake_url = _serve(
+            create_app(
+                args.chat_delay_ms,
+                args.embed_delay_ms,
+                error_rate=args.error_rate,
+                slow_rate=args.slow_rate,
+                slow_ms=args.slow_ms,
+            )
+        )
+        backends = ""
+        if args.cheap_delay_ms:
+            cheap_server, cheap_url = _serve(create_app(args.cheap_delay_ms, args.embed_delay_ms))
+            backends = json.dumps(
+                [
+                    {"name": "small", "base_url": f"{cheap_url}/v1", "model": "small", "cost_per_token": 0.0000001},
+                    {"name": "large", "base_url": f"{fake_url}/v1", "model": "large"},
+                ]
+            )
+        data_dir = Path(tmp)
+        config.settings = dataclasses.replace(
+            config.settings,
+            data_dir=data_dir,
+            db_path=data_dir / "bench.db",
+            llm_base_url=f"{fake_url}/v1",
+            llm_api_key="bench-key",
+            vector_backend=args.vector_backend,
+            answer_cache_max_entries=config.settings.answer_cache_max_entries if args.answer_cache else 0,
+            llm_hedge=args.hedge,
+            llm_backends=backends,
+        )
+        init_db()
+        api_key = create_tenant(_TENANT)["api_key"]
+
+        from tourassist.app.main import app
+
+        app_server, app_url = _serve(app)
+        try:
+            results = asyncio.run(_run(app_url, api_key, args))
+        finally:
+            app_server.should_exit = True
+            fake_server.should_exit = True
+            if args.cheap_delay_ms:
+                cheap_server.should_exit = True
+            time.sleep(0.2)
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "documents": args.documents,
+            "chat_delay_ms": args.chat_delay_ms,
+            "embed_delay_ms": args.embed_delay_ms,
+            "vector_backend": args.vector_backend,
+            "answer_cache": args.answer_cache,
+            "error_rate": args.error_rate,
+            "slow_rate": args.slow_rate,
+            "hedge": args.hedge,
+            "cheap_delay_ms": args.cheap_delay_ms,
+            "stream": args.stream,
+        },
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(json.dumps(results, indent=2))
+
+    problems = _unmeasured(results, args.stream)
+    for problem in problems:
+        print(f"INVALID RUN: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(2)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not _compare(baseline, report, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def _embedding(text: str, dims: int) -> list[float]:
+    """Hashed bag of words, so texts that share words get a high cosine like real embeddings do."""
+    values = [0.0] * dims
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.sha256(word.encode("utf-8")).digest()
+        values[int.from_bytes(digest[:4], "big") % dims] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in values)) or 1.0
+    return [value / norm for value in values]
+
+
+async def _sse(content: str, model: str | None, usage: dict[str, int] | None) -> AsyncIterator[str]:
+    """Streams ``content`` a word at a time as chat.completion.chunk events, like the OpenAI API."""
+    for piece in re.findall(r"\S+\s*", content):
+        delta = {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+        yield f"data: {json.dumps({'object': 'chat.completion.chunk', 'model': model, 'choices': [delta]})}\n\n"
+        await asyncio.sleep(0)
+    done = {"index": 0, "delta": {}, "finish_reason": "stop"}
+    yield f"data: {json.dumps({'object': 'chat.completion.chunk', 'model': model, 'choices': [done]})}\n\n"
+    if usage is not None:
+        yield f"data: {json.dumps({'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_app(
+    chat_delay_ms: float = 200.0,
+    embed_delay_ms: float = 20.0,
+    dims: int = 384,
+    error_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_ms: float = 5000.0,
+    seed: int = 7,
+) -> FastAPI:
+    """OpenAI-compatible stand-in with fixed delays, for load tests.
+
+    ``error_rate`` and ``slow_rate`` simulate a provider brownout: that share of chat calls answer 503 or
+    take ``slow_ms`` instead of ``chat_delay_ms``.
+    """
+    app = FastAPI(title="fake-openai")
+    rng = random.Random(seed)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> dict[str, Any]:
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(embed_delay_ms / 1000)
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": idx, "embedding": _embedding(text, body.get("dimensions", dims))}
+                for idx, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": sum(len(text) // 4 for text in inputs), "total_tokens": 0},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        body = await request.json()
+        roll = rng.random()
+        if roll < error_rate:
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+        await asyncio.sleep((slow_ms if roll < error_rate + slow_rate else chat_delay_ms) / 1000)
+        question = body["messages"][-1]["content"].rsplit("Question:", 1)[-1].strip()
+        content = f"Here is what the guide says about: {question}"
+        prompt_tokens = sum(len(message["content"]) // 4 for message in body["messages"])
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                _sse(content, body.get("model"), usage if include_usage else None), media_type="text/event-stream"
+            )
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-delay-ms", type=float, default=200.0)
+    parser.add_argument("--embed-delay-ms", type=float, default=20.0)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of chat calls answering 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of chat calls taking --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    args = parser.parse_args()
+    app = create_app(
+        args.chat_delay_ms, args.embed_delay_ms, args.dims, args.error_rate, args.slow_rate, args.slow_ms
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
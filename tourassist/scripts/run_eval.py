@@ -12,10 +12,14 @@ def main() -> None:
     parser.add_argument("--tenant", required=True)
     parser.add_argument("--cases", required=True)
     parser.add_argument("--output", default="eval_output")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint from a previous run")
     args = parser.parse_args()
 
     init_db()
-    summary = run_eval(args.tenant, Path(args.cases), Path(args.output))
+    summary = run_eval(
+        args.tenant, Path(args.cases), Path(args.output), concurrency=args.concurrency, resume=not args.fresh
+    )
     print(summary)
 
 
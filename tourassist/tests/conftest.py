@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 import sys
+from typing import Iterator
 
 import pytest
 
@@ -9,12 +10,16 @@ ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(ROOT))
 
 from tourassist.app import config  # noqa: E402
+from tourassist.app.agents import answer_cache, llm_client, memory, tokenizer  # noqa: E402
 from tourassist.app.config import Settings  # noqa: E402
-from tourassist.app.models.db import init_db  # noqa: E402
+from tourassist.app.models.db import close_pools, init_db  # noqa: E402
+from tourassist.app.observability import aggregation, tracing  # noqa: E402
+from tourassist.app.rag import embedding_cache, jobs, vector_store  # noqa: E402
+from tourassist.app.security import auth  # noqa: E402
 
 
 @pytest.fixture(autouse=True)
-def configure_test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+def configure_test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
     data_dir = tmp_path / "data"
     data_dir.mkdir()
     test_settings = Settings(
@@ -31,6 +36,20 @@ def configure_test_settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) ->
         top_k=2,
         max_file_size_mb=10,
         eval_timeout_s=5,
+        vector_backend="local",
     )
     monkeypatch.setattr(config, "settings", test_settings)
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", None)
+    monkeypatch.setattr(answer_cache, "_answer_cache", None)
+    monkeypatch.setattr(memory, "_session_store", None)
+    monkeypatch.setattr(tokenizer, "_tokenizer", None)
+    monkeypatch.setattr(llm_client, "_llm_router", None)
+    monkeypatch.setattr(jobs, "_ingest_queue", None)
+    monkeypatch.setattr(vector_store, "_vector_store", None)
+    monkeypatch.setattr(auth, "_auth_cache", None)
+    monkeypatch.setattr(tracing, "_exporter", None)
+    monkeypatch.setattr(tracing, "_exporter_ready", False)
+    monkeypatch.setattr(aggregation, "_aggregator", None)
     init_db()
+    yield
+    close_pools()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from tourassist.app.agents.answer_cache import AnswerCache, get_answer_cache
+from tourassist.app.agents import chat
+from tourassist.app.agents.chat import handle_chat
+from tourassist.app.main import app
+from tourassist.app.models.generations import SharedGenerations
+from tourassist.app.rag import retrieval
+from tourassist.app.security.auth import create_tenant
+
+
+class FakeVectorStore:
+    def __init__(self, hits):
+        self.hits = hits
+
+    def query(self, vector, tenant_id, top_k):
+        return self.hits[:top_k]
+
+    async def query_async(self, vector, tenant_id, top_k):
+        return self.hits[:top_k]
+
+
+def test_chat_endpoint_async_path(monkeypatch):
+    hits = [{"document_id": "doc-1", "text": "The old town tour starts at noon.", "source": "tours.md", "score": 0.9}]
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: FakeVectorStore(hits))
+    api_key = create_tenant("tenant-chat")["api_key"]
+
+    with TestClient(app) as client:
+        denied = client.post(
+            "/chat",
+            json={"tenant_id": "tenant-chat", "session_id": "s1", "user_message": "When is the tour?"},
+            headers={"X-API-Key": "wrong"},
+        )
+        response = client.post(
+            "/chat",
+            json={"tenant_id": "tenant-chat", "session_id": "s1", "user_message": "When is the tour?"},
+            headers={"X-API-Key": api_key},
+        )
+
+    assert denied.status_code == 403
+    assert response.status_code == 200
+    body = response.json()
+    assert "The old town tour starts at noon." in body["response"]
+    assert body["retrieved_doc_ids"] == ["doc-1"]
+
+
+def test_chat_stream_offline_fallback(monkeypatch):
+    hits = [{"document_id": "doc-2", "text": "Ferries leave every hour.", "source": "ferry.md", "score": 0.8}]
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: FakeVectorStore(hits))
+    api_key = create_tenant("tenant-stream")["api_key"]
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/chat/stream",
+            json={"tenant_id": "tenant-stream", "session_id": "s1", "user_message": "How often do ferries run?"},
+            headers={"X-API-Key": api_key},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+
+    assert events[0][0] == "meta"
+    assert events[0][1]["retrieved_doc_ids"] == ["doc-2"]
+    assert events[0][1]["citations"] == [{"document_id": "doc-2", "source": "ferry.md", "score": 0.8}]
+    tokens = [data["content"] for name, data in events if name == "token"]
+    assert len(tokens) > 1
+    assert "Ferries leave every hour." in "".join(tokens)
+    assert events[-1][0] == "done"
+    assert events[-1][1]["tokens_used"] > 0
+
+
+def test_answer_cache_hits_and_invalidates(monkeypatch):
+    hits = [{"document_id": "doc-3", "text": "The castle tour lasts two hours.", "source": "castle.md", "score": 0.9}]
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: FakeVectorStore(hits))
+
+    first = handle_chat("tenant-cache", "s1", "How long is the castle tour?")
+    second = handle_chat("tenant-cache", "s2", "How long is the castle tour?")
+    assert first[2] > 0
+    assert second[0] == first[0]
+    assert second[2] == 0
+    assert second[4] == ["doc-3"]
+    assert get_answer_cache().stats()["hits"] == 1
+
+    get_answer_cache().invalidate("tenant-cache")
+    third = handle_chat("tenant-cache", "s3", "How long is the castle tour?")
+    assert third[2] > 0
+
+
+def test_concurrent_identical_questions_share_retrieval_and_llm_call(monkeypatch):
+    hits = [{"document_id": "doc-3", "text": "The castle tour starts at ten.", "source": "castle.md", "score": 0.9}]
+    searches = []
+    calls = []
+
+    class CountingStore(FakeVectorStore):
+        async def query_async(self, vector, tenant_id, top_k):
+            searches.append(tenant_id)
+            await asyncio.sleep(0.05)
+            return self.hits[:top_k]
+
+    async def fake_completion(messages, query="", retrieved=None):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return {"content": "At ten.", "tokens_used": 12, "estimated_cost": 0.01}
+
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: CountingStore(hits))
+    monkeypatch.setattr(chat, "chat_completion_async", fake_completion)
+    monkeypatch.setattr(get_answer_cache(), "max_entries", 0)
+    questions = ["When does the castle tour start?", "when does the  castle tour start?"] * 4
+
+    async def burst():
+        return await asyncio.gather(
+            *(chat.handle_chat_async("tenant-bus", f"kiosk-{idx}", q) for idx, q in enumerate(questions))
+        )
+
+    results = asyncio.run(burst())
+    assert [content for content, *_ in results] == ["At ten."] * 8
+    assert len(searches) == 1
+    assert len(calls) == 1
+    assert sorted(tokens for _, _, tokens, _, _ in results) == [0] * 7 + [12]
+
+
+def test_answer_cache_invalidation_reaches_other_workers():
+    worker_a, worker_b = (AnswerCache(0.95, 3600, 8, SharedGenerations("answers", 0)) for _ in range(2))
+    retrieved = [{"document_id": "doc-3", "source": "castle.md", "score": 0.9}]
+    worker_a.store("tenant-cache", [1.0, 0.0], "Two hours.", retrieved)
+    worker_b.store("tenant-cache", [1.0, 0.0], "Two hours.", retrieved)
+
+    worker_b.invalidate("tenant-cache")
+    worker_a.generations.refresh()  # what worker_a's next background poll does
+
+    assert worker_a.lookup("tenant-cache", [1.0, 0.0]) is None
+    worker_a.store("tenant-cache", [1.0, 0.0], "Three hours.", retrieved)
+    assert worker_a.lookup("tenant-cache", [1.0, 0.0]).content == "Three hours."
+
+
+def test_shared_generations_never_query_sqlite_on_the_lookup_path(monkeypatch):
+    generations = SharedGenerations("answers", 0)
+    SharedGenerations("answers", 0).bump("tenant-gen")
+    refreshed = threading.Event()
+    refresh = generations.refresh
+
+    def background_refresh():
+        assert threading.current_thread() is not threading.main_thread()
+        refresh()
+        refreshed.set()
+
+    monkeypatch.setattr(generations, "refresh", background_refresh)
+    assert generations.current("tenant-gen") == 0
+    assert refreshed.wait(5)
+    assert generations.current("tenant-gen") == 1
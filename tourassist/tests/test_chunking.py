@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from tourassist.app.agents.tokenizer import count_tokens
+from tourassist.app.rag.chunking import iter_chunks
+
+
+def test_long_paragraph_is_split_on_sentences_with_overlap():
+    sentences = [f"Tram {idx} leaves the harbour every {idx + 5} minutes." for idx in range(40)]
+    segments = [" ".join(sentences[:20]), " ".join(sentences[20:])]
+
+    chunks = list(iter_chunks(segments, 120, overlap_chars=50))
+
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert len(chunks) > 10
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.endswith(current[: current.index(".") + 1])
+    assert sentences[-1] in chunks[-1]
+
+
+def test_token_limit_and_oversized_words_are_respected():
+    text = "Visit the " + "x" * 300 + " then the botanic garden and the old lighthouse before sunset."
+
+    chunks = list(iter_chunks([text], 100, max_tokens=8))
+
+    assert all(len(chunk) <= 100 and count_tokens(chunk) <= 8 for chunk in chunks)
+    assert "".join(chunks).count("x") == 300
+    assert chunks[-1].endswith("sunset.")
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+
+import httpx
+
+from tourassist.app import config
+from tourassist.app.models.db import get_connection
+from tourassist.app.rag import embedding_cache, embeddings
+
+
+def test_embed_texts_batches_misses_and_preserves_order(monkeypatch):
+    monkeypatch.setattr(
+        config,
+        "settings",
+        dataclasses.replace(config.settings, llm_api_key="test-key", embedding_dims=4, embed_batch_size=2),
+    )
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        requests.append(inputs)
+        data = [
+            {"index": idx, "embedding": [float(len(text)), 0.0, 0.0, 1.0]}
+            for idx, text in reversed(list(enumerate(inputs)))
+        ]
+        return httpx.Response(200, json={"data": data})
+
+    monkeypatch.setattr(embeddings, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    texts = ["a", "bb", "ccc", "bb", "dddd"]
+    vectors = embeddings.embed_texts(texts)
+    assert [v[0] for v in vectors] == [1.0, 2.0, 3.0, 2.0, 4.0]
+    assert requests == [["a", "bb"], ["ccc", "dddd"]]
+
+    again = embeddings.embed_texts(["dddd", "a"])
+    assert [v[0] for v in again] == [4.0, 1.0]
+    assert len(requests) == 2
+
+
+def test_embedding_cache_tiers_and_model_keying(monkeypatch):
+    cache = embedding_cache.EmbeddingCache(lru_size=1, max_rows=2, max_age_s=0)
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", cache)
+
+    first = embeddings.embed_texts(["spa hours", "museum hours"])
+    assert cache.misses == 2
+    assert len(cache._lru) == 1
+
+    assert embeddings.embed_texts(["spa hours", "museum hours"]) == first
+    assert cache.memory_hits == 1
+    assert cache.disk_hits == 1
+
+    conn = get_connection()
+    blob = conn.execute("SELECT vector FROM embeddings_cache LIMIT 1").fetchone()["vector"]
+    conn.close()
+    assert len(blob) == config.settings.embedding_dims * 4
+
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, embed_model="other-model"))
+    cache.clear_memory()
+    embeddings.embed_texts(["spa hours"])
+    assert cache.misses == 3
+
+    cache.evict()
+    conn = get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM embeddings_cache").fetchone()[0] == 2
+    conn.close()
+
+
+def test_failed_batches_are_not_cached_and_memory_entries_expire(monkeypatch):
+    monkeypatch.setattr(
+        config, "settings", dataclasses.replace(config.settings, llm_api_key="test-key", embedding_dims=4)
+    )
+    statuses = [503, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        data = [{"index": idx, "embedding": [9.0, 0.0, 0.0, 1.0]} for idx in range(len(inputs))]
+        return httpx.Response(statuses.pop(0), json={"data": data})
+
+    monkeypatch.setattr(embeddings, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    assert embeddings.embed_texts(["ferry times"])[0][0] != 9.0
+    assert embeddings.embed_texts(["ferry times"])[0][0] == 9.0
+    assert statuses == []
+
+    cache = embedding_cache.get_embedding_cache()
+    cache.max_age_s = 60
+    now = embedding_cache.time.time()
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now + 120)
+    assert cache.get_many(config.settings.embed_model, 4, [embeddings._hash_text("ferry times")]) == {}
+
+
+def test_concurrent_embedding_misses_share_one_upstream_call(monkeypatch):
+    monkeypatch.setattr(
+        config, "settings", dataclasses.replace(config.settings, llm_api_key="test-key", embedding_dims=4)
+    )
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        requests.append(inputs)
+        await asyncio.sleep(0.05)
+        data = [{"index": idx, "embedding": [float(len(text)), 0.0, 0.0, 1.0]} for idx, text in enumerate(inputs)]
+        return httpx.Response(200, json={"data": data})
+
+    async def burst():
+        monkeypatch.setattr(embeddings, "_async_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        try:
+            return await asyncio.gather(
+                *(embeddings.embed_texts_async(["castle tour", "spa"][: 1 + idx % 2]) for idx in range(10))
+            )
+        finally:
+            await embeddings.aclose()
+
+    results = asyncio.run(burst())
+    assert sorted(text for inputs in requests for text in inputs) == ["castle tour", "spa"]
+    assert all(vectors[0][0] == 11.0 for vectors in results)
+    assert results[1][1][0] == 3.0
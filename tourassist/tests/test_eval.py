@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+
+import pytest
+
+from tourassist.app import config
+from tourassist.app.agents import chat
+from tourassist.app.eval import runner
+
+
+def test_run_eval_is_concurrent_enforces_timeouts_and_resumes(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, eval_timeout_s=0.2))
+    calls = []
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_chat(tenant_id, session_id, question):
+        calls.append(question)
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(1 if question == "slow" else 0.01)
+        finally:
+            in_flight["now"] -= 1
+        retrieved = [{"document_id": "d1", "source": "spa.md", "text": "Spa opens at 9am", "score": 0.9}]
+        return ("Spa opens at 9am", 5.0, 10, 0.001, ["d1"]), retrieved
+
+    monkeypatch.setattr(runner, "chat_with_context_async", fake_chat)
+    cases = [
+        {
+            "id": f"case-{idx}",
+            "question": "slow" if idx == 0 else f"q{idx}",
+            "expected_facts": ["Spa opens at 9am"],
+            "allowed_sources": ["spa.md"],
+        }
+        for idx in range(6)
+    ]
+    cases_path = tmp_path / "cases.json"
+    cases_path.write_text(json.dumps(cases), encoding="utf-8")
+    output = tmp_path / "out"
+
+    summary = runner.run_eval("tenant-eval", cases_path, output, concurrency=3)
+
+    assert in_flight["peak"] == 3
+    assert summary["metrics"]["errors"] == 1
+    assert summary["metrics"]["retrieval_pass"] == 5 / 6
+    results = json.loads((output / "case_results.json").read_text(encoding="utf-8"))
+    assert [result["id"] for result in results] == [case["id"] for case in cases]
+    assert results[0]["error"] == "timeout"
+
+    calls.clear()
+    runner.run_eval("tenant-eval", cases_path, output, concurrency=3)
+    assert calls == ["slow"]
+
+
+def test_run_eval_bypasses_answer_sharing_and_checks_the_cases_file(monkeypatch, tmp_path):
+    seen = []
+    inside = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_chat(tenant_id, session_id, question):
+        seen.append((chat._coalescing(), chat._answer_cache_enabled()))
+        if not inside.is_set():
+            inside.set()
+            await release.wait()
+        return ("Spa opens at 9am", 5.0, 10, 0.001, ["d1"]), [{"document_id": "d1", "source": "spa.md"}]
+
+    monkeypatch.setattr(runner, "chat_with_context_async", fake_chat)
+    cases = [{"id": "case-1", "question": "q1", "expected_facts": ["Spa"], "allowed_sources": ["spa.md"]}]
+    cases_path = tmp_path / "cases.json"
+    cases_path.write_text(json.dumps(cases), encoding="utf-8")
+    output = tmp_path / "out"
+
+    async def serving_request():
+        await inside.wait()
+        seen.append((chat._coalescing(), chat._answer_cache_enabled()))
+        release.set()
+
+    async def eval_beside_serving():
+        await asyncio.gather(runner.run_eval_async("tenant-eval", cases_path, output), serving_request())
+
+    asyncio.run(eval_beside_serving())
+    assert seen == [(False, False), (True, True)]
+
+    cases[0]["expected_facts"] = ["9am"]
+    cases_path.write_text(json.dumps(cases), encoding="utf-8")
+    with pytest.raises(ValueError, match="different cases file"):
+        runner.run_eval("tenant-eval", cases_path, output)
+    runner.run_eval("tenant-eval", cases_path, output, resume=False)
+    assert len(seen) == 3
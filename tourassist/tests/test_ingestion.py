@@ -1,7 +1,18 @@
 from __future__ import annotations
 
+import dataclasses
+import io
+import json
+import time
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from tourassist.app import config
+from tourassist.app.main import app
 from tourassist.app.models.db import get_connection
-from tourassist.app.rag import ingestion
+from tourassist.app.rag import ingestion, jobs
+from tourassist.app.security.auth import create_tenant
 
 
 class FakeQdrant:
@@ -14,7 +25,7 @@ class FakeQdrant:
 
 def test_ingestion_idempotent(monkeypatch):
     fake_qdrant = FakeQdrant()
-    monkeypatch.setattr(ingestion, "get_qdrant", lambda: fake_qdrant)
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
 
     tenant_id = "tenant-1"
     filename = "guide.txt"
@@ -34,3 +45,217 @@ def test_ingestion_idempotent(monkeypatch):
     rows = conn.execute("SELECT document_id FROM documents WHERE tenant_id = ?", (tenant_id,)).fetchall()
     conn.close()
     assert len(rows) == 1
+
+
+def test_ingest_endpoint_queues_and_reports_status(monkeypatch):
+    fake_qdrant = FakeQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    api_key = create_tenant("tenant-jobs")["api_key"]
+    headers = {"X-API-Key": api_key}
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/ingest",
+            params={"tenant_id": "tenant-jobs"},
+            data={"tenant_id": "tenant-jobs"},
+            files={"file": ("guide.md", b"The aquarium opens at 8am on weekends.", "text/markdown")},
+            headers=headers,
+        )
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        document_id = response.json()["document_id"]
+
+        for _ in range(100):
+            document = client.get(f"/documents/{document_id}", params={"tenant_id": "tenant-jobs"}, headers=headers)
+            if document.json()["status"] == "ready":
+                break
+            time.sleep(0.02)
+        missing = client.get("/documents/unknown", params={"tenant_id": "tenant-jobs"}, headers=headers)
+
+    assert document.json()["status"] == "ready"
+    assert document.json()["chunks_indexed"] == len(fake_qdrant.points) == 1
+    assert missing.status_code == 404
+    assert not list((config.settings.data_dir / "uploads").glob(f"{document_id}-*"))
+
+
+def test_ingest_queue_resumes_interrupted_jobs(monkeypatch):
+    fake_qdrant = FakeQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    data = b"The museum opens at 10am daily."
+    content_hash = ingestion._hash_bytes(data)
+    document_id, _, _ = ingestion.register_document("tenant-resume", "museum.txt", content_hash)
+    ingestion.set_status(document_id, "processing")
+    path = jobs.IngestQueue.upload_path(document_id, content_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+    queue = jobs.IngestQueue(workers=1)
+    queue.start()
+    queue.shutdown()
+
+    conn = get_connection()
+    row = conn.execute("SELECT status FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+    conn.close()
+    assert row["status"] == "ready"
+    assert fake_qdrant.points
+
+
+def test_older_job_does_not_mark_a_newer_queued_version_ready(monkeypatch):
+    fake_qdrant = FakeQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    old, new = b"The museum opens at 10am daily.", b"The museum opens at 11am daily."
+    document_id, _, _ = ingestion.register_document("tenant-race", "museum.txt", ingestion._hash_bytes(old))
+    path = jobs.IngestQueue.upload_path(document_id, ingestion._hash_bytes(old))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(old)
+    embed_texts = ingestion.embed_texts
+
+    def upload_new_version_meanwhile(texts):
+        ingestion.register_document("tenant-race", "museum.txt", ingestion._hash_bytes(new))
+        return embed_texts(texts)
+
+    monkeypatch.setattr(ingestion, "embed_texts", upload_new_version_meanwhile)
+    jobs.IngestQueue(workers=1)._run_batch([(document_id, ingestion._hash_bytes(old))])
+
+    conn = get_connection()
+    row = conn.execute("SELECT status, version FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+    conn.close()
+    assert (row["status"], row["version"]) == ("queued", 2)
+
+
+def test_ingest_batch_marks_documents_failed_when_it_breaks_before_indexing(monkeypatch):
+    document_id, _, _ = ingestion.register_document("tenant-broken", "spa.txt", "abc123")
+
+    def broken_connection():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(jobs, "get_connection", broken_connection)
+    jobs.IngestQueue(workers=1)._run_batch([(document_id, "abc123")])
+
+    conn = get_connection()
+    row = conn.execute("SELECT status, error FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+    conn.close()
+    assert (row["status"], row["error"]) == ("failed", "database is locked")
+
+
+def test_process_document_streams_file_in_windows(monkeypatch, tmp_path):
+    class CountingQdrant(FakeQdrant):
+        def __init__(self) -> None:
+            super().__init__()
+            self.calls = 0
+
+        def upsert(self, points):
+            self.calls += 1
+            super().upsert(points)
+
+    fake_qdrant = CountingQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    monkeypatch.setattr(ingestion, "_READ_BLOCK", 7)
+    monkeypatch.setattr(
+        config, "settings", dataclasses.replace(config.settings, max_chunk_chars=50, ingest_window_size=2)
+    )
+    lines = [f"Harbour stop {idx} is served by the café ferry." for idx in range(5)]
+    path = tmp_path / "ferries.txt"
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    document_id, _, _ = ingestion.register_document("tenant-stream", "ferries.txt", "hash-1")
+    count = ingestion.process_document(document_id, "tenant-stream", "ferries.txt", path)
+
+    assert count == 5
+    assert fake_qdrant.calls == 3
+    assert [point[2]["text"] for point in fake_qdrant.points] == lines
+
+
+def test_reupload_only_reindexes_changed_chunks(monkeypatch):
+    class VersionedQdrant(FakeQdrant):
+        def __init__(self) -> None:
+            super().__init__()
+            self.deleted = []
+
+        def delete(self, tenant_id, ids):
+            self.deleted.append(list(ids))
+
+    fake_qdrant = VersionedQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, max_chunk_chars=35))
+    original = b"The castle opens at 9am.\nThe castle opens at 9am.\nTram 2 stops at the bridge.\nBoats leave at 4pm."
+    updated = b"The castle opens at 9am.\nTram 2 stops at the old bridge.\nBoats leave at 4pm."
+
+    document_id, chunks, _ = ingestion.ingest_document("tenant-v", "guide.txt", original)
+    first_points = {point[0] for point in fake_qdrant.points}
+    fake_qdrant.points.clear()
+    document_id_2, chunks_2, _ = ingestion.ingest_document("tenant-v", "guide.txt", updated)
+
+    conn = get_connection()
+    version = conn.execute("SELECT version FROM documents WHERE document_id = ?", (document_id,)).fetchone()[0]
+    texts = [
+        row["text"]
+        for row in conn.execute("SELECT text FROM chunks WHERE document_id = ? ORDER BY chunk_index", (document_id,))
+    ]
+    conn.close()
+    assert chunks == chunks_2 == 3
+    assert document_id_2 == document_id
+    assert version == 2
+    assert [point[2]["text"] for point in fake_qdrant.points] == ["Tram 2 stops at the old bridge."]
+    assert len(fake_qdrant.deleted) == 1 and set(fake_qdrant.deleted[0]) <= first_points
+    assert texts == ["The castle opens at 9am.", "Tram 2 stops at the old bridge.", "Boats leave at 4pm."]
+
+
+def test_bulk_ingest_streams_archive_members_and_shares_batches(monkeypatch):
+    class CountingQdrant(FakeQdrant):
+        def __init__(self) -> None:
+            super().__init__()
+            self.calls = 0
+
+        def upsert(self, points):
+            self.calls += 1
+            super().upsert(points)
+
+    fake_qdrant = CountingQdrant()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: fake_qdrant)
+    api_key = create_tenant("tenant-bulk")["api_key"]
+    headers = {"X-API-Key": api_key}
+    ingestion.ingest_document("tenant-bulk", "old.txt", b"The pier is closed in winter.")
+    fake_qdrant.calls = 0
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as bundle:
+        for idx in range(3):
+            bundle.writestr(f"guides/stop-{idx}.md", f"Bus stop {idx} is next to the cathedral.")
+        bundle.writestr("guides/copy.md", "Bus stop 0 is next to the cathedral.")
+        bundle.writestr("guides/logo.png", b"\x89PNG")
+    files = [
+        ("files", ("guides.zip", archive.getvalue(), "application/zip")),
+        ("files", ("pier.txt", b"The pier is closed in winter.", "text/plain")),
+    ]
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/ingest/bulk",
+            params={"tenant_id": "tenant-bulk"},
+            data={"tenant_id": "tenant-bulk"},
+            files=files,
+            headers=headers,
+        )
+        results = [json.loads(line) for line in response.text.splitlines()]
+        for _ in range(100):
+            statuses = [
+                client.get(
+                    f"/documents/{result['document_id']}", params={"tenant_id": "tenant-bulk"}, headers=headers
+                ).json()
+                for result in results[:3]
+            ]
+            if all(status["status"] == "ready" for status in statuses):
+                break
+            time.sleep(0.02)
+
+    assert response.status_code == 202
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [result["filename"] for result in results] == [
+        "guides/stop-0.md", "guides/stop-1.md", "guides/stop-2.md", "guides/copy.md", "guides/logo.png", "pier.txt"
+    ]
+    assert [result["status"] for result in results] == ["queued", "queued", "queued", "queued", "rejected", "ready"]
+    assert [result["deduplicated"] for result in results] == [False, False, False, True, False, True]
+    assert results[3]["document_id"] == results[0]["document_id"]
+    assert all(status["status"] == "ready" for status in statuses)
+    assert fake_qdrant.calls == 1
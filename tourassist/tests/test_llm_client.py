@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import time
+
+import httpx
+import pytest
+
+from tourassist.app import config
+from tourassist.app.observability import metrics
+from tourassist.app.agents.llm_client import LLMClient, LLMRouter
+from tourassist.app.agents.resilience import CircuitOpenError
+
+MESSAGES = [{"role": "user", "content": "When does the ferry leave?"}]
+
+
+def _completion(content: str) -> dict:
+    return {"choices": [{"message": {"content": content}}], "usage": {"total_tokens": 7}}
+
+
+def _settings(**overrides) -> config.Settings:
+    return dataclasses.replace(config.settings, llm_retry_base_ms=1.0, llm_retry_max_ms=5.0, **overrides)
+
+
+def test_retries_throttling_then_opens_circuit(monkeypatch):
+    monkeypatch.setattr(config, "settings", _settings(llm_max_retries=2, llm_breaker_failures=3))
+    statuses = iter([429, 503, 200, 503, 503, 503])
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        code = next(statuses)
+        return httpx.Response(code, json=_completion("Every hour.") if code == 200 else {"error": "busy"})
+
+    client = LLMClient("http://fake/v1", "key", "model", transport=httpx.MockTransport(handler))
+
+    assert client.complete(MESSAGES)["content"] == "Every hour."
+    assert len(calls) == 3
+    with pytest.raises(httpx.HTTPStatusError):
+        client.complete(MESSAGES)
+    assert client.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.complete(MESSAGES)
+    assert len(calls) == 6
+
+
+def test_slow_call_is_hedged_after_recent_p95(monkeypatch):
+    monkeypatch.setattr(config, "settings", _settings(llm_hedge=True, llm_hedge_min_ms=20.0))
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(2)
+            return httpx.Response(200, json=_completion("slow"))
+        return httpx.Response(200, json=_completion("hedged"))
+
+    client = LLMClient("http://fake/v1", "key", "model", transport=httpx.MockTransport(handler))
+    for _ in range(25):
+        client.latency.record(10.0)
+
+    async def run() -> tuple[dict, float]:
+        start = time.perf_counter()
+        try:
+            return await client.complete_async(MESSAGES), time.perf_counter() - start
+        finally:
+            await client.aclose()
+
+    result, elapsed = asyncio.run(run())
+    assert result["content"] == "hedged"
+    assert calls == 2
+    assert elapsed < 1
+
+
+def _backend(name: str, answers: list[str], calls: list[str]) -> LLMClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(name)
+        return httpx.Response(200, json=_completion(answers.pop(0)))
+
+    return LLMClient(
+        "http://fake/v1", None, name, name=name, cost_per_token=0.001, transport=httpx.MockTransport(handler)
+    )
+
+
+def test_router_tries_cheap_backend_first_and_escalates_unsure_answers(monkeypatch):
+    monkeypatch.setattr(config, "settings", _settings())
+    calls: list[str] = []
+    cheap = _backend("small", ["Every hour.", "I don't know, sorry."], calls)
+    large = _backend("large", ["Departures are at 9:00 and 17:00.", "Take the ferry, then the tram."], calls)
+    router = LLMRouter([cheap, large])
+    confident = [{"text": "The ferry leaves every hour.", "score": 0.8}]
+
+    result = router.complete(MESSAGES, "When does the ferry leave?", confident)
+    assert (result["backend"], result["content"]) == ("small", "Every hour.")
+    assert result["estimated_cost"] == 0.007
+
+    result = router.complete(MESSAGES, "When does the ferry leave?", confident)
+    assert (result["backend"], result["content"]) == ("large", "Departures are at 9:00 and 17:00.")
+
+    result = router.complete(MESSAGES, "Why is the ferry better than the bus for a day trip?", confident)
+    assert result["backend"] == "large"
+    assert calls == ["small", "small", "large", "large"]
+
+    stats = metrics.metrics_store.backend_stats()
+    assert stats["small"]["calls"] == 2
+    assert stats["small"]["escalations"] == 1
+    assert stats["large"]["calls"] == 2
+    assert "latency_p95_ms" in stats["large"]
+
+
+def test_cancelled_calls_release_the_probe_without_opening_the_circuit(monkeypatch):
+    monkeypatch.setattr(config, "settings", _settings(llm_max_retries=0, llm_breaker_failures=1))
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content).get("stream"):
+            body = 'data: {"choices": [{"delta": {"content": "Every"}}]}\n\ndata: [DONE]\n\n'
+            return httpx.Response(200, text=body)
+        await asyncio.sleep(1)
+        return httpx.Response(200, json=_completion("late"))
+
+    client = LLMClient("http://fake/v1", "key", "model", transport=httpx.MockTransport(handler))
+
+    async def run() -> None:
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.complete_async(MESSAGES), 0.05)
+            assert client.breaker.state == "closed"
+
+            client.breaker.record_failure()
+            client.breaker.reset_after_s = 0.0
+            stream = client.stream(MESSAGES)
+            assert await stream.__anext__() == "Every"
+            assert client.breaker.state == "half_open"
+            await stream.aclose()
+            assert client.breaker.allow()
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+from tourassist.app.agents.memory import InProcessSessionStore, SqliteSessionStore
+
+
+def test_in_process_store_evicts_least_recent_sessions_and_trims_to_budget():
+    store = InProcessSessionStore(max_turns=2, max_sessions=2, ttl_s=60, token_budget=10)
+    store.extend("a", [("user", "one two"), ("assistant", "three four")])
+    store.extend("b", [("user", "hello")])
+    store.get("a")
+    store.extend("c", [("user", "hi")])
+
+    assert store.get("b") == []
+    assert store.stats()["sessions"] == 2
+
+    store.extend("a", [("user", "five six seven eight nine")])
+    history = store.get("a")
+    assert [item["content"] for item in history] == ["three four", "five six seven eight nine"]
+
+    expired = InProcessSessionStore(max_turns=2, max_sessions=2, ttl_s=0, token_budget=10)
+    expired.extend("a", [("user", "hi")])
+    assert expired.get("a") == []
+    assert expired.stats() == {"sessions": 0, "bytes": 0}
+
+
+def test_sqlite_store_is_shared_between_instances_and_bounded():
+    writer = SqliteSessionStore(max_turns=1, max_sessions=10, ttl_s=60, token_budget=100)
+    reader = SqliteSessionStore(max_turns=1, max_sessions=10, ttl_s=60, token_budget=100)
+    writer.extend("s1", [("user", "Where is the spa?"), ("assistant", "Next to the harbour.")])
+    writer.extend("s1", [("user", "When does it open?"), ("assistant", "At 9am.")])
+
+    assert reader.get("s1") == [
+        {"role": "user", "content": "When does it open?"},
+        {"role": "assistant", "content": "At 9am."},
+    ]
+    summary = "User asked: Where is the spa.\nAssistant answered: Next to the harbour."
+    assert reader.summary("s1") == summary
+    stats = reader.stats()
+    assert stats["sessions"] == 1
+    assert stats["bytes"] == len("userWhen does it open?assistantAt 9am.summary" + summary)
+
+
+def test_sqlite_store_serialises_concurrent_appends_to_one_session():
+    stores = [SqliteSessionStore(max_turns=50, max_sessions=10, ttl_s=60, token_budget=10_000) for _ in range(4)]
+
+    def append(idx: int) -> None:
+        stores[idx % 4].extend("kiosk", [("user", f"question {idx}"), ("assistant", f"answer {idx}")])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(append, range(40)))
+
+    history = stores[0].get("kiosk")
+    assert len(history) == 80
+    assert sorted(message["content"] for message in history if message["role"] == "user") == sorted(
+        f"question {idx}" for idx in range(40)
+    )
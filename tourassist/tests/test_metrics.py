@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import random
+import threading
+
+from tourassist.app import config
+from tourassist.app.models.db import get_connection
+from tourassist.app.observability import aggregation, metrics
+from tourassist.app.observability.metrics import MetricsStore, Sketch, prometheus_text
+
+
+def test_sketch_quantiles_stay_within_relative_error_at_scale():
+    rng = random.Random(7)
+    samples = [rng.lognormvariate(3, 1) for _ in range(200_000)]
+    sketch = Sketch()
+    for value in samples:
+        sketch.add(value)
+    ordered = sorted(samples)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact < 0.02
+    assert sketch.count == len(samples)
+    assert len(sketch.counts) < 1000
+
+
+def test_store_merges_thread_shards_and_expires_old_windows(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics.time, "time", lambda: now[0])
+    store = MetricsStore(window_s=60, slots=6)
+
+    def record(tenant: str) -> None:
+        for value in range(1, 101):
+            store.record_latency(float(value), tenant)
+            store.record_tokens(10, tenant)
+
+    threads = [threading.Thread(target=record, args=(f"tenant-{idx}",)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert abs(store.latency_p50() - 50) < 1.5
+    assert abs(store.quantile("chat_latency_ms", 0.95, tenant="tenant-2") - 95) < 2
+    assert store.totals("tokens_total") == 4 * 100 * 10
+
+    now[0] += 61
+    store.record_latency(500.0, "tenant-0")
+    assert abs(store.latency_p50() - 500) < 10
+    assert store.sketches(windowed=False)[("chat_latency_ms", (("tenant", "tenant-0"),))].count == 101
+
+    text = prometheus_text(store.sketches(windowed=False), store.sketches(), store.counters())
+    assert "# TYPE tourassist_chat_latency_ms histogram" in text
+    assert 'tourassist_chat_latency_ms_bucket{tenant="tenant-1",le="+Inf"} 100' in text
+    assert 'tourassist_tokens_total{tenant="tenant-3"} 1000' in text
+
+
+def test_sqlite_aggregator_merges_snapshots_from_other_workers(monkeypatch):
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, metrics_backend="sqlite"))
+    local = MetricsStore()
+    monkeypatch.setattr(aggregation, "metrics_store", local)
+    other = MetricsStore()
+    for value in range(1, 101):
+        local.record_latency(float(value), "tenant-a")
+        other.record_latency(float(value + 100), "tenant-b")
+    other.record_tokens(250, "tenant-b")
+
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO metrics_workers (worker_id, snapshot, updated_at) VALUES (?, ?, ?)",
+            ("other-worker", json.dumps(other.snapshot()), metrics.time.time()),
+        )
+    conn.close()
+
+    aggregator = aggregation.get_metrics_aggregator()
+    aggregator.flush()
+    view = aggregator.collect()
+
+    assert abs(view.latency_p50() - 100) < 3
+    assert abs(view.quantile("chat_latency_ms", 0.5, tenant="tenant-b") - 150) < 3
+    assert view.totals("chat_requests_total") == 200
+    assert view.totals("tokens_total") == 250
+    assert 'tourassist_chat_latency_ms_count{tenant="tenant-a"} 100' in view.prometheus()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+from pathlib import Path
+
+from tourassist.app import config
+from tourassist.app.rag import ingestion, pdf
+
+
+def _build_pdf(page_texts: list[str]) -> bytes:
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return body
+
+
+def _crash_once(path: str, key: str, start: int, stop: int) -> list[str]:
+    marker = Path(f"{path}.crashed")
+    if start == 2 and not marker.exists():
+        marker.touch()
+        os._exit(1)
+    return pdf._extract_range(path, key, start, stop)
+
+
+def test_parallel_pdf_extraction_preserves_page_order(monkeypatch):
+    monkeypatch.setattr(
+        config,
+        "settings",
+        dataclasses.replace(config.settings, pdf_workers=2, pdf_pages_per_task=2, pdf_parallel_min_pages=1),
+    )
+    texts = [f"Page {idx} of the city guide" for idx in range(7)]
+    try:
+        pages = list(pdf.iter_pdf_pages(_build_pdf(texts)))
+    finally:
+        pdf.shutdown()
+    assert [page.strip() for page in pages] == texts
+
+    chunks = list(ingestion.chunk_stream(iter(pages), 60))
+    assert chunks[0] == "Page 0 of the city guide Page 1 of the city guide"
+
+
+def test_crashed_pdf_worker_is_replaced_and_its_pages_retried(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        config,
+        "settings",
+        dataclasses.replace(config.settings, pdf_workers=2, pdf_pages_per_task=2, pdf_parallel_min_pages=1),
+    )
+    monkeypatch.setattr(pdf, "_extract_range", _crash_once)
+    texts = [f"Page {idx} of the harbour guide" for idx in range(7)]
+    source = tmp_path / "guide.pdf"
+    source.write_bytes(_build_pdf(texts))
+    try:
+        pages = list(pdf.iter_pdf_pages(source))
+        assert Path(f"{source}.crashed").exists()
+        assert [page.strip() for page in pages] == texts
+        assert [page.strip() for page in pdf.iter_pdf_pages(source)] == texts
+    finally:
+        pdf.shutdown()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import dataclasses
+
+from tourassist.app import config
+from tourassist.app.agents.memory import get_session_store
+from tourassist.app.agents.prompt import build_messages, pack_context
+from tourassist.app.agents.tokenizer import OfflineTokenizer, count_tokens
+
+
+def test_offline_tokenizer_splits_long_words_and_truncates():
+    tokenizer = OfflineTokenizer()
+    assert tokenizer.encode("Hi, Copenhagen 2024!") == ["Hi", ",", "Cope", "nhag", "en", "202", "4", "!"]
+    assert tokenizer.truncate("Hi, Copenhagen 2024!", 3) == "Hi, Cope"
+
+
+def test_pack_context_prefers_scores_and_drops_overlapping_chunks():
+    retrieved = [
+        {"document_id": "a", "text": "The ferry to the island leaves at noon.", "score": 0.4},
+        {"document_id": "b", "text": "The ferry to the island leaves at noon daily.", "score": 0.9},
+        {"document_id": "c", "text": "Museum tickets cost ten euros.", "score": 0.6},
+        {"document_id": "d", "text": "Bikes can be rented near the station.", "score": 0.5},
+    ]
+    budget = count_tokens(retrieved[1]["text"]) + count_tokens(retrieved[2]["text"])
+
+    packed = pack_context(retrieved, budget)
+
+    assert [item["document_id"] for item in packed] == ["b", "c"]
+
+
+def test_build_messages_summarises_turns_beyond_history_budget(monkeypatch):
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, prompt_history_budget=20))
+    store = get_session_store()
+    store.extend("s1", [("user", "Where is the old lighthouse?"), ("assistant", "It stands on the north pier.")])
+    store.extend("s1", [("user", "Is it open?"), ("assistant", "Yes, daily.")])
+
+    messages = build_messages("system", "s1", [{"text": "Lighthouse tours start at 10am.", "score": 0.8}], "When?")
+
+    assert messages[1] == {
+        "role": "system",
+        "content": "Summary of the earlier conversation:\n"
+        "User asked: Where is the old lighthouse.\nAssistant answered: It stands on the north pier.",
+    }
+    assert messages[2:4] == [{"role": "user", "content": "Is it open?"}, {"role": "assistant", "content": "Yes, daily."}]
+    assert messages[-1]["content"] == "Context:\nLighthouse tours start at 10am.\n\nQuestion: When?"
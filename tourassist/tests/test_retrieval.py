@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+
+from tourassist.app.agents import chat
+from tourassist.app.models.db import get_connection
+from tourassist.app.rag import ingestion, lexical, retrieval
+
+
+class FakeVectorStore:
+    def __init__(self, hits=None) -> None:
+        self.points = []
+        self.hits = hits or []
+
+    def upsert(self, points):
+        self.points.extend(points)
+
+    def query(self, vector, tenant_id, top_k):
+        return self.hits[:top_k]
+
+
+def _no_embedding(texts):
+    raise AssertionError("keyword queries should not be embedded")
+
+
+def test_keyword_query_uses_lexical_index_without_embedding(monkeypatch):
+    store = FakeVectorStore()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retrieval, "embed_texts", _no_embedding)
+    ingestion.ingest_document("tenant-a", "hours.txt", b"Museo Nazionale opens at 9am.\nThe ferry leaves at noon.")
+    ingestion.ingest_document("tenant-b", "other.txt", b"Museo Nazionale is closed for tenant b.")
+
+    results = retrieval.retrieve_context("tenant-a", "Museo Nazionale")
+
+    assert [item["source"] for item in results] == ["hours.txt"]
+    assert results[0]["lexical_score"] == 1.0
+    assert "score" not in results[0]
+    assert lexical.search("tenant-b", "ferry noon", 4) == []
+
+
+def test_reingest_replaces_lexical_rows_and_fuses_with_vector_hits(monkeypatch):
+    vector_hit = {"document_id": "doc-v", "text": "Tram 4 runs along the river.", "source": "tram.md", "score": 0.7}
+    store = FakeVectorStore([vector_hit])
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: store)
+    document_id, _, _ = ingestion.register_document("tenant-h", "cafe.txt", "hash-cafe")
+    ingestion.process_document(document_id, "tenant-h", "cafe.txt", b"Cafe Aurora serves breakfast.")
+    ingestion.process_document(document_id, "tenant-h", "cafe.txt", b"Cafe Aurora serves breakfast.")
+
+    results = retrieval.retrieve_context("tenant-h", "Which cafe serves breakfast near the tram?", [0.1] * 8)
+
+    conn = get_connection()
+    indexed = conn.execute("SELECT COUNT(*) FROM chunks_fts WHERE document_id = ?", (document_id,)).fetchone()[0]
+    conn.close()
+    assert indexed == 1
+    assert {item["document_id"] for item in results} == {document_id, "doc-v"}
+    assert all(item["rrf_score"] > 0 for item in results)
+
+
+def test_partial_keyword_match_stays_low_confidence(monkeypatch):
+    store = FakeVectorStore()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retrieval, "embed_texts", _no_embedding)
+    ingestion.ingest_document("tenant-p", "hours.txt", b"Museo Nazionale opens at 9am.")
+
+    partial = retrieval.retrieve_context("tenant-p", "Museo Egizio Torino")
+    full = retrieval.retrieve_context("tenant-p", "Museo Nazionale")
+
+    assert partial and 0 < partial[0]["lexical_score"] < 1.0
+    assert chat._is_low_confidence(partial)
+    assert not chat._is_low_confidence(full)
+
+
+def test_confident_keyword_chat_skips_query_embedding_with_answer_cache_on(monkeypatch):
+    store = FakeVectorStore()
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: store)
+    monkeypatch.setattr(retrieval, "embed_texts", _no_embedding)
+    ingestion.ingest_document("tenant-k", "hours.txt", b"Museo Nazionale opens at 9am.")
+    monkeypatch.setattr(chat, "embed_texts", _no_embedding)
+
+    async def no_async_embedding(texts):
+        _no_embedding(texts)
+
+    monkeypatch.setattr(chat, "embed_texts_async", no_async_embedding)
+
+    assert chat.get_answer_cache().enabled
+    result = chat.handle_chat("tenant-k", "s1", "Museo Nazionale")
+    completed, retrieved = asyncio.run(chat.chat_with_context_async("tenant-k", "s2", "Museo Nazionale"))
+
+    assert result[4] == [retrieved[0]["document_id"]]
+    assert "9am" in completed[0]
+    assert chat.get_answer_cache().stats()["entries"] == 0
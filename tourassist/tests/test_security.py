@@ -1,6 +1,20 @@
 from __future__ import annotations
 
-from tourassist.app.security.auth import create_tenant, validate_api_key
+from fastapi.testclient import TestClient
+
+from tourassist.app import config
+from tourassist.app.main import app
+from tourassist.app.models.db import get_connection
+from tourassist.app.models.generations import SharedGenerations
+from tourassist.app.security import auth
+from tourassist.app.security.auth import (
+    AuthCache,
+    create_tenant,
+    hash_api_key,
+    revoke_api_key,
+    rotate_api_key,
+    validate_api_key,
+)
 
 
 def test_api_key_validation():
@@ -9,3 +23,79 @@ def test_api_key_validation():
     assert validate_api_key("tenant-sec", "bad-key") is False
     other = create_tenant("tenant-other")
     assert validate_api_key("tenant-sec", other["api_key"]) is False
+
+
+def test_api_key_cache_rotation_and_revocation():
+    data = create_tenant("tenant-rotate")
+    assert validate_api_key("tenant-rotate", data["api_key"]) is True
+
+    conn = get_connection()
+    stored = conn.execute("SELECT api_key_hash FROM tenants WHERE tenant_id = ?", ("tenant-rotate",)).fetchone()
+    conn.close()
+    assert stored["api_key_hash"] == hash_api_key(data["api_key"])
+
+    rotated = rotate_api_key("tenant-rotate")
+    assert validate_api_key("tenant-rotate", data["api_key"]) is False
+    assert validate_api_key("tenant-rotate", rotated["api_key"]) is True
+
+    revoke_api_key("tenant-rotate")
+    assert validate_api_key("tenant-rotate", rotated["api_key"]) is False
+
+
+def test_repeated_failures_are_throttled_without_locking_out_valid_keys():
+    data = create_tenant("tenant-throttle")
+    with TestClient(app) as client:
+        params = {"tenant_id": "tenant-throttle"}
+        statuses = [
+            client.get("/documents/doc", params=params, headers={"X-API-Key": "bad"}).status_code
+            for _ in range(config.settings.auth_max_failures + 1)
+        ]
+        valid = client.get("/documents/doc", params=params, headers={"X-API-Key": data["api_key"]})
+        still_bad = client.get("/documents/doc", params=params, headers={"X-API-Key": "bad"})
+    assert statuses[:-1] == [403] * config.settings.auth_max_failures
+    assert statuses[-1] == 429
+    assert valid.status_code == 404
+    assert still_bad.status_code == 429
+
+
+def test_ingest_rejects_form_tenant_that_differs_from_authorized_tenant():
+    api_key = create_tenant("tenant-aaa")["api_key"]
+    create_tenant("tenant-bbb")
+    headers = {"X-API-Key": api_key}
+
+    with TestClient(app) as client:
+        single = client.post(
+            "/ingest",
+            params={"tenant_id": "tenant-aaa"},
+            data={"tenant_id": "tenant-bbb"},
+            files={"file": ("guide.md", b"Spa opens at 9am.", "text/markdown")},
+            headers=headers,
+        )
+        bulk = client.post(
+            "/ingest/bulk",
+            params={"tenant_id": "tenant-aaa"},
+            data={"tenant_id": "tenant-bbb"},
+            files=[("files", ("guide.md", b"Spa opens at 9am.", "text/markdown"))],
+            headers=headers,
+        )
+
+    assert single.status_code == bulk.status_code == 403
+    conn = get_connection()
+    count = conn.execute("SELECT COUNT(*) FROM documents WHERE tenant_id = 'tenant-bbb'").fetchone()[0]
+    conn.close()
+    assert count == 0
+
+
+def test_key_rotation_in_one_worker_evicts_the_cached_key_in_others(monkeypatch):
+    workers = [AuthCache(60, 5, 10, 60, SharedGenerations("auth", 0)) for _ in range(2)]
+    monkeypatch.setattr(auth, "_auth_cache", workers[0])
+    data = create_tenant("tenant-workers")
+    assert validate_api_key("tenant-workers", data["api_key"]) is True
+
+    monkeypatch.setattr(auth, "_auth_cache", workers[1])
+    rotated = rotate_api_key("tenant-workers")
+
+    monkeypatch.setattr(auth, "_auth_cache", workers[0])
+    workers[0].generations.refresh()  # what worker 0's next background poll does
+    assert validate_api_key("tenant-workers", data["api_key"]) is False
+    assert validate_api_key("tenant-workers", rotated["api_key"]) is True
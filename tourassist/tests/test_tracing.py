@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from tourassist.app import config
+from tourassist.app.main import app
+from tourassist.app.observability import tracing
+from tourassist.app.observability.logger import JsonFormatter
+from tourassist.app.rag import retrieval
+from tourassist.app.security.auth import create_tenant
+
+
+class FakeVectorStore:
+    async def query_async(self, vector, tenant_id, top_k):
+        return [{"document_id": "doc-t", "text": "The zoo train runs hourly.", "source": "zoo.md", "score": 0.9}]
+
+
+def test_chat_request_exports_nested_spans_with_request_id(monkeypatch, tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(
+        config,
+        "settings",
+        dataclasses.replace(config.settings, tracing_exporter="file", tracing_file=str(trace_file)),
+    )
+    monkeypatch.setattr(retrieval, "get_vector_store", lambda: FakeVectorStore())
+    api_key = create_tenant("tenant-trace")["api_key"]
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/chat",
+            json={"tenant_id": "tenant-trace", "session_id": "s1", "user_message": "How often does the zoo train run?"},
+            headers={"X-API-Key": api_key, "X-Request-ID": "req-123"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-123"
+    spans = [
+        json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        for line in trace_file.read_text(encoding="utf-8").splitlines()
+    ]
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["http.request"]
+    assert {"auth", "embed_query", "answer_cache", "vector_search", "llm", "memory"} <= set(by_name)
+    assert all(span["traceId"] == root["traceId"] for span in spans)
+    assert by_name["llm"]["parentSpanId"] == root["spanId"]
+    assert {"key": "request.id", "value": {"stringValue": "req-123"}} in by_name["auth"]["attributes"]
+
+
+def test_log_records_carry_request_and_trace_ids(monkeypatch):
+    monkeypatch.setattr(config, "settings", dataclasses.replace(config.settings, tracing_exporter="none"))
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "hello", None, None)
+    token = tracing.set_request_id("req-9")
+    try:
+        with tracing.span("work") as current:
+            payload = json.loads(JsonFormatter().format(record))
+    finally:
+        tracing.reset_request_id(token)
+
+    assert current is None
+    assert payload["request_id"] == "req-9"
+    assert "trace_id" not in payload
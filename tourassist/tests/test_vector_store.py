@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from tourassist.app.rag.local_index import LocalIndex
+from tourassist.app.rag.vector_store import LocalVectorStore
+
+
+def _payload(tenant_id: str, document_id: str, text: str) -> dict:
+    return {"tenant_id": tenant_id, "document_id": document_id, "text": text, "source": f"{document_id}.md"}
+
+
+def test_local_vector_store_search_update_delete_and_reload(tmp_path):
+    store = LocalVectorStore()
+    store.index = LocalIndex(tmp_path / "vectors", dims=3)
+    store.upsert(
+        [
+            ("p1", [1.0, 0.0, 0.0], _payload("t1", "doc-a", "harbour")),
+            ("p2", [0.0, 1.0, 0.0], _payload("t1", "doc-b", "castle")),
+            ("p3", [1.0, 0.0, 0.0], _payload("t2", "doc-c", "other tenant")),
+        ]
+    )
+
+    hits = store.query([0.9, 0.1, 0.0], "t1", top_k=5)
+    assert [hit["document_id"] for hit in hits] == ["doc-a", "doc-b"]
+    assert hits[0]["score"] > 0.99
+
+    store.upsert([("p2", [1.0, 0.1, 0.0], _payload("t1", "doc-b", "castle v2"))])
+    store.delete("t1", ["p1"])
+    hits = store.query([1.0, 0.0, 0.0], "t1", top_k=5)
+    assert [hit["text"] for hit in hits] == ["castle v2"]
+
+    reloaded = LocalIndex(tmp_path / "vectors", dims=3)
+    assert [payload["text"] for _, payload in reloaded.search([1.0, 0.0, 0.0], "t1", 5)] == ["castle v2"]
+    assert [payload["text"] for _, payload in reloaded.search([1.0, 0.0, 0.0], "t2", 5)] == ["other tenant"]
+
+
+def test_local_index_drops_rows_written_without_metadata(tmp_path):
+    index = LocalIndex(tmp_path / "vectors", dims=3)
+    index.upsert([("p1", [1.0, 0.0, 0.0], _payload("t1", "doc-a", "harbour"))])
+    partition = index.partition("t1")
+    # Simulate a crash after the vector append but before (and during) the metadata append.
+    with partition.vectors_path.open("ab") as handle:
+        handle.write(np.asarray([0.0, 0.0, 1.0, 0.5], dtype=np.float32).tobytes())
+    with partition.meta_path.open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "orphan", "row"')
+
+    reloaded = LocalIndex(tmp_path / "vectors", dims=3)
+    reloaded.upsert([("p2", [0.0, 1.0, 0.0], _payload("t1", "doc-b", "castle"))])
+    hits = reloaded.search([0.0, 1.0, 0.0], "t1", 1)
+    assert hits[0][1]["text"] == "castle"
+    assert hits[0][0] > 0.99
+    assert partition.vectors_path.stat().st_size == 2 * 3 * 4
+
+
+def test_local_index_refuses_a_second_process(tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("file locks are only enforced on POSIX")
+    LocalIndex(tmp_path / "vectors", dims=3)
+    script = (
+        "import sys; from pathlib import Path; from tourassist.app.rag.local_index import LocalIndex; "
+        "LocalIndex(Path(sys.argv[1]), dims=3)"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path / "vectors")], capture_output=True, text=True, env=env
+    )
+    assert result.returncode != 0
+    assert "single-process" in result.stderr
+
+
+def test_local_vector_store_async_query_runs_off_the_event_loop(tmp_path):
+    store = LocalVectorStore()
+    store.index = LocalIndex(tmp_path / "vectors", dims=3)
+    store.upsert([("p1", [1.0, 0.0, 0.0], _payload("t1", "doc-a", "harbour"))])
+    search, threads = store.index.search, []
+
+    def recording_search(vector, tenant_id, top_k):
+        threads.append(threading.get_ident())
+        return search(vector, tenant_id, top_k)
+
+    store.index.search = recording_search
+
+    async def query():
+        return await store.query_async([1.0, 0.0, 0.0], "t1", 1), threading.get_ident()
+
+    hits, loop_thread = asyncio.run(query())
+    assert hits[0]["document_id"] == "doc-a"
+    assert threads and threads[0] != loop_thread